@@ -5,13 +5,15 @@ from flask_limiter.util import get_remote_address
 import os
 
 from app.config import config_by_name
+# Enregistre le schéma sqlite:// auprès de flask-limiter
+from app.utils import rate_limit_storage  # noqa: F401
 
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"]
 )
 
-def create_app(config_name='dev'):
+def create_app(config_name='dev', warm_up=True):
     app = Flask(__name__)
     app.config.from_object(config_by_name[config_name])
     
@@ -23,14 +25,48 @@ def create_app(config_name='dev'):
               description='API pour la recommandation de cultures agricoles',
               doc='/docs')
     
+    # Profilage cProfile à la demande (/admin/profiling), au plus près du début de chaque requête
+    from app.utils import profiling
+    profiling.init_app(app)
+    
+    # Durée de chaque étape des requêtes (en-tête Server-Timing)
+    if app.config.get('SERVER_TIMING_ENABLED'):
+        from app.utils import timing
+        timing.init_app(app)
+    
+    # Métriques des requêtes et de l'inférence (GET /metrics)
+    if app.config.get('METRICS_ENABLED'):
+        from app.utils import metrics
+        metrics.init_app(app)
+    
     # Importer les namespaces
     from app.routes.predict import api as predict_ns
     from app.routes.crops import api as crops_ns
     from app.routes.model import api as model_ns
+    from app.routes.admin import api as admin_ns
     
     # Ajouter les namespaces à l'API
     api.add_namespace(predict_ns, path='/predict')
     api.add_namespace(crops_ns, path='/crops')
     api.add_namespace(model_ns, path='/model')
+    api.add_namespace(admin_ns, path='/admin')
+    
+    # Construction du catalogue des cultures et de l'index de similarité au démarrage
+    from app.services.crop_data import get_catalog
+    from app.services.similarity import get_similarity_index
+    with app.app_context():
+        get_catalog()
+        get_similarity_index()
+    
+    # Surveillance des fichiers de modèles, démarrée dans chaque processus à sa première requête
+    if app.config.get('MODEL_WATCH_INTERVAL'):
+        from app.services.model_registry import registry
+        app.before_request(lambda: registry.ensure_watcher(app.config, app.logger))
+    
+    # Préchargement des backends listés dans MODEL_WARMUP (TensorFlow n'est importé que s'il y figure)
+    if warm_up and app.config.get('MODEL_WARMUP'):
+        from app.services.predictor import get_predictor
+        with app.app_context():
+            get_predictor().warm_up(app.config['MODEL_WARMUP'])
     
     return app
\ No newline at end of file
@@ -0,0 +1,14 @@
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+
+def create_asgi_app(config_name='dev'):
+    """
+    Crée l'application ASGI servant l'application Flask (même contrat /predict, /crops, /model)
+
+    L'adaptateur a2wsgi gère les connexions dans la boucle asyncio et exécute chaque requête
+    WSGI sur un pool de ASGI_MAX_WORKERS threads, corps de requête et de réponse transmis en
+    flux (write(), exc_info et déconnexion du client compris).
+    """
+    flask_app = create_app(config_name)
+    return WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_MAX_WORKERS'))
@@ -0,0 +1,156 @@
+"""
+Évaluation hors ligne de gros fichiers CSV, sans application Flask
+
+Usage : python -m app.batch_scoring entree.csv sortie.csv [--model-type gradient_boosting]
+        [--workers 4] [--chunk-size 50000] [--config prod]
+
+Le CSV (colonnes de Crop_recommendation.csv) est lu par blocs ; chaque bloc est validé et
+évalué par un processus du pool, qui charge une seule fois sa propre copie du modèle depuis
+GB_MODEL_DIR / TF_MODEL_DIR. Les résultats (row, crop, confidence, error) sont écrits dans
+l'ordre du fichier d'entrée.
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_config_dict
+from app.services.predictor import CropPredictor, FEATURE_NAMES
+from app.utils.validators import MODEL_TYPES, CROP_PARAMS
+
+OUTPUT_COLUMNS = ['row', 'crop', 'confidence', 'error']
+
+def read_feature_chunks(input_path, chunk_size):
+    """
+    Lit les colonnes des caractéristiques par blocs
+
+    Yields:
+        tuple: (indice de la première ligne du bloc, tableau float64 de forme (n, 7)) ;
+               les valeurs manquantes ou non numériques valent NaN
+    """
+    start_row = 0
+    for chunk in pd.read_csv(input_path, usecols=FEATURE_NAMES, chunksize=chunk_size):
+        features = np.column_stack([pd.to_numeric(chunk[name], errors='coerce').to_numpy(dtype=np.float64)
+                                    for name in FEATURE_NAMES])
+        yield start_row, features
+        start_row += len(features)
+
+def validate_features(features):
+    """
+    Valide un bloc de caractéristiques en une passe vectorisée
+
+    Returns:
+        np.ndarray: message d'erreur de chaque ligne ('' si la ligne est valide)
+    """
+    codes = CROP_PARAMS.check_array(features)
+    errors = np.full(len(features), '', dtype=object)
+    for row in np.flatnonzero(codes.any(axis=1)):
+        errors[row] = '; '.join(CROP_PARAMS.row_errors(codes[row]).values())
+    return errors
+
+# Prédicteur du processus courant (un par processus du pool)
+_predictor = None
+_model_type = None
+
+def _init_worker(config, model_type):
+    global _predictor, _model_type
+    _predictor = CropPredictor(config)
+    _model_type = model_type
+
+def _score_chunk(start_row, features):
+    """Valide et évalue un bloc dans le processus courant"""
+    _predictor.ensure_loaded(_model_type)
+    if _predictor.models[_model_type] is None:
+        raise RuntimeError(f"Le modèle {_model_type} n'est pas chargé (voir GB_MODEL_DIR / TF_MODEL_DIR)")
+
+    errors = validate_features(features)
+    valid = errors == ''
+    crops = np.full(len(features), None, dtype=object)
+    confidences = np.full(len(features), np.nan)
+    if valid.any():
+        valid_crops, valid_confidences = _predictor.predict_crop_batch(
+            features[valid], _model_type, chunk_size=_predictor.config['BATCH_CHUNK_SIZE'])
+        crops[valid] = valid_crops
+        confidences[valid] = valid_confidences
+
+    return pd.DataFrame({
+        'row': np.arange(start_row, start_row + len(features)),
+        'crop': crops,
+        'confidence': confidences,
+        'error': errors
+    }, columns=OUTPUT_COLUMNS)
+
+def score_csv(input_path, output_path, model_type='gradient_boosting', config=None,
+              workers=None, chunk_size=50000, progress=None):
+    """
+    Évalue un fichier CSV et écrit les résultats au fil de l'eau
+
+    Au plus deux blocs par processus sont en attente : la mémoire reste bornée quelle que
+    soit la taille du fichier.
+
+    Args:
+        progress (callable): appelée après chaque bloc écrit avec (lignes, lignes valides, secondes)
+
+    Returns:
+        dict: lignes évaluées, lignes valides, durée et débit
+    """
+    config = config if config is not None else get_config_dict()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    stats = {'rows': 0, 'valid_rows': 0}
+
+    def write(results, output):
+        results.to_csv(output, header=False, index=False)
+        stats['rows'] += len(results)
+        stats['valid_rows'] += int((results['error'] == '').sum())
+        if progress is not None:
+            progress(stats['rows'], stats['valid_rows'], time.perf_counter() - start)
+
+    with open(output_path, 'w', newline='') as output:
+        output.write(','.join(OUTPUT_COLUMNS) + '\n')
+
+        if workers == 1:
+            _init_worker(config, model_type)
+            for start_row, features in read_feature_chunks(input_path, chunk_size):
+                write(_score_chunk(start_row, features), output)
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(config, model_type)) as pool:
+                pending = collections.deque()
+                for start_row, features in read_feature_chunks(input_path, chunk_size):
+                    pending.append(pool.apply_async(_score_chunk, (start_row, features)))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().get(), output)
+                while pending:
+                    write(pending.popleft().get(), output)
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(stats['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Évaluation hors ligne d'un fichier CSV")
+    parser.add_argument('input', help='CSV au format de Crop_recommendation.csv')
+    parser.add_argument('output', help='CSV de sortie (row, crop, confidence, error)')
+    parser.add_argument('--model-type', default='gradient_boosting', choices=MODEL_TYPES)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=50000, help='lignes par bloc envoyé à un processus')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'prod'), choices=['dev', 'test', 'prod'])
+    args = parser.parse_args(argv)
+
+    def progress(rows, valid_rows, seconds):
+        print(f"\r{rows} lignes ({valid_rows} valides), {rows / seconds:,.0f} lignes/s",
+              end='', file=sys.stderr, flush=True)
+
+    stats = score_csv(args.input, args.output, args.model_type, get_config_dict(args.config),
+                      args.workers, args.chunk_size, progress)
+    print(f"\n{stats['rows']} lignes évaluées ({stats['valid_rows']} valides) en {stats['seconds']:.1f}s, "
+          f"{stats['rows_per_second']:,.0f} lignes/s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
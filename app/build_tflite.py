@@ -0,0 +1,36 @@
+"""
+Construction des variantes TensorFlow Lite à précision réduite depuis best_model.h5
+
+Usage : python -m app.build_tflite [--variants tensorflow_lite_float16 tensorflow_lite_int8]
+        [--calibrate] [--config prod]
+
+  - tensorflow_lite_float16 (model_float16.tflite) : poids en float16 ;
+  - tensorflow_lite_int8 (model_int8.tflite) : poids en int8, activations quantifiées
+    dynamiquement à l'exécution ; avec --calibrate, les activations sont étalonnées sur
+    un échantillon de Crop_recommendation.csv (noyaux entiers, entrée et sortie en float32).
+
+Les fichiers sont écrits dans TF_MODEL_DIR ; chaque variante est ensuite servie sous son
+propre model_type. Le rapport taille / latence / concordance avec le modèle float est
+produit par benchmarks/quantization.py.
+"""
+import argparse
+import logging
+import os
+import sys
+
+from app.config import get_config_dict
+from app.services.tflite_variants import TFLITE_VARIANTS, build_variants
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--variants', nargs='+', default=list(TFLITE_VARIANTS), choices=list(TFLITE_VARIANTS))
+    parser.add_argument('--calibrate', action='store_true',
+                        help='étalonner les activations de la variante int8 sur le dataset')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'prod'), choices=['dev', 'test', 'prod'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+    build_variants(get_config_dict(args.config), args.variants, args.calibrate, logging.getLogger('build_tflite'))
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,64 @@ class Config:
     TF_MODEL_DIR = os.path.join(basedir, 'models', 'tensorflow')
     # Dataset path
     DATASET_PATH = os.path.join(os.path.dirname(basedir), 'Datasets', 'Crop_recommendation.csv')
+    # Répertoire des données dérivées (instantanés), reconstruites si le dataset change
+    CACHE_DIR = os.getenv('AGROPREDICT_CACHE_DIR', os.path.join(os.path.dirname(basedir), '.cache'))
+    CROP_CATALOG_SNAPSHOT = os.path.join(CACHE_DIR, 'crop_catalog.json')
+    # Durée de culture (mois) et saison de chaque culture, ajoutées au catalogue
+    CROP_CALENDAR_PATH = os.path.join(os.path.dirname(basedir), 'Datasets', 'GodFile (1).csv')
+    # Instantanés binaires en colonnes (.npy projetés en mémoire) des datasets CSV
+    DATASET_SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'datasets')
+    # Cache HTTP des ressources dérivées du dataset et des modèles (ETag, Cache-Control)
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 300))
+    # Intervalle minimal (s) entre deux vérifications des signatures du dataset et des modèles
+    ARTIFACT_CHECK_INTERVAL = float(os.getenv('ARTIFACT_CHECK_INTERVAL', 5))
+    # Prédiction par lots
+    BATCH_MAX_SAMPLES = int(os.getenv('BATCH_MAX_SAMPLES', 10000))
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 1024))
+    # Pool d'interpréteurs TensorFlow Lite (un par thread d'inférence simultané)
+    TFLITE_POOL_SIZE = int(os.getenv('TFLITE_POOL_SIZE', os.cpu_count() or 4))
+    TFLITE_NUM_THREADS = 1
+    # Standardisation repliée dans la première couche dense des modèles Keras et NumPy : ils reçoivent
+    # les caractéristiques brutes (résultats égaux aux arrondis float32 près)
+    FOLD_STANDARDIZATION = os.getenv('FOLD_STANDARDIZATION', 'False').lower() in ('true', '1', 't')
+    # Évaluateur compilé du Gradient Boosting (au-delà de GB_VECTORIZED_MAX_ROWS lignes : boucle Cython)
+    GB_COMPILED = True
+    GB_VECTORIZED_MAX_ROWS = 32
+    # Cache des prédictions unitaires (0 pour le désactiver, TTL en secondes ou None)
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 4096))
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL')) if os.getenv('PREDICTION_CACHE_TTL') else None
+    PREDICTION_CACHE_PRECISION = int(os.getenv('PREDICTION_CACHE_PRECISION', 2))
+    # Micro-lots : regroupe les prédictions unitaires concurrentes (taille max ou attente max)
+    MICRO_BATCHING_ENABLED = os.getenv('MICRO_BATCHING_ENABLED', 'False').lower() in ('true', '1', 't')
+    MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 32))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 2))
+    # Ensemble (model_type 'ensemble') : membres évalués en parallèle, combinaison 'average' ou 'vote'
+    ENSEMBLE_MODELS = [m.strip() for m in os.getenv(
+        'ENSEMBLE_MODELS', 'gradient_boosting,tensorflow,tensorflow_lite').split(',') if m.strip()]
+    ENSEMBLE_METHOD = os.getenv('ENSEMBLE_METHOD', 'average')
+    # Poids par modèle, ex. "gradient_boosting:2,tensorflow:1" (1 par défaut)
+    ENSEMBLE_WEIGHTS = {name.strip(): float(weight) for name, weight in
+                        (item.split(':') for item in os.getenv('ENSEMBLE_WEIGHTS', '').split(',') if item.strip())}
+    # Serveur asyncio (run_asgi.py) : threads traitant les requêtes et l'inférence
+    ASGI_MAX_WORKERS = int(os.getenv('ASGI_MAX_WORKERS', 32))
+    # Limitation de débit (flask-limiter), désactivable pour les bancs d'essai
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() in ('true', '1', 't')
+    # Fenêtre glissante à deux compteurs : mémoire constante par clé, clés inactives expirées
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    # memory:// (par processus) ou sqlite:////chemin/ratelimit.sqlite (partagé entre les workers)
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    # Export des métriques au format Prometheus (GET /metrics, valeurs propres à chaque worker)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+    # En-tête Server-Timing : durée de chaque étape des requêtes (analyse, validation, inférence...)
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True').lower() in ('true', '1', 't')
+    # Clé des routes d'administration /admin (en-tête X-ADMIN-KEY) ; sans clé, elles sont désactivées
+    ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+    # Rechargement à chaud des modèles : intervalle (s) de surveillance des fichiers (0 pour la désactiver)
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 10))
+    # Délai (s) avant l'arrêt d'une version remplacée, le temps que ses requêtes se terminent
+    MODEL_RETIRE_DELAY = float(os.getenv('MODEL_RETIRE_DELAY', 60))
+    # Backends chargés au démarrage (les autres le sont à leur première utilisation)
+    MODEL_WARMUP = [m.strip() for m in os.getenv('MODEL_WARMUP', 'gradient_boosting').split(',') if m.strip()]
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -19,9 +77,14 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     DEBUG = True
     TESTING = True
+    MODEL_WARMUP = []
+    MODEL_WATCH_INTERVAL = 0
 
 class ProductionConfig(Config):
     DEBUG = False
+    # Limites communes à tous les workers gunicorn
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI',
+                                      'sqlite:///' + os.path.join(Config.CACHE_DIR, 'ratelimit.sqlite'))
     # Configuration de sécurité pour la production
     # Exemple: JWT, CORS, etc.
 
@@ -29,4 +92,11 @@ config_by_name = dict(
     dev=DevelopmentConfig,
     test=TestingConfig,
     prod=ProductionConfig
-)
\ No newline at end of file
+)
+
+def get_config_dict(config_name='dev'):
+    """
+    Retourne la configuration sous forme de dictionnaire, pour les outils utilisés hors de Flask
+    """
+    config_class = config_by_name[config_name]
+    return {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
\ No newline at end of file
@@ -0,0 +1,107 @@
+from flask import request, current_app
+from flask_restx import Namespace, Resource, fields
+from app.services.model_registry import registry
+from app.utils.profiling import profiler
+from app.utils.security import require_admin_key
+from app import limiter
+
+api = Namespace('admin', description="Administration (en-tête X-ADMIN-KEY requis)")
+
+profiling_input_model = api.model('ProfilingInput', {
+    'sample_rate': fields.Float(required=True, description='Fraction des requêtes profilées (0 à 1)', example=0.05),
+    'top_n': fields.Integer(description='Nombre de fonctions du rapport', default=20),
+    'window': fields.Integer(description='Nombre de requêtes profilées conservées', default=100)
+})
+
+def parse_flag(name):
+    return request.args.get(name, 'false').lower() in ('true', '1', 't')
+
+def parse_int(value, default, name, maximum):
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except (ValueError, TypeError):
+        api.abort(400, f"Le paramètre '{name}' doit être un entier")
+    if not 1 <= number <= maximum:
+        api.abort(400, f"Le paramètre '{name}' doit être compris entre 1 et {maximum}")
+    return number
+
+@api.route('/profiling')
+class Profiling(Resource):
+    method_decorators = [require_admin_key]
+
+    @api.doc('get_profiling_report', params={
+        'sort': {'description': 'Tri des fonctions', 'type': 'string', 'enum': ['tottime', 'cumtime'], 'default': 'tottime'},
+        'top_n': {'description': 'Nombre de fonctions retournées', 'type': 'integer'}
+    })
+    @limiter.limit("30 per minute")
+    def get(self):
+        """Fonctions les plus coûteuses des dernières requêtes profilées (temps moyen par requête)"""
+        sort = request.args.get('sort', 'tottime')
+        if sort not in ('tottime', 'cumtime'):
+            api.abort(400, "Le paramètre 'sort' doit valoir 'tottime' ou 'cumtime'")
+        return profiler.report(sort, parse_int(request.args.get('top_n'), None, 'top_n', 1000))
+
+    @api.doc('enable_profiling')
+    @api.expect(profiling_input_model)
+    @limiter.limit("10 per minute")
+    def put(self):
+        """Active le profilage cProfile d'une fraction des requêtes"""
+        data = request.json or {}
+        sample_rate = data.get('sample_rate')
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 < sample_rate <= 1:
+            api.abort(400, "Le paramètre 'sample_rate' doit être un nombre compris entre 0 (exclu) et 1")
+
+        profiler.configure(float(sample_rate),
+                           parse_int(data.get('top_n'), 20, 'top_n', 1000),
+                           parse_int(data.get('window'), 100, 'window', 10000))
+        return profiler.report()
+
+    @api.doc('disable_profiling')
+    @limiter.limit("10 per minute")
+    def delete(self):
+        """Désactive le profilage et vide le rapport"""
+        profiler.disable()
+        profiler.reset()
+        return profiler.report()
+
+@api.route('/models')
+class Models(Resource):
+    method_decorators = [require_admin_key]
+
+    @api.doc('get_models_version')
+    @limiter.limit("30 per minute")
+    def get(self):
+        """Version des modèles en service dans ce processus et état du dernier rechargement"""
+        return registry.status()
+
+@api.route('/models/reload')
+class ModelsReload(Resource):
+    method_decorators = [require_admin_key]
+
+    @api.doc('reload_models', params={
+        'wait': {'description': 'Attendre la mise en service de la nouvelle version', 'type': 'boolean', 'default': False},
+        'force': {'description': "Recharger même si les fichiers n'ont pas changé", 'type': 'boolean', 'default': False}
+    })
+    @api.response(202, 'Rechargement lancé en arrière-plan')
+    @api.response(409, 'Un rechargement est déjà en cours')
+    @limiter.limit("5 per minute")
+    def post(self):
+        """
+        Recharge les modèles depuis GB_MODEL_DIR et TF_MODEL_DIR sans interrompre le service
+        
+        Ne concerne que le processus qui reçoit la requête : les autres workers détectent le
+        changement des fichiers par leur surveillance (MODEL_WATCH_INTERVAL).
+        """
+        config, logger = current_app.config, current_app.logger
+        force = parse_flag('force')
+        if not parse_flag('wait'):
+            started = registry.reload_in_background(config, logger, force)
+            return registry.status(), 202 if started else 409
+
+        try:
+            reloaded = registry.reload(config, logger, force)
+        except Exception as e:
+            api.abort(500, f"Échec du rechargement des modèles: {str(e)}")
+        return dict(registry.status(), reloaded=reloaded)
@@ -1,47 +1,116 @@
+import numpy as np
+from flask import request, current_app
 from flask_restx import Namespace, Resource, fields
-from app.services.crop_data import get_crop_requirements, get_all_crops
+from app.services.crop_data import get_catalog, FEATURE_COLUMNS
+from app.services.similarity import get_similarity_index
+from app.utils import timing
+from app.utils.validators import parse_crop_params, CROP_PARAMS
+from app.utils.http_cache import cached_json_response, deduct_unless_not_modified
 from app import limiter
 
 api = Namespace('crops', description='Informations sur les cultures agricoles')
 
 # Modèle pour les exigences des cultures
 crop_req_model = api.model('CropRequirements', {
+    'crop': fields.String(description='Nom de la culture'),
     'N': fields.Float(description='Niveau moyen d\'azote requis'),
     'P': fields.Float(description='Niveau moyen de phosphore requis'),
     'K': fields.Float(description='Niveau moyen de potassium requis'),
     'temperature': fields.Float(description='Température moyenne requise (°C)'),
     'humidity': fields.Float(description='Humidité moyenne requise (%)'),
     'ph': fields.Float(description='pH moyen du sol requis'),
-    'rainfall': fields.Float(description='Précipitations moyennes requises (mm)')
+    'rainfall': fields.Float(description='Précipitations moyennes requises (mm)'),
+    'durationmonths': fields.Float(description='Durée de culture en mois (null si inconnue)'),
+    'period': fields.String(description='Saison de culture (null si inconnue)')
 })
 
 all_crops_model = api.model('AllCrops', {
     'crops': fields.List(fields.String, description='Liste de toutes les cultures disponibles')
 })
 
+sample_model = api.model('SimilarityQuery', {
+    'N': fields.Float(required=True, description='Niveau d\'azote dans le sol'),
+    'P': fields.Float(required=True, description='Niveau de phosphore dans le sol'),
+    'K': fields.Float(required=True, description='Niveau de potassium dans le sol'),
+    'temperature': fields.Float(required=True, description='Température en degrés Celsius'),
+    'humidity': fields.Float(required=True, description='Humidité relative en %'),
+    'ph': fields.Float(required=True, description='pH du sol'),
+    'rainfall': fields.Float(required=True, description='Précipitations en mm')
+})
+
+similar_input_model = api.model('SimilarityBatchQuery', {
+    'samples': fields.List(fields.Nested(sample_model), required=True, description='Profils à rechercher'),
+    'k': fields.Integer(required=False, default=5, description='Nombre d\'échantillons les plus proches'),
+    'k_crops': fields.Integer(required=False, default=3, description='Nombre de cultures les plus proches')
+})
+
+# Nombre maximal de voisins retournés par requête
+MAX_NEIGHBORS = 100
+
+def parse_neighbors(value, default, name):
+    """Valide un nombre de voisins (k ou k_crops)"""
+    if value is None:
+        return default
+    try:
+        count = int(value)
+    except (ValueError, TypeError):
+        api.abort(400, f"Le paramètre '{name}' doit être un entier")
+    if not 1 <= count <= MAX_NEIGHBORS:
+        api.abort(400, f"Le paramètre '{name}' doit être compris entre 1 et {MAX_NEIGHBORS}")
+    return count
+
+def similarity_index():
+    """Retourne l'index de similarité, ou répond 503 si le dataset n'est pas disponible"""
+    index = get_similarity_index()
+    if index is None:
+        api.abort(503, "Recherche de profils similaires indisponible : dataset des cultures non trouvé")
+    return index
+
+def similarity_results(index, rows, k, k_crops):
+    """Recherche les échantillons et centroïdes les plus proches de chaque profil"""
+    with timing.stage('search'):
+        sample_idx, sample_dist, crop_idx, crop_dist = index.query(rows, k, k_crops)
+    
+    results = []
+    for row in range(len(sample_idx)):
+        results.append({
+            'nearest_samples': [
+                dict(zip(FEATURE_COLUMNS, index.features[i].tolist()),
+                     index=int(i), crop=index.labels[i], distance=distance)
+                for i, distance in zip(sample_idx[row].tolist(), sample_dist[row].tolist())
+            ],
+            'nearest_crops': [
+                {'crop': str(index.crops[i]), 'distance': distance}
+                for i, distance in zip(crop_idx[row].tolist(), crop_dist[row].tolist())
+            ]
+        })
+    return results
+
 @api.route('')
 class CropRequirements(Resource):
     @api.doc('get_crop_requirements')
-    @api.marshal_with(crop_req_model, as_list=True, code=200)
-    @limiter.limit("20 per minute")
+    @api.response(200, 'Succès', [crop_req_model])
+    @api.response(304, 'Non modifié (If-None-Match)')
+    @limiter.limit("20 per minute", deduct_when=deduct_unless_not_modified)
     def get(self):
         """Récupère les besoins moyens pour toutes les cultures"""
         try:
-            crop_requirements = get_crop_requirements()
-            return crop_requirements
+            catalog = get_catalog()
+            return cached_json_response(catalog.requirements_body, catalog.requirements_etag)
         except Exception as e:
             api.abort(500, f"Erreur lors de la récupération des besoins des cultures: {str(e)}")
 
 @api.route('/list')
 class CropList(Resource):
     @api.doc('get_all_crops')
-    @api.marshal_with(all_crops_model, code=200)
-    @limiter.limit("20 per minute")
+    @api.response(200, 'Succès', all_crops_model)
+    @api.response(304, 'Non modifié (If-None-Match)')
+    @limiter.limit("20 per minute", deduct_when=deduct_unless_not_modified)
     def get(self):
         """Récupère la liste de toutes les cultures disponibles"""
         try:
-            crops = get_all_crops()
-            return {'crops': crops}
+            catalog = get_catalog()
+            return cached_json_response(catalog.crops_body, catalog.crops_etag)
         except Exception as e:
             api.abort(500, f"Erreur lors de la récupération de la liste des cultures: {str(e)}")
 
@@ -49,15 +118,80 @@ class CropList(Resource):
 @api.param('crop_name', 'Nom de la culture')
 class CropRequirement(Resource):
     @api.doc('get_crop_requirement')
-    @api.marshal_with(crop_req_model, code=200)
-    @limiter.limit("20 per minute")
+    @api.response(200, 'Succès', crop_req_model)
+    @api.response(404, 'Culture non trouvée')
+    @api.response(304, 'Non modifié (If-None-Match)')
+    @limiter.limit("20 per minute", deduct_when=deduct_unless_not_modified)
     def get(self, crop_name):
         """Récupère les besoins moyens pour une culture spécifique"""
         try:
-            crop_requirements = get_crop_requirements()
-            for req in crop_requirements:
-                if req.get('crop').lower() == crop_name.lower():
-                    return req
+            catalog = get_catalog()
+            body = catalog.detail_body(crop_name)
+        except Exception as e:
+            api.abort(500, f"Erreur lors de la récupération des besoins de la culture: {str(e)}")
+        
+        if body is None:
             api.abort(404, f"Culture '{crop_name}' non trouvée")
+        return cached_json_response(body, catalog.detail_etag(crop_name))
+
+@api.route('/similar')
+class SimilarCrops(Resource):
+    @api.doc('get_similar_crops', params={
+        'N': {'description': 'Niveau d\'azote', 'type': 'float', 'required': True},
+        'P': {'description': 'Niveau de phosphore', 'type': 'float', 'required': True},
+        'K': {'description': 'Niveau de potassium', 'type': 'float', 'required': True},
+        'temperature': {'description': 'Température (°C)', 'type': 'float', 'required': True},
+        'humidity': {'description': 'Humidité (%)', 'type': 'float', 'required': True},
+        'ph': {'description': 'pH du sol', 'type': 'float', 'required': True},
+        'rainfall': {'description': 'Précipitations (mm)', 'type': 'float', 'required': True},
+        'k': {'description': 'Nombre d\'échantillons les plus proches', 'type': 'integer', 'default': 5},
+        'k_crops': {'description': 'Nombre de cultures les plus proches', 'type': 'integer', 'default': 3}
+    })
+    @limiter.limit("20 per minute")
+    @timing.handler
+    def get(self):
+        """Recherche les échantillons du dataset et les cultures dont le profil est le plus proche"""
+        with timing.stage('validate'):
+            values, errors = parse_crop_params(request.args)
+        if errors:
+            api.abort(400, errors)
+        k = parse_neighbors(request.args.get('k'), 5, 'k')
+        k_crops = parse_neighbors(request.args.get('k_crops'), 3, 'k_crops')
+        index = similarity_index()
+        
+        try:
+            return similarity_results(index, [values], k, k_crops)[0]
+        except Exception as e:
+            api.abort(500, f"Erreur lors de la recherche des profils similaires: {str(e)}")
+    
+    @api.doc('post_similar_crops')
+    @api.expect(similar_input_model)
+    @limiter.limit("10 per minute")
+    @timing.handler
+    def post(self):
+        """Recherche les profils les plus proches pour un lot d'échantillons"""
+        with timing.stage('parse'):
+            data = request.json or {}
+        if not isinstance(data, dict):
+            api.abort(400, "Le corps de la requête doit être un objet JSON")
+        samples = data.get('samples')
+        if not isinstance(samples, list) or not samples:
+            api.abort(400, "Le paramètre 'samples' doit être une liste non vide")
+        
+        max_samples = current_app.config['BATCH_MAX_SAMPLES']
+        if len(samples) > max_samples:
+            api.abort(400, f"Le lot ne peut pas dépasser {max_samples} échantillons")
+        
+        k = parse_neighbors(data.get('k'), 5, 'k')
+        k_crops = parse_neighbors(data.get('k_crops'), 3, 'k_crops')
+        
+        with timing.stage('validate'):
+            values, valid, errors = CROP_PARAMS.validate_samples(samples)
+        if not valid.all():
+            api.abort(400, {position: errors[position] for position in np.flatnonzero(~valid).tolist()})
+        index = similarity_index()
+        
+        try:
+            return {'results': similarity_results(index, values, k, k_crops)}
         except Exception as e:
-            api.abort(500, f"Erreur lors de la récupération des besoins de la culture: {str(e)}")
\ No newline at end of file
+            api.abort(500, f"Erreur lors de la recherche des profils similaires: {str(e)}")
@@ -1,10 +1,21 @@
-from flask import send_file, current_app
+from flask import send_file, current_app, request
 from flask_restx import Namespace, Resource, fields
 import os
+from app.services.model_inventory import get_model_inventory
+from app.services.predictor import get_predictor
+from app.services.tflite_variants import TFLITE_MODEL_FILES
+from app.utils.http_cache import cached_json_response, deduct_unless_not_modified
 from app import limiter
 
 api = Namespace('model', description='Gestion des modèles')
 
+# Modèles TFLite téléchargeables : précision -> (type de modèle, nom du fichier téléchargé)
+TFLITE_DOWNLOADS = {
+    'float32': ('tensorflow_lite', 'crop_prediction_model.tflite'),
+    'float16': ('tensorflow_lite_float16', 'crop_prediction_model_float16.tflite'),
+    'int8': ('tensorflow_lite_int8', 'crop_prediction_model_int8.tflite')
+}
+
 model_info_model = api.model('ModelInfo', {
     'name': fields.String(description='Nom du modèle'),
     'type': fields.String(description='Type du modèle'),
@@ -13,61 +24,41 @@ model_info_model = api.model('ModelInfo', {
 })
 
 models_list_model = api.model('ModelsList', {
-    'models': fields.List(fields.Nested(model_info_model), description='Liste des modèles disponibles')
+    'models': fields.List(fields.Nested(model_info_model), description='Liste des modèles disponibles'),
+    'version': fields.String(description='Version des modèles en service (empreinte des fichiers)')
 })
 
 @api.route('/info')
 class ModelInfo(Resource):
     @api.doc('get_models_info')
-    @api.marshal_with(models_list_model, code=200)
-    @limiter.limit("10 per minute")
+    @api.response(200, 'Succès', models_list_model)
+    @api.response(304, 'Non modifié (If-None-Match)')
+    @limiter.limit("10 per minute", deduct_when=deduct_unless_not_modified)
     def get(self):
         """Récupère des informations sur les modèles disponibles"""
         try:
-            models_info = []
-            
-            # Vérifier le modèle Gradient Boosting
-            gb_model_path = os.path.join(current_app.config['GB_MODEL_DIR'], 'gradient_boosting_model.pkl')
-            if os.path.exists(gb_model_path):
-                models_info.append({
-                    'name': 'Gradient Boosting',
-                    'type': 'sklearn',
-                    'size': os.path.getsize(gb_model_path),
-                    'available': True
-                })
-            
-            # Vérifier le modèle TensorFlow
-            tf_model_path = os.path.join(current_app.config['TF_MODEL_DIR'], 'best_model.h5')
-            if os.path.exists(tf_model_path):
-                models_info.append({
-                    'name': 'TensorFlow',
-                    'type': 'keras',
-                    'size': os.path.getsize(tf_model_path),
-                    'available': True
-                })
-            
-            # Vérifier le modèle TensorFlow Lite
-            tflite_model_path = os.path.join(current_app.config['TF_MODEL_DIR'], 'model.tflite')
-            if os.path.exists(tflite_model_path):
-                models_info.append({
-                    'name': 'TensorFlow Lite',
-                    'type': 'tflite',
-                    'size': os.path.getsize(tflite_model_path),
-                    'available': True
-                })
-            
-            return {'models': models_info}
+            predictor = get_predictor()
+            inventory = get_model_inventory(predictor.version)
+            return cached_json_response(inventory.body, inventory.etag)
         except Exception as e:
             api.abort(500, f"Erreur lors de la récupération des informations sur les modèles: {str(e)}")
 
 @api.route('/download/tflite')
 class DownloadTFLiteModel(Resource):
-    @api.doc('download_tflite_model')
+    @api.doc('download_tflite_model', params={
+        'variant': {'description': 'Précision du modèle (float16 et int8 : fichiers plus légers)',
+                    'type': 'string', 'enum': list(TFLITE_DOWNLOADS), 'default': 'float32'}
+    })
     @limiter.limit("5 per day")
     def get(self):
         """Télécharge le modèle TensorFlow Lite pour une utilisation hors ligne"""
+        variant = request.args.get('variant', 'float32')
+        if variant not in TFLITE_DOWNLOADS:
+            api.abort(400, f"Le paramètre 'variant' doit valoir l'une des valeurs suivantes: {', '.join(TFLITE_DOWNLOADS)}")
+        model_type, download_name = TFLITE_DOWNLOADS[variant]
+        
         try:
-            tflite_model_path = os.path.join(current_app.config['TF_MODEL_DIR'], 'model.tflite')
+            tflite_model_path = os.path.join(current_app.config['TF_MODEL_DIR'], TFLITE_MODEL_FILES[model_type])
             if not os.path.exists(tflite_model_path):
                 api.abort(404, "Modèle TensorFlow Lite non trouvé")
             
@@ -75,7 +66,7 @@ class DownloadTFLiteModel(Resource):
                 tflite_model_path,
                 mimetype='application/octet-stream',
                 as_attachment=True,
-                download_name='crop_prediction_model.tflite'
+                download_name=download_name
             )
         except Exception as e:
             api.abort(500, f"Erreur lors du téléchargement du modèle: {str(e)}")
\ No newline at end of file
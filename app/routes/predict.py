@@ -1,8 +1,13 @@
-from flask import request
+import io
+import json
+import numpy as np
+from flask import request, current_app, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from app.services.predictor import get_predictor
+from app.services.csv_scoring import CSVRowReader, score_csv_chunks
 from app import limiter
-from app.utils.validators import validate_crop_params
+from app.utils import timing
+from app.utils.validators import parse_crop_params, parse_top_k, CROP_PARAMS, MODEL_TYPES
 
 api = Namespace('predict', description='Prédiction de cultures agricoles')
 
@@ -15,66 +20,174 @@ input_model = api.model('InputParameters', {
     'humidity': fields.Float(required=True, description='Humidité relative en %'),
     'ph': fields.Float(required=True, description='pH du sol'),
     'rainfall': fields.Float(required=True, description='Précipitations en mm'),
-    'model_type': fields.String(required=False, enum=['gradient_boosting', 'tensorflow', 'tensorflow_lite'], 
-                            description='Type de modèle à utiliser (défaut: gradient_boosting)')
+    'model_type': fields.String(required=False, enum=MODEL_TYPES, 
+                            description='Type de modèle à utiliser (défaut: gradient_boosting)'),
+    'top_k': fields.Integer(required=False, min=1,
+                            description='Nombre de cultures classées à retourner (optionnel)')
+})
+
+ranked_crop_model = api.model('RankedCrop', {
+    'crop': fields.String(description='Culture'),
+    'probability': fields.Float(description='Probabilité (0-1)')
+})
+
+ensemble_member_model = api.model('EnsembleMember', {
+    'model_type': fields.String(description='Modèle membre de l\'ensemble'),
+    'crop': fields.String(description='Culture prédite par ce modèle'),
+    'confidence': fields.Float(description='Confiance de ce modèle (0-1)'),
+    'agrees': fields.Boolean(description='Le modèle prédit la culture retenue par l\'ensemble')
+})
+
+ensemble_model = api.model('EnsembleDetails', {
+    'method': fields.String(description='Combinaison des probabilités (average ou vote)'),
+    'agreement': fields.Float(description='Part des modèles d\'accord avec la culture retenue (0-1)'),
+    'models': fields.List(fields.Nested(ensemble_member_model), description='Réponse de chaque modèle')
 })
 
 prediction_model = api.model('PredictionResult', {
     'crop': fields.String(description='Culture recommandée'),
     'confidence': fields.Float(description='Niveau de confiance (0-1)'),
     'model_used': fields.String(description='Modèle utilisé pour la prédiction'),
-    'input_parameters': fields.Raw(description='Paramètres d\'entrée utilisés')
+    'model_version': fields.String(description='Version des modèles ayant servi la prédiction'),
+    'input_parameters': fields.Raw(description='Paramètres d\'entrée utilisés'),
+    'top_k': fields.List(fields.Nested(ranked_crop_model),
+                         description='Cultures les plus probables, par probabilité décroissante (si top_k est fourni)'),
+    'ensemble': fields.Nested(ensemble_model, allow_null=True,
+                              description='Détail par modèle (model_type ensemble uniquement)')
+})
+
+sample_model = api.model('Sample', {
+    'N': fields.Float(required=True, description='Niveau d\'azote dans le sol'),
+    'P': fields.Float(required=True, description='Niveau de phosphore dans le sol'),
+    'K': fields.Float(required=True, description='Niveau de potassium dans le sol'),
+    'temperature': fields.Float(required=True, description='Température en degrés Celsius'),
+    'humidity': fields.Float(required=True, description='Humidité relative en %'),
+    'ph': fields.Float(required=True, description='pH du sol'),
+    'rainfall': fields.Float(required=True, description='Précipitations en mm')
 })
 
+batch_input_model = api.model('BatchInputParameters', {
+    'samples': fields.List(fields.Nested(sample_model), required=True,
+                           description='Liste des échantillons à évaluer'),
+    'model_type': fields.String(required=False, enum=MODEL_TYPES,
+                            description='Type de modèle à utiliser (défaut: gradient_boosting)'),
+    'top_k': fields.Integer(required=False, min=1,
+                            description='Nombre de cultures classées à retourner par échantillon (optionnel)')
+})
+
+batch_row_model = api.model('BatchRowResult', {
+    'index': fields.Integer(description='Position de l\'échantillon dans le lot'),
+    'crop': fields.String(description='Culture recommandée (null si l\'échantillon est invalide)'),
+    'confidence': fields.Float(description='Niveau de confiance (0-1)'),
+    'errors': fields.Raw(description='Erreurs de validation de l\'échantillon'),
+    'top_k': fields.List(fields.Nested(ranked_crop_model),
+                         description='Cultures les plus probables (si top_k est fourni)'),
+    'ensemble': fields.Nested(ensemble_model, allow_null=True,
+                              description='Détail par modèle (model_type ensemble uniquement)')
+})
+
+batch_prediction_model = api.model('BatchPredictionResult', {
+    'model_used': fields.String(description='Modèle utilisé pour la prédiction'),
+    'model_version': fields.String(description='Version des modèles ayant servi la prédiction'),
+    'count': fields.Integer(description='Nombre d\'échantillons reçus'),
+    'valid_count': fields.Integer(description='Nombre d\'échantillons valides prédits'),
+    'results': fields.List(fields.Nested(batch_row_model), description='Résultats par échantillon')
+})
+
+def ranked_crops(ranking):
+    """Sérialise un classement [(culture, probabilité), ...] ou None"""
+    if ranking is None:
+        return None
+    return [{'crop': crop, 'probability': probability} for crop, probability in ranking]
+
+def ensemble_details(result):
+    """Sérialise la réponse de chaque membre de l'ensemble et leur accord"""
+    crop = result['ranking'][0][0]
+    return {
+        'method': current_app.config.get('ENSEMBLE_METHOD', 'average'),
+        'agreement': result['agreement'],
+        'models': [{'model_type': model_type, 'crop': member_crop, 'confidence': confidence,
+                    'agrees': member_crop == crop}
+                   for model_type, (member_crop, confidence) in result['members'].items()]
+    }
+
+def _predict_single(values, model_type, top_k):
+    """
+    Prédit la culture d'un échantillon validé et construit la réponse de /predict
+
+    Args:
+        values (list): [N, P, K, temperature, humidity, ph, rainfall]
+        top_k (int): nombre de cultures classées à retourner, ou None
+    """
+    N, P, K, temperature, humidity, ph, rainfall = values
+    
+    try:
+        # Obtenir l'instance du prédicteur
+        predictor = get_predictor()
+        
+        # Faire la prédiction (classement des k meilleures cultures si demandé)
+        ranking = None
+        ensemble = None
+        if model_type == 'ensemble':
+            # Membres évalués en parallèle ; détail de la réponse de chacun
+            result = predictor.predict_ensemble_batch(
+                [[N, P, K, temperature, humidity, ph, rainfall]], top_k or 1)[0]
+            crop, confidence = result['ranking'][0]
+            ranking = result['ranking'] if top_k is not None else None
+            ensemble = ensemble_details(result)
+        elif top_k is None:
+            crop, confidence = predictor.predict_crop(
+                N, P, K, temperature, humidity, ph, rainfall, model_type)
+        else:
+            ranking = predictor.predict_crop_top_k(
+                N, P, K, temperature, humidity, ph, rainfall, top_k, model_type)
+            crop, confidence = ranking[0]
+        
+        return {
+            'crop': crop,
+            'confidence': float(confidence),
+            'model_used': model_type,
+            'model_version': predictor.version,
+            'input_parameters': {
+                'N': N,
+                'P': P,
+                'K': K,
+                'temperature': temperature,
+                'humidity': humidity,
+                'ph': ph,
+                'rainfall': rainfall
+            },
+            'top_k': ranked_crops(ranking),
+            'ensemble': ensemble
+        }
+    except Exception as e:
+        api.abort(500, f"Erreur lors de la prédiction: {str(e)}")
+
 @api.route('')
 class PredictCrop(Resource):
     @api.doc('predict_crop')
     @api.expect(input_model)
-    @api.marshal_with(prediction_model, code=200)
+    @api.marshal_with(prediction_model, code=200, skip_none=True)
     @limiter.limit("10 per minute")
+    @timing.handler
     def post(self):
         """Prédit la culture optimale en fonction des paramètres du sol et du climat"""
-        data = request.json
+        with timing.stage('parse'):
+            data = request.json
+        if not isinstance(data, dict):
+            api.abort(400, "Le corps de la requête doit être un objet JSON")
         
-        # Validation des paramètres
-        errors = validate_crop_params(data)
+        # Validation et conversion des paramètres
+        with timing.stage('validate'):
+            values, errors = parse_crop_params(data)
+        top_k, top_k_error = parse_top_k(data.get('top_k'))
+        if top_k_error:
+            errors = dict(errors or {}, top_k=top_k_error)
         if errors:
             api.abort(400, errors)
         
-        # Extraction des paramètres
-        N = data.get('N')
-        P = data.get('P')
-        K = data.get('K')
-        temperature = data.get('temperature')
-        humidity = data.get('humidity')
-        ph = data.get('ph')
-        rainfall = data.get('rainfall')
         model_type = data.get('model_type', 'gradient_boosting')
-        
-        try:
-            # Obtenir l'instance du prédicteur
-            predictor = get_predictor()
-            
-            # Faire la prédiction
-            crop, confidence = predictor.predict_crop(
-                N, P, K, temperature, humidity, ph, rainfall, model_type)
-            
-            return {
-                'crop': crop,
-                'confidence': float(confidence),
-                'model_used': model_type,
-                'input_parameters': {
-                    'N': N,
-                    'P': P,
-                    'K': K,
-                    'temperature': temperature,
-                    'humidity': humidity,
-                    'ph': ph,
-                    'rainfall': rainfall
-                }
-            }
-        except Exception as e:
-            api.abort(500, f"Erreur lors de la prédiction: {str(e)}")
+        return _predict_single(values, model_type, top_k)
 
 @api.route('/simple')
 class SimplePredictCrop(Resource):
@@ -86,63 +199,160 @@ class SimplePredictCrop(Resource):
         'humidity': {'description': 'Humidité (%)', 'type': 'float', 'required': True},
         'ph': {'description': 'pH du sol', 'type': 'float', 'required': True},
         'rainfall': {'description': 'Précipitations (mm)', 'type': 'float', 'required': True},
-        'model_type': {'description': 'Type de modèle', 'type': 'string', 'enum': ['gradient_boosting', 'tensorflow', 'tensorflow_lite'], 'default': 'gradient_boosting'}
+        'model_type': {'description': 'Type de modèle', 'type': 'string', 'enum': MODEL_TYPES, 'default': 'gradient_boosting'},
+        'top_k': {'description': 'Nombre de cultures classées à retourner', 'type': 'integer'}
     })
-    @api.marshal_with(prediction_model, code=200)
+    @api.marshal_with(prediction_model, code=200, skip_none=True)
     @limiter.limit("10 per minute")
+    @timing.handler
     def get(self):
         """Version simplifiée de l'API de prédiction utilisant une méthode GET avec paramètres"""
-        try:
-            # Vérifier que tous les paramètres requis sont présents
-            required_params = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-            missing_params = [param for param in required_params if param not in request.args]
-            
-            if missing_params:
-                api.abort(400, f"Paramètres manquants: {', '.join(missing_params)}")
-            
-            # Extraction des paramètres
+        # Validation et conversion des paramètres en une seule passe
+        with timing.stage('validate'):
+            values, errors = parse_crop_params(request.args)
+        top_k, top_k_error = parse_top_k(request.args.get('top_k'))
+        if top_k_error:
+            errors = dict(errors or {}, top_k=top_k_error)
+        if errors:
+            api.abort(400, errors)
+        
+        model_type = request.args.get('model_type', 'gradient_boosting')
+        return _predict_single(values, model_type, top_k)
+
+@api.route('/batch')
+class BatchPredictCrop(Resource):
+    @api.doc('predict_crop_batch')
+    @api.expect(batch_input_model)
+    @api.response(200, 'Succès', batch_prediction_model)
+    @limiter.limit("10 per minute")
+    @timing.handler
+    def post(self):
+        """Prédit les cultures optimales pour un lot d'échantillons en un seul appel"""
+        with timing.stage('parse'):
+            data = request.json or {}
+        if not isinstance(data, dict):
+            api.abort(400, "Le corps de la requête doit être un objet JSON")
+        samples = data.get('samples')
+        model_type = data.get('model_type', 'gradient_boosting')
+        
+        if not isinstance(samples, list) or not samples:
+            api.abort(400, "Le paramètre 'samples' doit être une liste non vide")
+        
+        max_samples = current_app.config['BATCH_MAX_SAMPLES']
+        if len(samples) > max_samples:
+            api.abort(400, f"Le lot ne peut pas dépasser {max_samples} échantillons")
+        
+        if model_type not in MODEL_TYPES:
+            api.abort(400, f"Type de modèle inconnu: {model_type}")
+        
+        top_k, top_k_error = parse_top_k(data.get('top_k'))
+        if top_k_error:
+            api.abort(400, top_k_error)
+        
+        # Validation vectorisée du lot : un échantillon invalide n'empêche pas les autres
+        with timing.stage('validate'):
+            values, valid, errors = CROP_PARAMS.validate_samples(samples)
+        results = [{'index': index, 'crop': None, 'confidence': None, 'errors': row_errors}
+                   for index, row_errors in enumerate(errors)]
+        valid_indices = np.flatnonzero(valid).tolist()
+        valid_rows = values[valid]
+        
+        predictor = get_predictor()
+        if len(valid_rows):
             try:
-                N = float(request.args.get('N'))
-                P = float(request.args.get('P'))
-                K = float(request.args.get('K'))
-                temperature = float(request.args.get('temperature'))
-                humidity = float(request.args.get('humidity'))
-                ph = float(request.args.get('ph'))
-                rainfall = float(request.args.get('rainfall'))
-                model_type = request.args.get('model_type', 'gradient_boosting')
-            except (ValueError, TypeError) as e:
-                api.abort(400, f"Erreur de conversion: {str(e)}. Tous les paramètres doivent être des nombres.")
-            
-            # Validation
-            data = {
-                'N': N, 'P': P, 'K': K, 
-                'temperature': temperature, 'humidity': humidity, 
-                'ph': ph, 'rainfall': rainfall
-            }
-            errors = validate_crop_params(data)
-            if errors:
-                api.abort(400, errors)
+                chunk_size = current_app.config['BATCH_CHUNK_SIZE']
+                
+                # Une standardisation et un appel au modèle par bloc
+                if model_type == 'ensemble':
+                    ensemble_results = predictor.predict_ensemble_batch(valid_rows, top_k or 1, chunk_size=chunk_size)
+                elif top_k is None:
+                    crops, confidences = predictor.predict_crop_batch(valid_rows, model_type, chunk_size=chunk_size)
+                else:
+                    rankings = predictor.predict_top_k_batch(valid_rows, top_k, model_type, chunk_size=chunk_size)
+            except Exception as e:
+                api.abort(500, f"Erreur lors de la prédiction: {str(e)}")
             
-            # Obtenir l'instance du prédicteur
-            predictor = get_predictor()
-            
-            # Faire la prédiction
-            crop, confidence = predictor.predict_crop(
-                N, P, K, temperature, humidity, ph, rainfall, model_type)
+            if model_type == 'ensemble':
+                for index, result in zip(valid_indices, ensemble_results):
+                    results[index]['crop'], results[index]['confidence'] = result['ranking'][0]
+                    results[index]['ensemble'] = ensemble_details(result)
+                    if top_k is not None:
+                        results[index]['top_k'] = ranked_crops(result['ranking'])
+            elif top_k is None:
+                for index, crop, confidence in zip(valid_indices, crops, confidences.tolist()):
+                    results[index]['crop'] = crop
+                    results[index]['confidence'] = confidence
+            else:
+                for index, ranking in zip(valid_indices, rankings):
+                    results[index]['crop'], results[index]['confidence'] = ranking[0]
+                    results[index]['top_k'] = ranked_crops(ranking)
+        
+        # Réponse construite directement : marshal_with serait trop coûteux sur de gros lots
+        return {
+            'model_used': model_type,
+            'model_version': predictor.version,
+            'count': len(samples),
+            'valid_count': len(valid_indices),
+            'results': results
+        }
+
+@api.route('/csv')
+class CSVPredictCrop(Resource):
+    @api.doc('predict_crop_csv', params={
+        'model_type': {'description': 'Type de modèle', 'type': 'string', 'enum': MODEL_TYPES, 'default': 'gradient_boosting'},
+        'chunk_size': {'description': 'Nombre de lignes évaluées par bloc', 'type': 'integer'},
+        'top_k': {'description': 'Nombre de cultures classées à retourner par ligne', 'type': 'integer'}
+    })
+    @api.response(200, "Succès : une ligne JSON par ligne du CSV (line, crop, confidence, errors), puis un résumé")
+    @api.response(400, 'En-tête CSV ou paramètres invalides')
+    @limiter.limit("5 per minute")
+    def post(self):
+        """
+        Prédit les cultures pour un fichier CSV envoyé en flux (colonnes de Crop_recommendation.csv)
+        
+        Le corps de la requête est lu et évalué par blocs ; les résultats sont renvoyés en
+        NDJSON au fur et à mesure, sans conserver le fichier en mémoire.
+        """
+        model_type = request.args.get('model_type', 'gradient_boosting')
+        if model_type not in MODEL_TYPES:
+            api.abort(400, f"Type de modèle inconnu: {model_type}")
+        
+        try:
+            chunk_size = int(request.args.get('chunk_size', current_app.config['BATCH_CHUNK_SIZE']))
+        except ValueError:
+            api.abort(400, "Le paramètre 'chunk_size' doit être un entier")
+        if not 0 < chunk_size <= current_app.config['BATCH_MAX_SAMPLES']:
+            api.abort(400, f"Le paramètre 'chunk_size' doit être compris entre 1 et "
+                           f"{current_app.config['BATCH_MAX_SAMPLES']}")
+        
+        top_k, top_k_error = parse_top_k(request.args.get('top_k'))
+        if top_k_error:
+            api.abort(400, top_k_error)
+        
+        # Flux texte sur le corps de la requête (utf-8-sig : ignore un éventuel BOM)
+        text_stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        try:
+            reader = CSVRowReader(text_stream)
+        except (ValueError, UnicodeDecodeError) as e:
+            api.abort(400, f"Fichier CSV invalide: {str(e)}")
+        
+        predictor = get_predictor()
+        
+        def generate():
+            count = 0
+            valid_count = 0
+            try:
+                for results in score_csv_chunks(predictor, reader, model_type, chunk_size, top_k):
+                    count += len(results)
+                    valid_count += sum(1 for result in results if result['crop'] is not None)
+                    yield ''.join(json.dumps(result) + '\n' for result in results)
+            except Exception as e:
+                # Le statut 200 est déjà envoyé : l'erreur est signalée dans le flux
+                current_app.logger.error(f"Erreur lors de l'évaluation du CSV: {e}")
+                yield json.dumps({'error': f"Erreur lors de la prédiction: {str(e)}"}) + '\n'
+                return
             
-            return {
-                'crop': crop,
-                'confidence': float(confidence),
-                'model_used': model_type,
-                'input_parameters': {
-                    'N': N,
-                    'P': P,
-                    'K': K,
-                    'temperature': temperature,
-                    'humidity': humidity,
-                    'ph': ph,
-                    'rainfall': rainfall
-                }
-            }
-        except Exception as e:
-            api.abort(500, f"Erreur lors de la prédiction: {str(e)}")
\ No newline at end of file
+            yield json.dumps({'summary': {'model_used': model_type, 'model_version': predictor.version, 'count': count,
+                                          'valid_count': valid_count}}) + '\n'
+        
+        return Response(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
@@ -0,0 +1,127 @@
+import gc
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from app.services.predictor import WARMUP_SAMPLE, get_predictor
+from app.services.crop_data import get_crop_requirements
+
+# Backends pouvant être chargés avant le fork : TensorFlow démarre des threads internes
+# qui ne survivent pas au fork, ses modèles sont donc chargés dans chaque worker
+FORK_SAFE_BACKENDS = ('gradient_boosting', 'numpy')
+
+def preload(app):
+    """
+    Charge dans le processus maître les modèles sûrs au fork et le dataset des cultures
+
+    Les workers partagent ensuite ces pages mémoire en copie sur écriture.
+    """
+    start = time.perf_counter()
+    with app.app_context():
+        predictor = get_predictor()
+        predictor.warm_up([m for m in app.config['MODEL_WARMUP'] if m in FORK_SAFE_BACKENDS])
+        get_crop_requirements()
+
+    # Geler les objets existants : le ramasse-miettes ne les touchera plus dans les workers,
+    # ce qui évite de dupliquer leurs pages mémoire
+    gc.collect()
+    gc.freeze()
+
+    app.logger.info(f"Préchargement du maître terminé en {time.perf_counter() - start:.3f}s")
+
+def warm_up_worker(app):
+    """
+    Charge dans le worker les backends restants de MODEL_WARMUP et exécute une inférence de chauffe
+
+    Returns:
+        list: backends ayant répondu à l'inférence de chauffe
+    """
+    warmed = []
+    with app.app_context():
+        predictor = get_predictor()
+        predictor.warm_up([m for m in app.config['MODEL_WARMUP'] if m not in FORK_SAFE_BACKENDS])
+
+        for model_type, report in predictor.load_report.items():
+            if not report['loaded']:
+                continue
+            try:
+                predictor.predict_crop_batch([WARMUP_SAMPLE], model_type)
+                warmed.append(model_type)
+            except Exception as e:
+                app.logger.warning(f"Inférence de chauffe impossible pour {model_type}: {e}")
+    return warmed
+
+def memory_usage():
+    """
+    Retourne l'utilisation mémoire du processus courant en Mo
+
+    Sous Linux, distingue la mémoire partagée avec le maître (copie sur écriture) de la
+    mémoire privée du processus.
+    """
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    usage[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        # Autres systèmes : seul le pic de RSS est disponible
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return {'rss_mb': round(max_rss / divisor, 1)}
+
+    return {
+        'rss_mb': round(usage.get('Rss', 0), 1),
+        'pss_mb': round(usage.get('Pss', 0), 1),
+        'shared_mb': round(usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0), 1),
+        'private_mb': round(usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0), 1)
+    }
+
+def default_report_dir():
+    return os.getenv('WORKER_REPORT_DIR', os.path.join(tempfile.gettempdir(), 'agropredict-workers'))
+
+def write_worker_report(report_dir, report):
+    """Enregistre le rapport de démarrage d'un worker (un fichier JSON par pid)"""
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"worker-{report['pid']}.json")
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f)
+    os.replace(tmp_path, path)
+
+def remove_worker_report(report_dir, pid):
+    try:
+        os.remove(os.path.join(report_dir, f'worker-{pid}.json'))
+    except OSError:
+        pass
+
+def read_worker_reports(report_dir):
+    """Retourne les rapports des workers en vie, triés par pid"""
+    reports = []
+    for path in glob.glob(os.path.join(report_dir, 'worker-*.json')):
+        try:
+            with open(path) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(reports, key=lambda report: report['pid'])
+
+if __name__ == '__main__':
+    # Usage : python -m app.server [WORKER_REPORT_DIR]
+    report_dir = sys.argv[1] if len(sys.argv) > 1 else default_report_dir()
+    reports = read_worker_reports(report_dir)
+    if not reports:
+        print(f"Aucun rapport de worker dans {report_dir}")
+        sys.exit(1)
+
+    print(f"{'pid':>8} {'démarrage (s)':>14} {'rss (Mo)':>9} {'pss (Mo)':>9} {'partagé (Mo)':>13} {'privé (Mo)':>11}  backends")
+    for report in reports:
+        memory = report['memory']
+        print(f"{report['pid']:>8} {report['cold_start_seconds']:>14.3f} {memory.get('rss_mb', 0):>9.1f} "
+              f"{memory.get('pss_mb', 0):>9.1f} {memory.get('shared_mb', 0):>13.1f} "
+              f"{memory.get('private_mb', 0):>11.1f}  {','.join(report['warmed_backends'])}")
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from collections import Counter
+
+class _PendingPrediction:
+    """Prédiction unitaire en attente de son lot"""
+    __slots__ = ('features', 'event', 'result', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """
+    Regroupe les prédictions unitaires concurrentes en lots, par type de modèle
+
+    Chaque type de modèle a sa file et son thread : le thread attend la première requête,
+    puis accumule les suivantes jusqu'à `max_batch_size` requêtes ou `max_wait` secondes,
+    exécute une seule inférence par lots et rend à chaque appelant son propre résultat.
+    Après shutdown(), les prédictions sont exécutées directement dans le thread appelant.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait=0.002):
+        # predict_batch(lignes, model_type) -> (liste des cultures, tableau des confiances)
+        self._predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queues = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = Counter()
+
+    def _enqueue(self, model_type, pending):
+        """
+        Met la prédiction dans la file du modèle (créée au premier appel)
+
+        Returns:
+            bool: False si le batcher est arrêté (la prédiction n'est pas en file)
+        """
+        # Sous le verrou : aucune requête n'est placée après le signal d'arrêt de shutdown()
+        with self._lock:
+            if self._closed:
+                return False
+            batch_queue = self._queues.get(model_type)
+            if batch_queue is None:
+                batch_queue = queue.Queue()
+                worker = threading.Thread(target=self._run, args=(model_type, batch_queue),
+                                          name=f'micro-batcher-{model_type}', daemon=True)
+                self._queues[model_type] = batch_queue
+                self._workers[model_type] = worker
+                worker.start()
+            batch_queue.put(pending)
+            return True
+
+    def submit(self, model_type, features):
+        """
+        Ajoute une prédiction à la file et attend son résultat
+
+        Returns:
+            tuple: (culture prédite, niveau de confiance)
+        """
+        pending = _PendingPrediction(features)
+        if not self._enqueue(model_type, pending):
+            crops, confidences = self._predict_batch([features], model_type)
+            return crops[0], confidences[0]
+        pending.event.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self, batch_queue, first):
+        """Accumule les requêtes jusqu'à la taille maximale ou l'expiration du délai"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = batch_queue.get(timeout=remaining) if remaining > 0 else batch_queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                # Arrêt demandé : traiter le lot en cours puis s'arrêter
+                batch_queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self, model_type, batch_queue):
+        while True:
+            first = batch_queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(batch_queue, first)
+            try:
+                crops, confidences = self._predict_batch([p.features for p in batch], model_type)
+                for pending, crop, confidence in zip(batch, crops, confidences):
+                    pending.result = (crop, confidence)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+                with self._lock:
+                    self.errors += 1
+
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes[len(batch)] += 1
+
+            for pending in batch:
+                pending.event.set()
+
+    def shutdown(self):
+        """Arrête les threads après le traitement des requêtes déjà en file"""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+            for batch_queue in self._queues.values():
+                batch_queue.put(None)
+            self._queues = {}
+            self._workers = {}
+        for worker in workers:
+            worker.join()
+
+    def stats(self):
+        """Retourne la profondeur des files et la taille des lots obtenus"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': {model_type: q.qsize() for model_type, q in self._queues.items()},
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items()))
+            }
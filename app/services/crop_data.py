@@ -1,76 +1,241 @@
-import pandas as pd
-import numpy as np
+import json
+import math
 import os
+import threading
+import time
+from types import MappingProxyType
+
+import numpy as np
 from flask import current_app
 
-# Cache pour éviter de recharger le dataset à chaque appel
-_crop_requirements_cache = None
-_all_crops_cache = None
+from app.services.datasets import file_signature, get_dataset
+from app.utils.http_cache import make_etag
 
-def get_crop_requirements():
+# Caractéristiques moyennées pour chaque culture
+FEATURE_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+def _group_rows(codes, n_groups):
+    """Indices des lignes de chaque groupe (codes entiers), dans l'ordre du fichier"""
+    order = np.argsort(codes, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(codes, minlength=n_groups))[:-1])
+
+def _crop_calendar(calendar):
     """
-    Retourne les besoins moyens pour chaque culture à partir du dataset
+    Durée de culture moyenne (mois) et saison la plus fréquente de chaque culture
+
+    Returns:
+        dict: culture -> {'durationmonths': float, 'period': str}
+    """
+    crops = calendar.categories['label']
+    periods = calendar.categories['period']
+    durations = np.asarray(calendar['durationmonths'], dtype=np.float64)
+    period_codes = np.asarray(calendar['period'])
+    return {
+        str(crop): {
+            'durationmonths': math.fsum(durations[rows]) / len(rows),
+            'period': str(periods[np.argmax(np.bincount(period_codes[rows]))])
+        }
+        for crop, rows in zip(crops, _group_rows(np.asarray(calendar['label']), len(crops)))
+        if len(rows)
+    }
+
+def _to_json_body(data):
+    # Même format que la sérialisation JSON de flask-restx
+    return (json.dumps(data) + '\n').encode('utf-8')
+
+class CropCatalog:
+    """
+    Catalogue immuable des besoins moyens de chaque culture
+
+    Construit une seule fois : index des noms insensible à la casse, corps de réponse JSON
+    déjà sérialisés pour les routes de liste et de détail et leurs ETags. Une instance n'est
+    jamais modifiée, elle peut donc être lue sans verrou depuis plusieurs threads.
+    """
+
+    def __init__(self, crop_requirements, source=None):
+        self.requirements = tuple(MappingProxyType(dict(req)) for req in crop_requirements)
+        self.crops = tuple(req['crop'] for req in self.requirements)
+        self.source = source or {}
+        self._index = MappingProxyType({req['crop'].lower(): req for req in self.requirements})
+
+        # Corps de réponse pré-sérialisés
+        self.requirements_body = _to_json_body([dict(req) for req in self.requirements])
+        self.crops_body = _to_json_body({'crops': list(self.crops)})
+        self._detail_bodies = MappingProxyType(
+            {name: _to_json_body(dict(req)) for name, req in self._index.items()})
+
+        # ETags dérivées du contenu : identiques d'un worker à l'autre pour un même dataset
+        self.requirements_etag = make_etag(self.requirements_body)
+        self.crops_etag = make_etag(self.crops_body)
+        self._detail_etags = MappingProxyType(
+            {name: make_etag(body) for name, body in self._detail_bodies.items()})
+
+    def __len__(self):
+        return len(self.requirements)
+
+    def get(self, crop_name):
+        """Retourne les besoins d'une culture (recherche insensible à la casse) ou None"""
+        return self._index.get(crop_name.lower())
+
+    def detail_body(self, crop_name):
+        """Retourne le corps JSON pré-sérialisé d'une culture ou None"""
+        return self._detail_bodies.get(crop_name.lower())
+
+    def detail_etag(self, crop_name):
+        """Retourne l'ETag du corps de détail d'une culture ou None"""
+        return self._detail_etags.get(crop_name.lower())
+
+    @classmethod
+    def from_dataset(cls, dataset, calendar=None, source=None):
+        """
+        Calcule les moyennes par culture à partir du dataset en colonnes (ColumnarDataset)
+
+        Les sommes sont exactes (math.fsum) : mêmes valeurs que pandas groupby().mean().
+        Si le calendrier des cultures (GodFile) est fourni, chaque culture reçoit aussi sa
+        durée de culture en mois et sa saison (None pour les cultures qu'il ne décrit pas).
+        """
+        crops = dataset.categories['label']
+        groups = _group_rows(np.asarray(dataset['label']), len(crops))
+        columns = {column: np.asarray(dataset[column], dtype=np.float64) for column in FEATURE_COLUMNS}
+        seasons = _crop_calendar(calendar) if calendar is not None else None
+
+        crop_requirements = []
+        for crop, rows in zip(crops, groups):
+            if not len(rows):
+                continue
+            requirement = {'crop': str(crop)}
+            requirement.update({column: math.fsum(values[rows]) / len(rows) for column, values in columns.items()})
+            if seasons is not None:
+                requirement.update(seasons.get(str(crop), {'durationmonths': None, 'period': None}))
+            crop_requirements.append(requirement)
+        return cls(crop_requirements, source)
+
+    def save_snapshot(self, snapshot_path):
+        """Enregistre le catalogue et la signature de son dataset source (écriture atomique)"""
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        tmp_path = f'{snapshot_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'source': self.source, 'crops': [dict(req) for req in self.requirements]}, f)
+        os.replace(tmp_path, snapshot_path)
+
+    @classmethod
+    def load_snapshot(cls, snapshot_path, source):
+        """Charge un catalogue enregistré, ou None s'il ne correspond plus au dataset"""
+        try:
+            with open(snapshot_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('source') != source:
+            return None
+        return cls(snapshot['crops'], source)
+
+def _catalog_source(dataset_path, calendar_path=None):
+    """Signature du dataset et du calendrier des cultures dont le catalogue est dérivé"""
+    source = file_signature(dataset_path)
+    source['calendar'] = (file_signature(calendar_path)
+                          if calendar_path and os.path.exists(calendar_path) else None)
+    return source
+
+def build_catalog(dataset_path, snapshot_path=None, calendar_path=None, dataset_snapshot_dir=None):
     """
-    global _crop_requirements_cache
-    
-    if _crop_requirements_cache is not None:
-        return _crop_requirements_cache
-    
+    Construit le catalogue depuis l'instantané s'il est à jour, sinon depuis les datasets
+    (instantanés binaires en colonnes de dataset_snapshot_dir, voir datasets)
+    """
+    source = _catalog_source(dataset_path, calendar_path)
+
+    if snapshot_path:
+        catalog = CropCatalog.load_snapshot(snapshot_path, source)
+        if catalog is not None:
+            return catalog
+
+    logger = current_app.logger
+    calendar = (get_dataset(calendar_path, dataset_snapshot_dir, logger)
+                if source['calendar'] is not None else None)
+    catalog = CropCatalog.from_dataset(get_dataset(dataset_path, dataset_snapshot_dir, logger), calendar, source)
+
+    if snapshot_path:
+        try:
+            catalog.save_snapshot(snapshot_path)
+        except OSError as e:
+            current_app.logger.warning(f"Impossible d'enregistrer l'instantané du catalogue: {e}")
+    return catalog
+
+# Catalogue courant : remplacé d'un bloc (affectation atomique), jamais modifié sur place
+_catalog = None
+_catalog_lock = threading.Lock()
+# Dernière vérification de la signature du dataset (au plus une par ARTIFACT_CHECK_INTERVAL)
+_checked_at = 0.0
+
+def _dataset_unchanged(catalog):
+    global _checked_at
+    try:
+        unchanged = _catalog_source(catalog.source['path'], current_app.config.get('CROP_CALENDAR_PATH')) == catalog.source
+    except OSError:
+        # Dataset momentanément inaccessible : le dernier catalogue reste servi
+        unchanged = True
+    if unchanged:
+        _checked_at = time.monotonic()
+    return unchanged
+
+def _is_current(catalog):
+    if catalog is None or catalog.source.get('path') != os.path.abspath(current_app.config['DATASET_PATH']):
+        return False
+    if time.monotonic() - _checked_at < current_app.config['ARTIFACT_CHECK_INTERVAL']:
+        return True
+    return _dataset_unchanged(catalog)
+
+def get_catalog():
+    """
+    Retourne le catalogue des cultures, construit au premier appel
+    """
+    catalog = _catalog
+    if _is_current(catalog):
+        return catalog
+
+    with _catalog_lock:
+        if _is_current(_catalog):
+            return _catalog
+        return _rebuild_locked()
+
+def rebuild_catalog():
+    """
+    Reconstruit le catalogue et le substitue atomiquement au précédent
+
+    Les lecteurs en cours continuent d'utiliser l'ancien catalogue jusqu'à leur fin.
+    """
+    with _catalog_lock:
+        return _rebuild_locked()
+
+def _rebuild_locked():
+    global _catalog, _checked_at
+
     try:
-        # Charger le dataset
         dataset_path = current_app.config['DATASET_PATH']
-        
+
         if not os.path.exists(dataset_path):
             current_app.logger.error(f"Dataset non trouvé: {dataset_path}")
-            return []
-        
-        df = pd.read_csv(dataset_path)
-        
-        # Grouper par culture et calculer les moyennes
-        crop_means = df.groupby('label').mean().reset_index()
-        
-        # Convertir en liste de dictionnaires pour l'API
-        crop_requirements = []
-        for _, row in crop_means.iterrows():
-            crop_requirements.append({
-                'crop': row['label'],
-                'N': float(row['N']),
-                'P': float(row['P']),
-                'K': float(row['K']),
-                'temperature': float(row['temperature']),
-                'humidity': float(row['humidity']),
-                'ph': float(row['ph']),
-                'rainfall': float(row['rainfall'])
-            })
-        
-        # Mettre en cache
-        _crop_requirements_cache = crop_requirements
-        
-        return crop_requirements
+            return CropCatalog([])
+
+        catalog = build_catalog(dataset_path, current_app.config.get('CROP_CATALOG_SNAPSHOT'),
+                                current_app.config.get('CROP_CALENDAR_PATH'),
+                                current_app.config.get('DATASET_SNAPSHOT_DIR'))
     except Exception as e:
-        current_app.logger.error(f"Erreur lors de la récupération des besoins des cultures: {e}")
-        return []
+        current_app.logger.error(f"Erreur lors de la construction du catalogue des cultures: {e}")
+        return CropCatalog([])
+
+    _catalog = catalog
+    _checked_at = time.monotonic()
+    return catalog
+
+def get_crop_requirements():
+    """
+    Retourne les besoins moyens pour chaque culture à partir du dataset
+    """
+    return [dict(req) for req in get_catalog().requirements]
 
 def get_all_crops():
     """
     Retourne la liste de toutes les cultures disponibles
     """
-    global _all_crops_cache
-    
-    if _all_crops_cache is not None:
-        return _all_crops_cache
-    
-    try:
-        # Obtenir les besoins des cultures
-        crop_requirements = get_crop_requirements()
-        
-        # Extraire les noms des cultures
-        crops = [req['crop'] for req in crop_requirements]
-        
-        # Mettre en cache
-        _all_crops_cache = crops
-        
-        return crops
-    except Exception as e:
-        current_app.logger.error(f"Erreur lors de la récupération de la liste des cultures: {e}")
-        return []
\ No newline at end of file
+    return list(get_catalog().crops)
@@ -0,0 +1,82 @@
+import csv
+
+import numpy as np
+
+from app.services.predictor import FEATURE_NAMES
+from app.utils.validators import CROP_PARAMS
+
+class CSVRowReader:
+    """
+    Lecture d'un CSV au format de Crop_recommendation.csv par blocs de lignes
+
+    Le fichier est lu au fil de l'eau depuis un flux texte : seul le bloc en cours est
+    conservé en mémoire. Les colonnes supplémentaires (par exemple `label`) sont ignorées.
+    """
+
+    def __init__(self, text_stream):
+        self._reader = csv.reader(text_stream)
+        header = next(self._reader, None)
+        if header is None:
+            raise ValueError("Le fichier CSV est vide")
+
+        header = [column.strip() for column in header]
+        missing = [name for name in FEATURE_NAMES if name not in header]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans l'en-tête du CSV: {', '.join(missing)}")
+        self.header = header
+
+    def chunks(self, chunk_size):
+        """
+        Génère des blocs d'au plus `chunk_size` lignes
+
+        Yields:
+            list: tuples (numéro de ligne dans le fichier, ligne sous forme de dict ou None,
+                  erreurs de structure ou None)
+        """
+        chunk = []
+        for row in self._reader:
+            if not row:
+                continue
+            if len(row) != len(self.header):
+                error = {'row': f"La ligne doit contenir {len(self.header)} colonnes, {len(row)} trouvées"}
+                chunk.append((self._reader.line_num, None, error))
+            else:
+                chunk.append((self._reader.line_num, dict(zip(self.header, row)), None))
+
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def score_csv_chunks(predictor, reader, model_type, chunk_size, top_k=None):
+    """
+    Valide et prédit chaque bloc du CSV en un appel par lots
+
+    Yields:
+        list: résultats du bloc, un dict par ligne (line, crop, confidence, errors, et
+              top_k si un classement des k meilleures cultures est demandé)
+    """
+    for chunk in reader.chunks(chunk_size):
+        results = [{'line': line, 'crop': None, 'confidence': None, 'errors': errors}
+                   for line, row, errors in chunk]
+
+        # Validation vectorisée des lignes bien formées du bloc
+        positions = [position for position, (line, row, errors) in enumerate(chunk) if row is not None]
+        values, valid, row_errors = CROP_PARAMS.validate_samples([chunk[position][1] for position in positions])
+        for position, errors in zip(positions, row_errors):
+            results[position]['errors'] = errors
+        valid_results = [results[positions[index]] for index in np.flatnonzero(valid)]
+        valid_rows = values[valid]
+
+        if len(valid_rows) and top_k is None:
+            crops, confidences = predictor.predict_crop_batch(valid_rows, model_type, chunk_size=chunk_size)
+            for result, crop, confidence in zip(valid_results, crops, confidences.tolist()):
+                result['crop'] = crop
+                result['confidence'] = confidence
+        elif len(valid_rows):
+            rankings = predictor.predict_top_k_batch(valid_rows, top_k, model_type, chunk_size=chunk_size)
+            for result, ranking in zip(valid_results, rankings):
+                result['crop'], result['confidence'] = ranking[0]
+                result['top_k'] = [{'crop': crop, 'probability': probability} for crop, probability in ranking]
+        yield results
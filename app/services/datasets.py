@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+# Version du format des instantanés : un changement force leur reconstruction
+SNAPSHOT_FORMAT = 1
+
+def file_signature(path):
+    """Retourne la signature (chemin absolu, mtime_ns, taille) d'un fichier"""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+class ColumnarDataset:
+    """
+    Dataset CSV stocké en colonnes typées
+
+    Les colonnes numériques gardent le type déduit du CSV (int64, float64) ; les colonnes
+    textuelles sont encodées en codes entiers (int8 le plus souvent) vers leurs catégories
+    triées. Chargé depuis un instantané, chaque colonne est un tableau .npy projeté en
+    mémoire en lecture seule : les pages sont partagées entre les processus qui l'ouvrent
+    et rien n'est copié ni analysé à l'ouverture.
+    """
+
+    def __init__(self, columns, categories, source):
+        self.columns = MappingProxyType(dict(columns))
+        self.categories = MappingProxyType(dict(categories))
+        self.source = source
+        self.n_rows = len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        """Colonne brute (codes entiers pour une colonne catégorielle), sans copie"""
+        return self.columns[name]
+
+    def decode(self, name):
+        """Valeurs d'une colonne catégorielle (tableau de chaînes)"""
+        return self.categories[name][self.columns[name]]
+
+    def matrix(self, names, dtype=np.float64):
+        """Tableau (n, len(names)) des colonnes demandées (copie contiguë)"""
+        return np.column_stack([np.asarray(self.columns[name], dtype=dtype) for name in names])
+
+    @classmethod
+    def from_csv(cls, csv_path, source=None):
+        """Analyse le CSV (pandas) et encode ses colonnes textuelles"""
+        import pandas as pd
+
+        df = pd.read_csv(csv_path, encoding='utf-8-sig')
+        columns, categories = {}, {}
+        for name in df.columns:
+            series = df[name]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                columns[name] = np.ascontiguousarray(series.to_numpy())
+            else:
+                values = series.astype(str).to_numpy(dtype=object)
+                names, codes = np.unique(values, return_inverse=True)
+                columns[name] = codes.astype(_code_dtype(len(names)))
+                categories[name] = names.astype(str)
+        return cls(columns, categories, source)
+
+    def save(self, directory):
+        """Écrit une colonne par fichier .npy (et ses catégories) dans `directory`"""
+        for name, values in self.columns.items():
+            np.save(os.path.join(directory, f'{_file_stem(name)}.npy'), values, allow_pickle=False)
+        for name, names in self.categories.items():
+            np.save(os.path.join(directory, f'{_file_stem(name)}.categories.npy'), names, allow_pickle=False)
+
+    @classmethod
+    def open(cls, directory, column_names, categorical, source):
+        """Ouvre un instantané : colonnes projetées en mémoire, catégories lues en entier"""
+        columns = {name: np.load(os.path.join(directory, f'{_file_stem(name)}.npy'),
+                                 mmap_mode='r', allow_pickle=False)
+                   for name in column_names}
+        categories = {name: np.load(os.path.join(directory, f'{_file_stem(name)}.categories.npy'),
+                                    allow_pickle=False)
+                      for name in categorical}
+        return cls(columns, categories, source)
+
+def _file_stem(name):
+    """Nom de fichier sûr pour un nom de colonne ou de dataset"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'column'
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == SNAPSHOT_FORMAT else None
+
+def _write_manifest(manifest_path, manifest):
+    tmp_path = f'{manifest_path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def _open_snapshot(snapshot_dir, manifest, source):
+    return ColumnarDataset.open(os.path.join(snapshot_dir, manifest['directory']),
+                                manifest['columns'], manifest['categorical'], source)
+
+def build_snapshot(csv_path, snapshot_dir, source=None):
+    """
+    Convertit le CSV en instantané dans snapshot_dir et retourne le dataset projeté
+
+    Les colonnes sont écrites dans un répertoire temporaire renommé d'un bloc en
+    <dataset>-<empreinte>/, puis le manifeste <dataset>.json (signature de la source,
+    répertoire, colonnes) est remplacé atomiquement. Les anciens répertoires sont supprimés :
+    les processus qui les ont projetés en mémoire continuent de les lire.
+    """
+    source = dict(source or file_signature(csv_path))
+    source.setdefault('sha256', _sha256(csv_path))
+    name = _file_stem(os.path.splitext(os.path.basename(csv_path))[0])
+    directory = f"{name}-{source['sha256'][:16]}"
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    dataset = ColumnarDataset.from_csv(csv_path, source)
+    tmp_dir = tempfile.mkdtemp(dir=snapshot_dir, prefix=f'.{name}-')
+    try:
+        dataset.save(tmp_dir)
+        os.chmod(tmp_dir, 0o755)
+        try:
+            os.rename(tmp_dir, os.path.join(snapshot_dir, directory))
+        except OSError:
+            # Même contenu déjà converti (par un autre processus) : il est réutilisé
+            if not os.path.isdir(os.path.join(snapshot_dir, directory)):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'source': source,
+        'directory': directory,
+        'rows': len(dataset),
+        'columns': list(dataset.columns),
+        'categorical': list(dataset.categories),
+        'dtypes': {column: str(values.dtype) for column, values in dataset.columns.items()}
+    }
+    _write_manifest(os.path.join(snapshot_dir, f'{name}.json'), manifest)
+
+    # Seuls les répertoires <dataset>-<empreinte> de ce dataset : pas ceux d'un dataset
+    # dont le nom commence par le même préfixe (crop-2024 pour crop)
+    previous = re.compile(rf'{re.escape(name)}-[0-9a-f]{{16}}')
+    for entry in os.listdir(snapshot_dir):
+        if previous.fullmatch(entry) and entry != directory:
+            shutil.rmtree(os.path.join(snapshot_dir, entry), ignore_errors=True)
+    return _open_snapshot(snapshot_dir, manifest, source)
+
+def open_dataset(csv_path, snapshot_dir=None, logger=None):
+    """
+    Retourne le dataset en colonnes, depuis son instantané s'il correspond encore au CSV
+
+    L'instantané est valide si la date de modification et la taille du CSV n'ont pas
+    changé ; sinon, l'empreinte SHA-256 du contenu est comparée à celle de l'instantané (un
+    fichier seulement « touché » ou recopié n'est pas reconverti). Sans snapshot_dir, ou
+    si l'instantané ne peut pas être écrit, le CSV est analysé en mémoire.
+    """
+    logger = logger or logging.getLogger(__name__)
+    source = file_signature(csv_path)
+    if not snapshot_dir:
+        return ColumnarDataset.from_csv(csv_path, source)
+
+    name = _file_stem(os.path.splitext(os.path.basename(csv_path))[0])
+    manifest_path = os.path.join(snapshot_dir, f'{name}.json')
+    manifest = _read_manifest(manifest_path)
+    try:
+        if manifest is not None:
+            known = manifest['source']
+            if all(known.get(key) == source[key] for key in ('path', 'mtime_ns', 'size')):
+                return _open_snapshot(snapshot_dir, manifest, known)
+
+            if known.get('size') == source['size']:
+                source['sha256'] = _sha256(csv_path)
+                if known.get('sha256') == source['sha256']:
+                    _write_manifest(manifest_path, dict(manifest, source=source))
+                    return _open_snapshot(snapshot_dir, manifest, source)
+
+        logger.info(f"Conversion de {csv_path} en instantané binaire dans {snapshot_dir}")
+        return build_snapshot(csv_path, snapshot_dir, source)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Instantané de {csv_path} inutilisable, lecture du CSV: {e}")
+        return ColumnarDataset.from_csv(csv_path, source)
+
+# Datasets ouverts dans le processus, par chemin absolu du CSV
+_datasets = {}
+_datasets_lock = threading.Lock()
+
+def get_dataset(csv_path, snapshot_dir=None, logger=None):
+    """
+    Retourne le dataset ouvert dans le processus, rouvert si le CSV a changé
+
+    Les projections en mémoire sont partagées par tous les appelants du processus.
+    """
+    key = os.path.abspath(csv_path)
+    signature = file_signature(csv_path)
+    dataset = _datasets.get(key)
+    if dataset is not None and all(dataset.source.get(k) == signature[k] for k in ('mtime_ns', 'size')):
+        return dataset
+
+    with _datasets_lock:
+        dataset = _datasets.get(key)
+        if dataset is None or any(dataset.source.get(k) != signature[k] for k in ('mtime_ns', 'size')):
+            dataset = open_dataset(csv_path, snapshot_dir, logger)
+            _datasets[key] = dataset
+        return dataset
@@ -0,0 +1,212 @@
+import numpy as np
+
+# Marqueur de feuille dans les arbres scikit-learn (tree_.children_left == -1)
+_TREE_LEAF = -1
+
+def _softmax(raw_predictions):
+    """Softmax stable, calculée comme sklearn.utils.extmath.softmax"""
+    proba = raw_predictions.copy()
+    proba -= proba.max(axis=1).reshape((-1, 1))
+    np.exp(proba, out=proba)
+    proba /= proba.sum(axis=1).reshape((-1, 1))
+    return proba
+
+def _init_raw_predictions(init, n_trees_per_stage):
+    """
+    Prédiction brute initiale d'un estimateur initial constant (DummyClassifier 'prior')
+
+    Reprend le lien de la perte log de scikit-learn à partir de l'API publique
+    (init.predict_proba) : logit de la probabilité de la classe positive en binaire,
+    log(p / moyenne géométrique de p) en multiclasse.
+    """
+    from scipy.special import logit
+    from scipy.stats import gmean
+
+    eps = np.finfo(np.float64).eps
+    prior = init.predict_proba(np.zeros((1, init.n_features_in_)))
+    if n_trees_per_stage == 1:
+        return logit(np.clip(prior[:, 1], eps, 1 - eps, dtype=np.float64))
+    prior = np.clip(prior, eps, 1 - eps, dtype=np.float64)
+    return np.log(prior / gmean(prior, axis=1)[:, None])[0]
+
+class CompiledGradientBoosting:
+    """
+    GradientBoostingClassifier aplati en tableaux NumPy contigus
+
+    Tous les noeuds de tous les arbres (une étape x une classe) sont concaténés dans des
+    tableaux feature / threshold / children / value. Les feuilles pointent sur elles-mêmes,
+    ce qui permet de parcourir tous les arbres pour tout un lot en `max_depth` étapes
+    vectorisées, puis d'obtenir étiquettes et probabilités en un seul passage.
+
+    Au-delà de `vectorized_max_rows` lignes, le parcours vectorisé devient plus lent que la
+    boucle Cython de scikit-learn : les prédictions brutes sont alors celles de
+    model.decision_function, converties de la même façon.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, leaf_value,
+                 roots, max_depth, n_stages, init_raw, classes, model=None, vectorized_max_rows=32):
+        self.feature = feature
+        self.threshold = threshold
+        # Enfants entrelacés : children[2 * noeud + aller_à_droite]
+        self.children = np.stack([children_left, children_right], axis=1).ravel()
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_stages = n_stages
+        self.n_trees_per_stage = len(roots) // n_stages
+        self.init_raw = init_raw
+        self.classes_ = classes
+        self.model = model
+        self.vectorized_max_rows = vectorized_max_rows
+
+    @classmethod
+    def from_sklearn(cls, model, vectorized_max_rows=32):
+        """
+        Compile un GradientBoostingClassifier entraîné
+
+        Seuls les attributs publics du modèle sont lus (init_, estimators_, tree_). Le
+        modèle compilé est ensuite comparé à model.predict_proba sur des lignes de contrôle :
+        une version de scikit-learn au comportement différent est détectée au chargement.
+
+        Raises:
+            ValueError: si le modèle utilise un estimateur initial non constant, ou si le
+                modèle compilé ne reproduit pas scikit-learn
+        """
+        import sklearn
+        from sklearn.dummy import DummyClassifier
+
+        init = model.init_
+        if isinstance(init, str) and init == 'zero':
+            init_raw = np.zeros(model.estimators_.shape[1], dtype=np.float64)
+        elif isinstance(init, DummyClassifier) and init.strategy == 'prior':
+            # Prédiction initiale constante : indépendante de l'entrée
+            init_raw = _init_raw_predictions(init, model.estimators_.shape[1])
+        else:
+            raise ValueError(f"Estimateur initial non supporté: {init!r}")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        n_stages, n_trees_per_stage = model.estimators_.shape
+
+        # Ordre des arbres : étape par étape, puis classe par classe (comme scikit-learn)
+        for stage in range(n_stages):
+            for k in range(n_trees_per_stage):
+                tree = model.estimators_[stage, k].tree_
+                node_ids = np.arange(tree.node_count, dtype=np.int64)
+                is_leaf = tree.children_left == _TREE_LEAF
+
+                left = np.where(is_leaf, node_ids, tree.children_left) + offset
+                right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+                features.append(np.where(is_leaf, 0, tree.feature))
+                thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+                lefts.append(left)
+                rights.append(right)
+                # Le pas d'apprentissage est appliqué à la compilation, comme le fait scikit-learn
+                values.append(model.learning_rate * tree.value[:, 0, 0])
+                roots.append(offset)
+
+                offset += tree.node_count
+                max_depth = max(max_depth, tree.max_depth)
+
+        compiled = cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children_left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            children_right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            leaf_value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_stages=n_stages,
+            init_raw=np.asarray(init_raw, dtype=np.float64),
+            classes=model.classes_,
+            model=model,
+            vectorized_max_rows=vectorized_max_rows
+        )
+
+        # Lignes de contrôle : origine et valeurs tirées entre les seuils extrêmes des arbres
+        low = np.full(model.n_features_in_, np.inf)
+        high = np.full(model.n_features_in_, -np.inf)
+        split = compiled.children[0::2] != np.arange(len(compiled.feature))
+        np.minimum.at(low, compiled.feature[split], compiled.threshold[split])
+        np.maximum.at(high, compiled.feature[split], compiled.threshold[split])
+        low, high = np.where(np.isfinite(low), low - 1, 0), np.where(np.isfinite(high), high + 1, 1)
+        probe = np.vstack([np.zeros(model.n_features_in_),
+                           np.random.default_rng(0).uniform(low, high, (63, model.n_features_in_))])
+        _, proba = compiled._convert(compiled._raw_predict_trees(probe))
+        if not np.allclose(proba, model.predict_proba(probe), rtol=0, atol=1e-9):
+            raise ValueError(f"Le modèle compilé ne reproduit pas scikit-learn {sklearn.__version__}")
+        return compiled
+
+    def apply(self, input_data):
+        """
+        Retourne l'indice de la feuille atteinte dans chaque arbre (n x arbres)
+        """
+        # Les arbres scikit-learn comparent des entrées float32 à des seuils float64
+        X = np.ascontiguousarray(input_data, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+
+        nodes = np.broadcast_to(self.roots, (n_samples, len(self.roots)))
+        for _ in range(self.max_depth):
+            values = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            go_right = ~(values <= np.take(self.threshold, nodes))
+            nodes = np.take(self.children, 2 * nodes + go_right)
+        return nodes
+
+    def raw_predict(self, input_data):
+        """
+        Somme des prédictions brutes de tous les arbres (n x arbres par étape)
+        """
+        n_samples = np.shape(input_data)[0]
+
+        if n_samples > self.vectorized_max_rows and self.model is not None:
+            # (n,) en classification binaire
+            return self.model.decision_function(input_data).reshape(n_samples, -1)
+        return self._raw_predict_trees(input_data)
+
+    def _raw_predict_trees(self, input_data):
+        """Prédictions brutes par le parcours vectorisé des arbres compilés"""
+        n_samples = np.shape(input_data)[0]
+        stage_values = self.leaf_value[self.apply(input_data)]
+
+        # (n, étapes, K) -> (étapes, n, K), précédé de la prédiction initiale
+        stage_values = stage_values.reshape(n_samples, self.n_stages, self.n_trees_per_stage)
+        stage_values = np.concatenate(
+            [np.broadcast_to(self.init_raw, (1, n_samples, self.n_trees_per_stage)),
+             stage_values.transpose(1, 0, 2)])
+
+        # Accumulation séquentielle étape par étape : même ordre d'addition que scikit-learn
+        return np.cumsum(stage_values, axis=0)[-1]
+
+    def predict_with_proba(self, input_data):
+        """
+        Retourne les étiquettes et les probabilités en un seul passage
+
+        Returns:
+            tuple: (tableau des étiquettes, tableau n x classes des probabilités)
+        """
+        return self._convert(self.raw_predict(input_data))
+
+    def _convert(self, raw_predictions):
+        """Étiquettes et probabilités à partir des prédictions brutes"""
+        if self.n_trees_per_stage == 1:
+            from scipy.special import expit
+
+            # Classification binaire : une seule sortie brute par échantillon
+            raw = raw_predictions[:, 0]
+            proba = np.empty((raw.shape[0], 2), dtype=np.float64)
+            proba[:, 1] = expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            encoded = (raw >= 0).astype(int)
+        else:
+            proba = _softmax(raw_predictions)
+            encoded = np.argmax(raw_predictions, axis=1)
+
+        return self.classes_[encoded], proba
+
+    def predict_proba(self, input_data):
+        """Retourne les probabilités (n x classes)"""
+        return self.predict_with_proba(input_data)[1]
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+
+from app.utils.http_cache import make_etag
+
+# Artefacts décrits par /model/info : (nom, type, clé du répertoire dans la config, fichier)
+MODEL_ARTIFACTS = (
+    ('Gradient Boosting', 'sklearn', 'GB_MODEL_DIR', 'gradient_boosting_model.pkl'),
+    ('TensorFlow', 'keras', 'TF_MODEL_DIR', 'best_model.h5'),
+    ('TensorFlow Lite', 'tflite', 'TF_MODEL_DIR', 'model.tflite'),
+    ('TensorFlow Lite float16', 'tflite', 'TF_MODEL_DIR', 'model_float16.tflite'),
+    ('TensorFlow Lite int8', 'tflite', 'TF_MODEL_DIR', 'model_int8.tflite'),
+    ('NumPy', 'numpy', 'TF_MODEL_DIR', 'model.npz')
+)
+
+# Fichiers sources des modèles servis (model.npz, régénéré automatiquement depuis best_model.h5,
+# n'en fait pas partie ; les variantes TFLite, construites explicitement, en font partie)
+MODEL_SOURCE_FILES = (
+    ('GB_MODEL_DIR', 'gradient_boosting_model.pkl'),
+    ('GB_MODEL_DIR', 'scaler.pkl'),
+    ('GB_MODEL_DIR', 'metadata.pkl'),
+    ('TF_MODEL_DIR', 'best_model.h5'),
+    ('TF_MODEL_DIR', 'model.tflite'),
+    ('TF_MODEL_DIR', 'model_float16.tflite'),
+    ('TF_MODEL_DIR', 'model_int8.tflite'),
+    ('TF_MODEL_DIR', 'metadata.pkl')
+)
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+def model_source_signatures(config):
+    """Retourne (chemin, taille, mtime_ns) de chaque fichier source des modèles, ou None s'il est absent"""
+    return tuple(_file_signature(os.path.join(config[dir_key], filename))
+                 for dir_key, filename in MODEL_SOURCE_FILES)
+
+def model_version(config):
+    """
+    Version des modèles : empreinte du contenu de leurs fichiers sources
+
+    Deux déploiements des mêmes fichiers ont la même version, quelles que soient leurs dates.
+    """
+    digest = hashlib.sha256()
+    for dir_key, filename in MODEL_SOURCE_FILES:
+        digest.update(f'{dir_key}/{filename}\0'.encode('utf-8'))
+        try:
+            with open(os.path.join(config[dir_key], filename), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        except OSError:
+            digest.update(b'absent')
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+def _artifact_signatures(config):
+    """Retourne (chemin, taille, mtime_ns) de chaque artefact, ou None s'il est absent"""
+    return tuple(_file_signature(os.path.join(config[dir_key], filename))
+                 for _, _, dir_key, filename in MODEL_ARTIFACTS)
+
+class ModelInventory:
+    """
+    Description immuable des artefacts de modèles disponibles
+
+    Le corps de /model/info et son ETag sont calculés une seule fois à partir de la
+    taille de chaque fichier et de la version des modèles en service (empreinte de leur
+    contenu) : les workers et les serveurs servant les mêmes fichiers renvoient la même
+    ETag, quelles que soient les dates des fichiers ou le nombre de rechargements.
+    """
+
+    def __init__(self, signatures, version=None):
+        self.signatures = signatures
+        self.version = version
+        self.models = tuple(
+            {'name': name, 'type': model_type, 'size': signature[1], 'available': True}
+            for (name, model_type, _, _), signature in zip(MODEL_ARTIFACTS, signatures)
+            if signature is not None
+        )
+        self.body = (json.dumps({'models': list(self.models), 'version': version}) + '\n').encode('utf-8')
+        self.etag = make_etag(self.body)
+
+# Inventaire courant, remplacé d'un bloc lorsque les signatures changent
+_inventory = None
+_checked_at = 0.0
+_inventory_lock = threading.Lock()
+
+def get_model_inventory(version=None):
+    """
+    Retourne l'inventaire des modèles
+
+    Les fichiers ne sont réexaminés qu'une fois par ARTIFACT_CHECK_INTERVAL secondes,
+    ou dès que la version en service change.
+
+    Args:
+        version (str): version des modèles en service
+    """
+    global _inventory, _checked_at
+
+    config = current_app.config
+    inventory = _inventory
+    if (inventory is not None and inventory.version == version
+            and time.monotonic() - _checked_at < config['ARTIFACT_CHECK_INTERVAL']):
+        return inventory
+
+    with _inventory_lock:
+        if (_inventory is not None and _inventory.version == version
+                and time.monotonic() - _checked_at < config['ARTIFACT_CHECK_INTERVAL']):
+            return _inventory
+
+        signatures = _artifact_signatures(config)
+        if (_inventory is None or _inventory.signatures != signatures
+                or _inventory.version != version):
+            _inventory = ModelInventory(signatures, version)
+        _checked_at = time.monotonic()
+        return _inventory
+
+def invalidate_model_inventory():
+    """Force le réexamen des fichiers de modèles à la prochaine lecture"""
+    global _checked_at
+    _checked_at = 0.0
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from app.services.model_inventory import model_source_signatures
+from app.services.predictor import WARMUP_SAMPLE, CropPredictor
+
+class ModelRegistry:
+    """
+    Versions successives des modèles servis par le processus
+
+    Une nouvelle version est un nouveau CropPredictor : ses backends (ceux chargés par la
+    version courante) sont chargés et chauffés à l'écart, puis l'instance remplace la
+    version courante en une seule affectation. Les requêtes en cours terminent sur
+    l'instance qu'elles ont obtenue ; l'ancienne instance n'est arrêtée qu'après
+    MODEL_RETIRE_DELAY secondes. Si un backend de la nouvelle version ne se charge pas,
+    la version courante est conservée.
+
+    Les rechargements sont déclenchés par la route d'administration ou par un thread qui
+    surveille les fichiers de GB_MODEL_DIR et TF_MODEL_DIR (MODEL_WATCH_INTERVAL).
+    """
+
+    def __init__(self):
+        self._reload_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher_pid = None
+        self._stop_watching = threading.Event()
+        self.reloading = False
+        self.last_reload = None
+        self.last_error = None
+        # Signatures dont le chargement a échoué : pas de nouvelle tentative automatique
+        self._failed_signatures = None
+
+    def status(self):
+        predictor = CropPredictor._instance
+        return {
+            'version': predictor.version if predictor else None,
+            'generation': predictor.generation if predictor else None,
+            'loaded_at': predictor.loaded_at if predictor else None,
+            'backends': [model_type for model_type, report in predictor.load_report.items()
+                         if report['loaded']] if predictor else [],
+            'reloading': self.reloading,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error,
+            'watching': self._watcher_pid == os.getpid()
+        }
+
+    def reload(self, config, logger, force=False):
+        """
+        Charge et chauffe une nouvelle version des modèles, puis la met en service
+
+        Args:
+            force (bool): recharger même si les fichiers n'ont pas changé
+
+        Returns:
+            bool: True si une nouvelle version a été mise en service
+        """
+        with self._reload_lock:
+            current = CropPredictor._instance
+            signatures = model_source_signatures(config)
+            if not force and current is not None and current.signatures == signatures:
+                return False
+
+            self.reloading = True
+            start = time.perf_counter()
+            try:
+                if current is not None:
+                    backends = [model_type for model_type, report in current.load_report.items() if report['loaded']]
+                else:
+                    backends = list(config.get('MODEL_WARMUP', []))
+
+                candidate = CropPredictor(config, logger)
+                candidate.generation = current.generation + 1 if current is not None else 1
+                candidate.warm_up(backends)
+                failed = [model_type for model_type in backends if not candidate.load_report[model_type]['loaded']]
+                if failed:
+                    candidate.close()
+                    raise RuntimeError(f"Chargement impossible de la nouvelle version: {', '.join(failed)}")
+                for model_type in backends:
+                    candidate.predict_crop_batch([WARMUP_SAMPLE], model_type)
+            except Exception as e:
+                self._failed_signatures = signatures
+                self.last_error = {'at': time.time(), 'error': str(e)}
+                raise
+            finally:
+                self.reloading = False
+
+            # Mise en service : les prochains appels à get_predictor() obtiennent la nouvelle version
+            CropPredictor._instance = candidate
+            self._failed_signatures = None
+            self.last_error = None
+            self.last_reload = {
+                'at': time.time(),
+                'seconds': round(time.perf_counter() - start, 4),
+                'previous_version': current.version if current is not None else None,
+                'version': candidate.version
+            }
+            logger.info(f"Modèles rechargés : version {candidate.version} (génération {candidate.generation}) "
+                        f"en {self.last_reload['seconds']:.3f}s, backends: {', '.join(backends) or 'aucun'}")
+
+            if current is not None:
+                retire = threading.Timer(config.get('MODEL_RETIRE_DELAY', 60), current.close)
+                retire.daemon = True
+                retire.start()
+            return True
+
+    def reload_in_background(self, config, logger, force=False):
+        """Lance un rechargement dans un thread ; False si un rechargement est déjà en cours"""
+        if self.reloading or self._reload_lock.locked():
+            return False
+
+        def run():
+            try:
+                self.reload(config, logger, force)
+            except Exception as e:
+                logger.error(f"Échec du rechargement des modèles: {e}")
+
+        threading.Thread(target=run, name='model-reload', daemon=True).start()
+        return True
+
+    def ensure_watcher(self, config, logger):
+        """
+        Démarre la surveillance des fichiers de modèles dans le processus courant
+
+        Appelée à chaque requête : le thread n'existe pas encore dans un worker issu d'un
+        fork (préchargement gunicorn), il y est démarré à sa première requête.
+        """
+        interval = config.get('MODEL_WATCH_INTERVAL', 0)
+        if not interval or self._watcher_pid == os.getpid():
+            return
+
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._stop_watching = threading.Event()
+            threading.Thread(target=self._watch, args=(config, logger, interval, self._stop_watching),
+                             name='model-watcher', daemon=True).start()
+
+    def stop_watcher(self):
+        """Arrête la surveillance des fichiers de modèles dans le processus courant"""
+        with self._watcher_lock:
+            self._stop_watching.set()
+            self._watcher_pid = None
+
+    def _watch(self, config, logger, interval, stop):
+        pending = None
+        while not stop.wait(interval):
+            current = CropPredictor._instance
+            signatures = model_source_signatures(config)
+            if current is None or signatures == current.signatures or signatures == self._failed_signatures:
+                pending = None
+                continue
+
+            # Attendre que les fichiers ne changent plus (copie en cours) avant de recharger
+            if signatures != pending:
+                pending = signatures
+                continue
+
+            pending = None
+            try:
+                self.reload(config, logger)
+            except Exception as e:
+                logger.error(f"Échec du rechargement des modèles: {e}")
+
+# Registre du processus
+registry = ModelRegistry()
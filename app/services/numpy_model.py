@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+# Couches sans effet en inférence
+_IDENTITY_LAYERS = ('InputLayer', 'Dropout')
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+def _softmax(x):
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+def _sigmoid(x):
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    return np.reciprocal(x, out=x)
+
+def file_sha256(path):
+    """Empreinte SHA-256 (hexadécimale) du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': _relu,
+    'softmax': _softmax,
+    'sigmoid': _sigmoid,
+    'tanh': lambda x: np.tanh(x, out=x)
+}
+
+class NumpyDenseModel:
+    """
+    Réseau dense (Keras Sequential) évalué avec de simples produits matriciels NumPy
+
+    Les couches BatchNormalization sont repliées dans la couche Dense suivante et les
+    couches Dropout supprimées : l'inférence se réduit à une suite de matmul + activation.
+    source_sha256 est l'empreinte du fichier .h5 dont le modèle est extrait.
+    """
+
+    def __init__(self, kernels, biases, activations, class_names, source_sha256=None):
+        for activation in activations:
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f"Activation non supportée: {activation}")
+
+        self.kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in kernels]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self.class_names = list(class_names)
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def from_keras_h5(cls, h5_path, class_names):
+        """
+        Extrait les poids et activations d'un modèle Keras Sequential sauvegardé en .h5
+
+        Seul h5py est nécessaire : TensorFlow n'est pas importé.
+        """
+        import h5py
+
+        kernels, biases, activations = [], [], []
+        # Transformation affine (BatchNormalization) en attente de repli dans la Dense suivante
+        pending_scale, pending_shift = None, None
+
+        with h5py.File(h5_path, 'r') as f:
+            model_config = json.loads(f.attrs['model_config'])
+            if model_config['class_name'] != 'Sequential':
+                raise ValueError("Seuls les modèles Keras Sequential sont supportés")
+
+            weights_group = f['model_weights']
+            for layer in model_config['config']['layers']:
+                layer_class = layer['class_name']
+                layer_config = layer['config']
+                if layer_class in _IDENTITY_LAYERS:
+                    continue
+
+                group = weights_group[layer_config['name']]
+                weights = [np.asarray(group[name], dtype=np.float64)
+                           for name in group.attrs['weight_names']]
+
+                if layer_class == 'Dense':
+                    kernel = weights[0]
+                    bias = weights[1] if layer_config.get('use_bias', True) else np.zeros(kernel.shape[1])
+                    if pending_scale is not None:
+                        # Dense(x * s + t) = x @ (s[:, None] * W) + (t @ W + b)
+                        bias = pending_shift @ kernel + bias
+                        kernel = pending_scale[:, None] * kernel
+                        pending_scale, pending_shift = None, None
+                    kernels.append(kernel)
+                    biases.append(bias)
+                    activations.append(layer_config.get('activation', 'linear'))
+
+                elif layer_class == 'BatchNormalization':
+                    weights = list(weights)
+                    size = weights[-1].shape[0]
+                    gamma = weights.pop(0) if layer_config.get('scale', True) else np.ones(size)
+                    beta = weights.pop(0) if layer_config.get('center', True) else np.zeros(size)
+                    moving_mean, moving_variance = weights
+                    scale = gamma / np.sqrt(moving_variance + layer_config.get('epsilon', 1e-3))
+                    shift = beta - moving_mean * scale
+                    if pending_scale is not None:
+                        scale, shift = pending_scale * scale, pending_shift * scale + shift
+                    pending_scale, pending_shift = scale, shift
+
+                elif layer_class == 'Activation':
+                    if pending_scale is not None or not activations or activations[-1] not in ('linear', None):
+                        raise ValueError("Couche Activation non repliable dans la couche Dense précédente")
+                    activations[-1] = layer_config['activation']
+
+                else:
+                    raise ValueError(f"Couche non supportée: {layer_class}")
+
+        if pending_scale is not None:
+            # BatchNormalization finale : transformation affine diagonale
+            kernels.append(np.diag(pending_scale))
+            biases.append(pending_shift)
+            activations.append('linear')
+
+        return cls(kernels, biases, activations, class_names, file_sha256(h5_path))
+
+    @classmethod
+    def from_npz(cls, npz_path):
+        """Charge un modèle exporté par save()"""
+        with np.load(npz_path, allow_pickle=False) as data:
+            n_layers = int(data['n_layers'])
+            return cls([data[f'kernel_{i}'] for i in range(n_layers)],
+                       [data[f'bias_{i}'] for i in range(n_layers)],
+                       [str(a) for a in data['activations']],
+                       [str(c) for c in data['class_names']],
+                       str(data['source_sha256']) if 'source_sha256' in data.files else None)
+
+    def is_exported_from(self, h5_path):
+        """Vrai si le modèle a été extrait de ce fichier .h5 (même contenu, quelle que soit sa date)"""
+        return self.source_sha256 is not None and self.source_sha256 == file_sha256(h5_path)
+
+    def save(self, npz_path):
+        """Enregistre les poids dans une archive .npz compacte (sans pickle)"""
+        arrays = {'n_layers': np.array(len(self.kernels)),
+                  'activations': np.array([a or 'linear' for a in self.activations]),
+                  'class_names': np.array(self.class_names)}
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            arrays[f'kernel_{i}'] = kernel
+            arrays[f'bias_{i}'] = bias
+        if self.source_sha256 is not None:
+            arrays['source_sha256'] = np.array(self.source_sha256)
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp_path = f'{npz_path}.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, npz_path)
+
+    def fold_input_standardization(self, standardizer):
+        """
+        Retourne une copie du modèle dont la première couche intègre la standardisation
+
+        Le modèle obtenu prend les caractéristiques brutes (voir FusedStandardizer.fold_into_dense).
+        """
+        kernel, bias = standardizer.fold_into_dense(self.kernels[0], self.biases[0])
+        return NumpyDenseModel([kernel] + self.kernels[1:], [bias] + self.biases[1:],
+                               self.activations, self.class_names, self.source_sha256)
+
+    def predict_proba(self, input_data_scaled):
+        """
+        Propagation avant sur un tableau (n x caractéristiques) déjà standardisé
+
+        Returns:
+            np.ndarray: probabilités (n x classes) en float32
+        """
+        x = np.asarray(input_data_scaled, dtype=np.float32)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            x = x @ kernel
+            x += bias
+            x = _ACTIVATIONS[activation](x)
+        return x
+
+def export_keras_model(tf_model_dir):
+    """
+    Exporte best_model.h5 en model.npz dans le répertoire du modèle TensorFlow
+
+    Returns:
+        NumpyDenseModel: le modèle exporté
+    """
+    import pickle
+
+    with open(os.path.join(tf_model_dir, 'metadata.pkl'), 'rb') as f:
+        class_names = pickle.load(f)['class_names']
+
+    model = NumpyDenseModel.from_keras_h5(os.path.join(tf_model_dir, 'best_model.h5'), class_names)
+    model.save(os.path.join(tf_model_dir, 'model.npz'))
+    return model
+
+if __name__ == '__main__':
+    # Usage : python -m app.services.numpy_model [TF_MODEL_DIR]
+    from app.config import Config
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else Config.TF_MODEL_DIR
+    exported = export_keras_model(model_dir)
+    print(f"Modèle exporté dans {os.path.join(model_dir, 'model.npz')} "
+          f"({len(exported.kernels)} couches denses, {len(exported.class_names)} classes)")
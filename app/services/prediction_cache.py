@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+class _InFlight:
+    """Calcul en cours partagé par les requêtes identiques simultanées"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class PredictionCache:
+    """
+    Cache LRU borné des prédictions, indexé par type de modèle et caractéristiques quantifiées
+
+    Les valeurs d'entrée sont arrondies à `precision` décimales : des mesures identiques à la
+    précision des capteurs partagent la même entrée. Les requêtes identiques simultanées ne
+    déclenchent qu'un seul calcul (les autres attendent son résultat).
+    """
+
+    def __init__(self, max_size=4096, ttl=None, precision=2):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.precision = precision
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        # Générations (globale et par type de modèle) : un résultat calculé avant une
+        # invalidation n'est pas stocké
+        self._epoch = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def make_key(self, model_type, features):
+        """Construit la clé de cache à partir des caractéristiques quantifiées"""
+        return (model_type,) + tuple(round(float(value), self.precision) for value in features)
+
+    def get_or_compute(self, model_type, features, compute):
+        """
+        Retourne le résultat en cache, ou l'obtient via `compute()` et le met en cache
+        """
+        key = self.make_key(model_type, features)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            pending = self._in_flight.get(key)
+            is_leader = pending is None
+            if is_leader:
+                pending = _InFlight()
+                self._in_flight[key] = pending
+                generation = self._generation(model_type)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            # Une requête identique est déjà en cours : attendre son résultat
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = compute()
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if pending.error is None and self._generation(model_type) == generation:
+                    self._store(key, pending.result)
+            pending.event.set()
+
+        return pending.result
+
+    def _generation(self, model_type):
+        return self._epoch, self._generations.get(model_type, 0)
+
+    def _store(self, key, value):
+        # Appelé avec le verrou acquis
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, model_type=None):
+        """
+        Supprime les entrées d'un type de modèle (ou toutes), par exemple après un rechargement
+        """
+        with self._lock:
+            if model_type is None:
+                self._epoch += 1
+                self._entries.clear()
+                return
+
+            self._generations[model_type] = self._generations.get(model_type, 0) + 1
+            for key in [key for key in self._entries if key[0] == model_type]:
+                del self._entries[key]
+
+    def stats(self):
+        """Retourne la taille du cache et ses compteurs"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'precision': self.precision,
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'coalesced': self.coalesced
+            }
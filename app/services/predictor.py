@@ -1,12 +1,69 @@
+import logging
 import os
 import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np
-import tensorflow as tf
-from flask import current_app
+from flask import current_app, has_app_context
+
+from app.services.tflite_pool import TFLiteInterpreterPool
+from app.services.tflite_variants import TFLITE_MODEL_FILES, TFLITE_VARIANTS, variant_is_stale
+from app.services.numpy_model import NumpyDenseModel
+from app.services.standardization import FusedStandardizer
+from app.services.gb_evaluator import CompiledGradientBoosting
+from app.services.prediction_cache import PredictionCache
+from app.services.batching import MicroBatcher
+from app.services.model_inventory import model_source_signatures, model_version
+from app.utils import metrics, timing
+
+# Ordre des caractéristiques attendu par tous les modèles
+FEATURE_NAMES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+# Échantillon de l'inférence de chauffe (workers, nouvelle version des modèles)
+WARMUP_SAMPLE = [90, 42, 43, 21, 82, 6.5, 200]
+
+# TensorFlow n'est importé qu'à la première utilisation d'un modèle qui en dépend
+_tensorflow = None
+
+def _import_tensorflow():
+    """
+    Importe TensorFlow à la demande
+    
+    Returns:
+        tuple: (module tensorflow, durée de l'import en secondes, 0 s'il était déjà importé)
+    """
+    global _tensorflow
+    if _tensorflow is not None:
+        return _tensorflow, 0.0
+    
+    start = time.perf_counter()
+    import tensorflow as tf
+    _tensorflow = tf
+    return tf, time.perf_counter() - start
+
+def top_k_indices(probabilities, k):
+    """
+    Indices des k classes les plus probables de chaque ligne, par probabilité décroissante
+    
+    Sélection partielle (argpartition) sur toutes les classes, puis tri des k seules retenues.
+    """
+    n_classes = probabilities.shape[1]
+    k = min(k, n_classes)
+    if k < n_classes:
+        candidates = np.argpartition(probabilities, n_classes - k, axis=1)[:, n_classes - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), probabilities.shape)
+    order = np.argsort(-np.take_along_axis(probabilities, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
 
 class CropPredictor:
     """
     Une classe pour charger et utiliser différents modèles de prédiction de cultures
+    
+    Les modèles sont chargés paresseusement : chaque backend est chargé à sa première
+    utilisation, ou au démarrage s'il figure dans la liste MODEL_WARMUP.
     """
     _instance = None
     
@@ -17,12 +74,31 @@ class CropPredictor:
             cls._instance = CropPredictor()
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, config=None, logger=None):
+        # Configuration (chemins des modèles, options) : celle de l'application Flask par défaut,
+        # ou un dictionnaire (voir get_config_dict) pour une utilisation hors de Flask
+        self.config = config if config is not None else current_app.config
+        if logger is None:
+            logger = current_app.logger if has_app_context() else logging.getLogger(__name__)
+        self.logger = logger
+        
+        # Version des fichiers de modèles servis par cette instance (voir model_registry)
+        self.signatures = model_source_signatures(self.config)
+        self.version = model_version(self.config)
+        self.generation = 0
+        self.loaded_at = time.time()
+        
         # Modèles disponibles
         self.models = {
             'gradient_boosting': None,
             'tensorflow': None,
-            'tensorflow_lite': None
+            'tensorflow_lite': None,
+            # Variantes TFLite à précision réduite (voir tflite_variants)
+            'tensorflow_lite_float16': None,
+            'tensorflow_lite_int8': None,
+            'numpy': None,
+            # Backends membres de l'ensemble effectivement chargés
+            'ensemble': None
         }
         
         # Métadonnées associées
@@ -37,14 +113,104 @@ class CropPredictor:
             'tensorflow': None
         }
         
-        # Tentative de chargement des modèles disponibles
-        self._load_models()
+        # Moyenne et écart-type de chaque scaler, extraits au chargement (voir standardization)
+        self.standardizers = {
+            'gradient_boosting': None,
+            'tensorflow': None
+        }
+        
+        # Modèles dont la première couche dense intègre la standardisation (FOLD_STANDARDIZATION) :
+        # ils reçoivent les caractéristiques brutes
+        self.folded_standardization = set()
+        
+        # Versions compilées (tableaux NumPy) des modèles scikit-learn
+        self.compiled_models = {
+            'gradient_boosting': None
+        }
+        
+        # Fonctions de chargement de chaque backend, appelées à la demande
+        self._loaders = {
+            'gradient_boosting': self._load_gradient_boosting,
+            'tensorflow': self._load_tensorflow,
+            'tensorflow_lite': self._load_tensorflow_lite,
+            'tensorflow_lite_float16': partial(self._load_tensorflow_lite, 'tensorflow_lite_float16'),
+            'tensorflow_lite_int8': partial(self._load_tensorflow_lite, 'tensorflow_lite_int8'),
+            'numpy': self._load_numpy,
+            'ensemble': self._load_ensemble
+        }
+        self._load_locks = {model_type: threading.Lock() for model_type in self._loaders}
+        
+        # Pool de threads évaluant les membres de l'ensemble en parallèle
+        self._ensemble_executor = None
+        
+        # Rapport de démarrage : coût d'import et de chargement de chaque backend
+        self.load_report = {}
+        
+        # Cache des prédictions unitaires (désactivé si PREDICTION_CACHE_SIZE vaut 0)
+        cache_size = self.config.get('PREDICTION_CACHE_SIZE', 0)
+        self.cache = PredictionCache(
+            max_size=cache_size,
+            ttl=self.config.get('PREDICTION_CACHE_TTL'),
+            precision=self.config.get('PREDICTION_CACHE_PRECISION', 2)) if cache_size > 0 else None
+        
+        # Regroupement optionnel des prédictions unitaires concurrentes en micro-lots
+        self.batcher = MicroBatcher(
+            self.predict_crop_batch,
+            max_batch_size=self.config.get('MICRO_BATCH_MAX_SIZE', 32),
+            max_wait=self.config.get('MICRO_BATCH_MAX_WAIT_MS', 2) / 1000.0
+        ) if self.config.get('MICRO_BATCHING_ENABLED', False) else None
+    
+    def ensure_loaded(self, model_type):
+        """
+        Charge le backend demandé s'il ne l'a pas encore été (une seule tentative par backend)
+        """
+        if model_type in self.load_report:
+            return
+        
+        loader = self._loaders.get(model_type)
+        if loader is None:
+            raise ValueError(f"Type de modèle inconnu: {model_type}")
+        
+        with self._load_locks[model_type]:
+            if model_type in self.load_report:
+                return
+            
+            start = time.perf_counter()
+            import_seconds = loader()
+            total_seconds = time.perf_counter() - start
+            
+            self.load_report[model_type] = {
+                'loaded': self.models[model_type] is not None,
+                'import_seconds': round(import_seconds, 4),
+                'load_seconds': round(total_seconds - import_seconds, 4)
+            }
+            metrics.MODEL_LOADED.labels(model_type).set(int(self.models[model_type] is not None))
+            metrics.MODEL_LOAD_SECONDS.labels(model_type, 'import').set(import_seconds)
+            metrics.MODEL_LOAD_SECONDS.labels(model_type, 'load').set(total_seconds - import_seconds)
+            
+            # Les prédictions en cache ne proviennent plus du modèle chargé
+            if self.cache is not None:
+                self.cache.invalidate(model_type)
+    
+    def warm_up(self, model_types):
+        """
+        Charge à l'avance les backends listés et journalise leur coût de démarrage
+        """
+        for model_type in model_types:
+            self.ensure_loaded(model_type)
+            report = self.load_report[model_type]
+            self.logger.info(
+                f"Backend {model_type}: chargé={report['loaded']}, "
+                f"import={report['import_seconds']:.3f}s, chargement={report['load_seconds']:.3f}s")
     
     def _load_models(self):
         """Charge tous les modèles disponibles"""
-        # Gradient Boosting (scikit-learn)
+        self.warm_up(list(self._loaders))
+    
+    def _load_gradient_boosting(self):
+        """Charge le modèle Gradient Boosting (scikit-learn), retourne la durée d'import"""
         try:
-            gb_model_dir = current_app.config['GB_MODEL_DIR']
+            gb_model_dir = self.config['GB_MODEL_DIR']
             gb_model_path = os.path.join(gb_model_dir, 'gradient_boosting_model.pkl')
             scaler_path = os.path.join(gb_model_dir, 'scaler.pkl')
             metadata_path = os.path.join(gb_model_dir, 'metadata.pkl')
@@ -57,57 +223,197 @@ class CropPredictor:
                 # Charger le scaler
                 with open(scaler_path, 'rb') as f:
                     self.scalers['gradient_boosting'] = pickle.load(f)
+                self.standardizers['gradient_boosting'] = FusedStandardizer.from_sklearn(
+                    self.scalers['gradient_boosting'])
                 
                 # Charger les métadonnées
                 with open(metadata_path, 'rb') as f:
                     self.metadata['gradient_boosting'] = pickle.load(f)
                 
-                current_app.logger.info("Modèle Gradient Boosting chargé avec succès.")
+                # Aplatir les arbres en tableaux NumPy pour l'évaluateur vectorisé
+                if self.config.get('GB_COMPILED', True):
+                    try:
+                        self.compiled_models['gradient_boosting'] = CompiledGradientBoosting.from_sklearn(
+                            self.models['gradient_boosting'],
+                            vectorized_max_rows=self.config.get('GB_VECTORIZED_MAX_ROWS', 32))
+                    except Exception as e:
+                        self.logger.warning(f"Compilation du modèle Gradient Boosting impossible, "
+                                                   f"utilisation de scikit-learn: {e}")
+                
+                self.logger.info("Modèle Gradient Boosting chargé avec succès.")
             else:
-                current_app.logger.warning("Modèle Gradient Boosting ou ses fichiers associés non trouvés.")
+                self.logger.warning("Modèle Gradient Boosting ou ses fichiers associés non trouvés.")
         except Exception as e:
-            current_app.logger.error(f"Erreur lors du chargement du modèle Gradient Boosting: {e}")
+            self.logger.error(f"Erreur lors du chargement du modèle Gradient Boosting: {e}")
+        return 0.0
+    
+    def _load_tensorflow_metadata(self):
+        """Charge les métadonnées TensorFlow (contiennent aussi le scaler), partagées avec TFLite"""
+        if self.metadata['tensorflow'] is not None:
+            return True
+        
+        tf_metadata_path = os.path.join(self.config['TF_MODEL_DIR'], 'metadata.pkl')
+        if not os.path.exists(tf_metadata_path):
+            return False
+        
+        with open(tf_metadata_path, 'rb') as f:
+            self.metadata['tensorflow'] = pickle.load(f)
         
-        # TensorFlow
+        # Récupérer le scaler des métadonnées
+        self.scalers['tensorflow'] = self.metadata['tensorflow']['scaler']
+        self.standardizers['tensorflow'] = FusedStandardizer.from_sklearn(self.scalers['tensorflow'])
+        return True
+    
+    def _load_tensorflow(self):
+        """Charge le modèle TensorFlow (Keras), retourne la durée d'import de TensorFlow"""
+        import_seconds = 0.0
         try:
-            tf_model_dir = current_app.config['TF_MODEL_DIR']
-            tf_model_path = os.path.join(tf_model_dir, 'best_model.h5')
-            tf_metadata_path = os.path.join(tf_model_dir, 'metadata.pkl')
+            tf_model_path = os.path.join(self.config['TF_MODEL_DIR'], 'best_model.h5')
             
-            if os.path.exists(tf_model_path) and os.path.exists(tf_metadata_path):
+            if os.path.exists(tf_model_path) and self._load_tensorflow_metadata():
+                tf, import_seconds = _import_tensorflow()
+                
                 # Charger le modèle
                 self.models['tensorflow'] = tf.keras.models.load_model(tf_model_path)
+                if self.config.get('FOLD_STANDARDIZATION', False):
+                    self._fold_keras_standardization(self.models['tensorflow'])
                 
-                # Charger les métadonnées (contient aussi le scaler)
-                with open(tf_metadata_path, 'rb') as f:
-                    self.metadata['tensorflow'] = pickle.load(f)
+                self.logger.info("Modèle TensorFlow chargé avec succès.")
+            else:
+                self.logger.warning("Modèle TensorFlow ou ses fichiers associés non trouvés.")
+        except Exception as e:
+            self.logger.error(f"Erreur lors du chargement du modèle TensorFlow: {e}")
+        return import_seconds
+    
+    def _load_tensorflow_lite(self, model_type='tensorflow_lite'):
+        """
+        Charge un modèle TensorFlow Lite (float32 ou variante à précision réduite),
+        retourne la durée d'import de l'interpréteur
+        
+        Les variantes sont construites depuis best_model.h5 par `python -m app.build_tflite`.
+        """
+        import_seconds = 0.0
+        try:
+            tflite_path = os.path.join(self.config['TF_MODEL_DIR'], TFLITE_MODEL_FILES[model_type])
+            
+            if model_type in TFLITE_VARIANTS and variant_is_stale(self.config, model_type):
+                self.logger.warning(f"{TFLITE_MODEL_FILES[model_type]} n'est pas construit depuis le best_model.h5 actuel : "
+                                    f"le reconstruire avec python -m app.build_tflite")
+            
+            if os.path.exists(tflite_path) and self._load_tensorflow_metadata():
+                # Charger le modèle TFLite une seule fois dans un pool d'interpréteurs réutilisables
+                pool = TFLiteInterpreterPool.from_path(
+                    tflite_path,
+                    max_size=self.config.get('TFLITE_POOL_SIZE'),
+                    num_threads=self.config.get('TFLITE_NUM_THREADS'))
                 
-                # Récupérer le scaler des métadonnées
-                self.scalers['tensorflow'] = self.metadata['tensorflow']['scaler']
+                # Construire un premier interpréteur : importe le runtime et valide le modèle
+                pool.warm_up()
+                import_seconds = pool.import_seconds
                 
-                current_app.logger.info("Modèle TensorFlow chargé avec succès.")
+                self.models[model_type] = pool
+                self.logger.info(f"Modèle TensorFlow Lite {TFLITE_MODEL_FILES[model_type]} chargé avec succès.")
             else:
-                current_app.logger.warning("Modèle TensorFlow ou ses fichiers associés non trouvés.")
+                self.logger.warning(f"Modèle TensorFlow Lite {TFLITE_MODEL_FILES[model_type]} non trouvé.")
         except Exception as e:
-            current_app.logger.error(f"Erreur lors du chargement du modèle TensorFlow: {e}")
+            self.logger.error(f"Erreur lors du chargement du modèle TensorFlow Lite {model_type}: {e}")
+        return import_seconds
+    
+    def _load_numpy(self):
+        """
+        Charge le modèle Keras exporté pour l'inférence NumPy (model.npz)
         
-        # TensorFlow Lite
+        L'archive est régénérée depuis best_model.h5 si elle est absente ou si l'empreinte
+        SHA-256 qu'elle enregistre n'est plus celle de best_model.h5 (les dates de
+        modification, non conservées par git, ne sont pas utilisées). TensorFlow n'est
+        jamais importé.
+        """
         try:
-            tflite_path = os.path.join(tf_model_dir, 'model.tflite')
+            tf_model_dir = self.config['TF_MODEL_DIR']
+            npz_path = os.path.join(tf_model_dir, 'model.npz')
+            h5_path = os.path.join(tf_model_dir, 'best_model.h5')
             
-            if os.path.exists(tflite_path):
-                # Charger le modèle TFLite
-                self.models['tensorflow_lite'] = tflite_path
-                current_app.logger.info("Modèle TensorFlow Lite chargé avec succès.")
-            else:
-                current_app.logger.warning("Modèle TensorFlow Lite non trouvé.")
+            if not self._load_tensorflow_metadata():
+                self.logger.warning("Métadonnées TensorFlow non trouvées pour le modèle NumPy.")
+                return 0.0
+            
+            model = NumpyDenseModel.from_npz(npz_path) if os.path.exists(npz_path) else None
+            
+            if os.path.exists(h5_path) and (model is None or not model.is_exported_from(h5_path)):
+                model = NumpyDenseModel.from_keras_h5(h5_path, self.metadata['tensorflow']['class_names'])
+                try:
+                    model.save(npz_path)
+                except OSError as e:
+                    self.logger.warning(f"Impossible d'enregistrer {npz_path}: {e}")
+            elif model is None:
+                self.logger.warning("Modèle NumPy et modèle Keras source non trouvés.")
+                return 0.0
+            
+            if model.class_names != list(self.metadata['tensorflow']['class_names']):
+                raise ValueError("Les classes du modèle NumPy ne correspondent pas aux métadonnées")
+            
+            if self.config.get('FOLD_STANDARDIZATION', False):
+                model = model.fold_input_standardization(self.standardizers['tensorflow'])
+                self.folded_standardization.add('numpy')
+            
+            self.models['numpy'] = model
+            self.logger.info("Modèle NumPy chargé avec succès.")
+        except Exception as e:
+            self.logger.error(f"Erreur lors du chargement du modèle NumPy: {e}")
+        return 0.0
+    
+    def _load_ensemble(self):
+        """Charge les backends listés dans ENSEMBLE_MODELS, retourne la durée d'import"""
+        members = []
+        import_seconds = 0.0
+        for model_type in self.config.get('ENSEMBLE_MODELS', []):
+            if model_type == 'ensemble' or model_type not in self._loaders:
+                self.logger.warning(f"Membre de l'ensemble ignoré: {model_type}")
+                continue
+            self.ensure_loaded(model_type)
+            import_seconds += self.load_report[model_type]['import_seconds']
+            if self.models[model_type] is not None:
+                members.append(model_type)
+        
+        if members:
+            self._ensemble_executor = ThreadPoolExecutor(
+                max_workers=len(members), thread_name_prefix='ensemble')
+            self.models['ensemble'] = tuple(members)
+            self.logger.info(f"Ensemble chargé avec les modèles: {', '.join(members)}")
+        else:
+            self.logger.warning("Aucun modèle de l'ensemble n'a pu être chargé.")
+        return import_seconds
+    
+    def _fold_keras_standardization(self, model):
+        """Replie la standardisation dans les poids de la première couche Dense du modèle Keras"""
+        try:
+            dense = next(layer for layer in model.layers if layer.weights)
+            if type(dense).__name__ != 'Dense' or not dense.use_bias:
+                raise ValueError(f"première couche {type(dense).__name__} (Dense avec biais attendue)")
+            kernel, bias = self.standardizers['tensorflow'].fold_into_dense(*dense.get_weights())
+            dense.set_weights([kernel.astype(np.float32), bias.astype(np.float32)])
+            self.folded_standardization.add('tensorflow')
         except Exception as e:
-            current_app.logger.error(f"Erreur lors du chargement du modèle TensorFlow Lite: {e}")
+            self.logger.warning(f"Standardisation non repliable dans le modèle TensorFlow: {e}")
+    
+    def _scale(self, scaler_name, input_data, dtype=np.float64, model_type=None):
+        """
+        Standardise les entrées avec la moyenne et l'écart-type du scaler (étape 'scale' de la requête)
+        
+        Les modèles ayant replié la standardisation dans leurs poids reçoivent les
+        caractéristiques brutes, seulement converties en `dtype`.
+        """
+        with timing.stage('scale'):
+            if model_type in self.folded_standardization:
+                return np.asarray(input_data, dtype=dtype)
+            return self.standardizers[scaler_name].transform(input_data, dtype)
     
     def predict_crop_sklearn(self, N, P, K, temperature, humidity, ph, rainfall):
         """
         Prédit la culture en utilisant le modèle scikit-learn
         """
+        self.ensure_loaded('gradient_boosting')
+        
         if self.models['gradient_boosting'] is None or self.scalers['gradient_boosting'] is None:
             raise ValueError("Le modèle Gradient Boosting n'est pas chargé")
         
@@ -115,11 +421,10 @@ class CropPredictor:
         input_data = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
         
         # Standardiser les données d'entrée
-        input_data_scaled = self.scalers['gradient_boosting'].transform(input_data)
+        input_data_scaled = self._scale('gradient_boosting', input_data)
         
-        # Faire la prédiction
-        prediction = self.models['gradient_boosting'].predict(input_data_scaled)
-        probabilities = self.models['gradient_boosting'].predict_proba(input_data_scaled)
+        # Faire la prédiction (étiquette et probabilités en un seul passage)
+        prediction, probabilities = self._predict_with_proba_gb(input_data_scaled)
         
         # Trouver l'indice de la classe prédite
         predicted_idx = np.argmax(probabilities[0])
@@ -127,10 +432,24 @@ class CropPredictor:
         
         return prediction[0], confidence
     
+    def _predict_with_proba_gb(self, input_data_scaled):
+        """
+        Retourne étiquettes et probabilités du Gradient Boosting, via l'évaluateur compilé si disponible
+        """
+        compiled = self.compiled_models['gradient_boosting']
+        if compiled is not None:
+            return compiled.predict_with_proba(input_data_scaled)
+        
+        model = self.models['gradient_boosting']
+        probabilities = model.predict_proba(input_data_scaled)
+        return model.classes_[np.argmax(probabilities, axis=1)], probabilities
+    
     def predict_crop_tensorflow(self, N, P, K, temperature, humidity, ph, rainfall):
         """
         Prédit la culture en utilisant le modèle TensorFlow
         """
+        self.ensure_loaded('tensorflow')
+        
         if self.models['tensorflow'] is None or self.scalers['tensorflow'] is None:
             raise ValueError("Le modèle TensorFlow n'est pas chargé")
         
@@ -138,7 +457,7 @@ class CropPredictor:
         input_data = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
         
         # Standardiser les données d'entrée
-        input_data_scaled = self.scalers['tensorflow'].transform(input_data)
+        input_data_scaled = self._scale('tensorflow', input_data, model_type='tensorflow')
         
         # Faire la prédiction
         prediction_proba = self.models['tensorflow'].predict(input_data_scaled)
@@ -150,58 +469,382 @@ class CropPredictor:
         
         return predicted_crop, confidence
     
-    def predict_crop_tflite(self, N, P, K, temperature, humidity, ph, rainfall):
+    def predict_crop_tflite(self, N, P, K, temperature, humidity, ph, rainfall, model_type='tensorflow_lite'):
         """
-        Prédit la culture en utilisant le modèle TensorFlow Lite
+        Prédit la culture en utilisant le modèle TensorFlow Lite (ou l'une de ses variantes)
         """
-        if self.models['tensorflow_lite'] is None or self.scalers['tensorflow'] is None:
-            raise ValueError("Le modèle TensorFlow Lite n'est pas chargé")
-        
-        # Charger l'interpréteur TFLite
-        interpreter = tf.lite.Interpreter(model_path=self.models['tensorflow_lite'])
-        interpreter.allocate_tensors()
+        self.ensure_loaded(model_type)
         
-        # Obtenir les détails des entrées et sorties
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+        if self.models[model_type] is None or self.scalers['tensorflow'] is None:
+            raise ValueError(f"Le modèle TensorFlow Lite {model_type} n'est pas chargé")
         
         # Créer un tableau avec les valeurs d'entrée
         input_data = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
         
         # Standardiser les données d'entrée
-        input_data_scaled = self.scalers['tensorflow'].transform(input_data).astype(np.float32)
+        input_data_scaled = self._scale('tensorflow', input_data, np.float32)
+        
+        # Exécuter l'inférence avec un interpréteur du pool
+        prediction_proba = self.models[model_type].invoke(input_data_scaled)
+        prediction_idx = np.argmax(prediction_proba[0])
+        
+        # Convertir l'indice en nom de classe
+        predicted_crop = self.metadata['tensorflow']['class_names'][prediction_idx]
+        confidence = prediction_proba[0][prediction_idx]
+        
+        return predicted_crop, confidence
+    
+    def predict_crop_numpy(self, N, P, K, temperature, humidity, ph, rainfall):
+        """
+        Prédit la culture avec le réseau Keras évalué en NumPy pur
+        """
+        self.ensure_loaded('numpy')
         
-        # Définir les données d'entrée
-        interpreter.set_tensor(input_details[0]['index'], input_data_scaled)
+        if self.models['numpy'] is None or self.scalers['tensorflow'] is None:
+            raise ValueError("Le modèle NumPy n'est pas chargé")
         
-        # Exécuter l'inférence
-        interpreter.invoke()
+        # Créer un tableau avec les valeurs d'entrée
+        input_data = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
         
-        # Obtenir les résultats
-        prediction_proba = interpreter.get_tensor(output_details[0]['index'])
+        # Standardiser les données d'entrée
+        input_data_scaled = self._scale('tensorflow', input_data, np.float32, 'numpy')
+        
+        # Propagation avant
+        prediction_proba = self.models['numpy'].predict_proba(input_data_scaled)
         prediction_idx = np.argmax(prediction_proba[0])
         
         # Convertir l'indice en nom de classe
-        predicted_crop = self.metadata['tensorflow']['class_names'][prediction_idx]
+        predicted_crop = self.models['numpy'].class_names[prediction_idx]
         confidence = prediction_proba[0][prediction_idx]
         
         return predicted_crop, confidence
     
+    def predict_proba_batch_sklearn(self, input_data):
+        """
+        Calcule les probabilités d'un lot d'échantillons avec le modèle scikit-learn
+        """
+        self.ensure_loaded('gradient_boosting')
+        
+        if self.models['gradient_boosting'] is None or self.scalers['gradient_boosting'] is None:
+            raise ValueError("Le modèle Gradient Boosting n'est pas chargé")
+        
+        # Une seule standardisation et un seul passage dans le modèle pour tout le lot
+        input_data_scaled = self._scale('gradient_boosting', input_data)
+        _, probabilities = self._predict_with_proba_gb(input_data_scaled)
+        
+        return probabilities, list(self.models['gradient_boosting'].classes_)
+    
+    def predict_proba_batch_tensorflow(self, input_data):
+        """
+        Calcule les probabilités d'un lot d'échantillons avec le modèle TensorFlow
+        """
+        self.ensure_loaded('tensorflow')
+        
+        if self.models['tensorflow'] is None or self.scalers['tensorflow'] is None:
+            raise ValueError("Le modèle TensorFlow n'est pas chargé")
+        
+        input_data_scaled = self._scale('tensorflow', input_data, np.float32, 'tensorflow')
+        
+        # Appel direct du modèle : évite la boucle de prédiction de Keras
+        probabilities = self.models['tensorflow'](input_data_scaled, training=False).numpy()
+        
+        return probabilities, self.metadata['tensorflow']['class_names']
+    
+    def predict_proba_batch_tflite(self, input_data, model_type='tensorflow_lite'):
+        """
+        Calcule les probabilités d'un lot d'échantillons avec le modèle TensorFlow Lite (ou l'une de ses variantes)
+        """
+        self.ensure_loaded(model_type)
+        
+        if self.models[model_type] is None or self.scalers['tensorflow'] is None:
+            raise ValueError(f"Le modèle TensorFlow Lite {model_type} n'est pas chargé")
+        
+        input_data_scaled = self._scale('tensorflow', input_data, np.float32)
+        
+        # L'interpréteur du pool est redimensionné à la taille du lot si nécessaire
+        probabilities = self.models[model_type].invoke(input_data_scaled)
+        
+        return probabilities, self.metadata['tensorflow']['class_names']
+    
+    def predict_proba_batch_numpy(self, input_data):
+        """
+        Calcule les probabilités d'un lot d'échantillons avec le modèle NumPy
+        """
+        self.ensure_loaded('numpy')
+        
+        if self.models['numpy'] is None or self.scalers['tensorflow'] is None:
+            raise ValueError("Le modèle NumPy n'est pas chargé")
+        
+        input_data_scaled = self._scale('tensorflow', input_data, np.float32, 'numpy')
+        probabilities = self.models['numpy'].predict_proba(input_data_scaled)
+        
+        return probabilities, self.models['numpy'].class_names
+    
+    def predict_proba_batch_members(self, input_data):
+        """
+        Évalue simultanément chaque membre de l'ensemble sur le même lot (un thread par modèle)
+        
+        Returns:
+            tuple: (liste des noms de classes communs, dict type de modèle -> tableau n x classes
+                    des probabilités, colonnes alignées sur ces noms)
+        """
+        self.ensure_loaded('ensemble')
+        
+        members = self.models['ensemble']
+        if members is None:
+            raise ValueError("Aucun modèle de l'ensemble n'est chargé")
+        
+        futures = {model_type: self._ensemble_executor.submit(self.predict_proba_batch, input_data, model_type)
+                   for model_type in members}
+        outputs = {model_type: future.result() for model_type, future in futures.items()}
+        
+        # Les modèles n'ordonnent pas forcément leurs classes de la même façon
+        class_names = sorted({str(name) for _, names in outputs.values() for name in names})
+        columns = {name: i for i, name in enumerate(class_names)}
+        aligned = {}
+        for model_type, (probabilities, names) in outputs.items():
+            member_proba = np.zeros((len(input_data), len(class_names)))
+            member_proba[:, [columns[str(name)] for name in names]] = probabilities
+            aligned[model_type] = member_proba
+        return class_names, aligned
+    
+    def combine_ensemble(self, member_probabilities):
+        """
+        Combine les probabilités des membres selon ENSEMBLE_METHOD et ENSEMBLE_WEIGHTS
+        
+        'average' : moyenne pondérée des probabilités ; 'vote' : part pondérée des votes
+        (classe la plus probable de chaque membre), les égalités étant départagées par la
+        moyenne des probabilités.
+        """
+        weights = self.config.get('ENSEMBLE_WEIGHTS') or {}
+        total_weight = sum(weights.get(model_type, 1.0) for model_type in member_probabilities)
+        
+        average = sum(weights.get(model_type, 1.0) * probabilities
+                      for model_type, probabilities in member_probabilities.items()) / total_weight
+        if self.config.get('ENSEMBLE_METHOD', 'average') != 'vote':
+            return average
+        
+        votes = np.zeros_like(average)
+        rows = np.arange(len(average))
+        for model_type, probabilities in member_probabilities.items():
+            votes[rows, np.argmax(probabilities, axis=1)] += weights.get(model_type, 1.0)
+        return votes / total_weight + average * 1e-9
+    
+    def predict_proba_batch_ensemble(self, input_data):
+        """
+        Calcule les probabilités combinées des membres de l'ensemble pour un lot d'échantillons
+        """
+        class_names, member_probabilities = self.predict_proba_batch_members(input_data)
+        return self.combine_ensemble(member_probabilities), class_names
+    
+    def predict_ensemble_batch(self, input_data, k=1, chunk_size=1024):
+        """
+        Prédit avec l'ensemble et détaille la réponse de chaque membre
+        
+        Returns:
+            list: pour chaque échantillon, dict avec 'ranking' (k tuples (culture, probabilité)),
+                  'members' (type de modèle -> (culture, confiance)) et 'agreement' (part des
+                  membres d'accord avec la culture retenue)
+        """
+        input_data = np.asarray(input_data, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        
+        results = []
+        for start in range(0, len(input_data), chunk_size):
+            chunk = input_data[start:start + chunk_size]
+            with metrics.track_inference('ensemble', 'batch', len(chunk)), timing.stage('inference'):
+                class_names, member_probabilities = self.predict_proba_batch_members(chunk)
+                probabilities = self.combine_ensemble(member_probabilities)
+            names = np.asarray(class_names)
+            
+            top_idx = top_k_indices(probabilities, k)
+            top_proba = np.take_along_axis(probabilities, top_idx, axis=1)
+            member_idx = {model_type: np.argmax(proba, axis=1) for model_type, proba in member_probabilities.items()}
+            
+            for row in range(len(probabilities)):
+                members = {model_type: (str(names[idx[row]]), float(member_probabilities[model_type][row, idx[row]]))
+                           for model_type, idx in member_idx.items()}
+                agreeing = sum(1 for idx in member_idx.values() if idx[row] == top_idx[row, 0])
+                results.append({
+                    'ranking': list(zip(names[top_idx[row]].tolist(), top_proba[row].tolist())),
+                    'members': members,
+                    'agreement': agreeing / len(member_idx)
+                })
+        return results
+    
+    def predict_proba_batch(self, input_data, model_type='gradient_boosting'):
+        """
+        Calcule les probabilités d'un lot d'échantillons (tableau n x 7) avec le modèle spécifié
+        
+        Returns:
+            tuple: (tableau n x classes des probabilités, liste des noms de classes)
+        """
+        input_data = np.asarray(input_data, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        
+        with metrics.track_inference(model_type, 'batch', len(input_data)), timing.stage('inference'):
+            if model_type == 'gradient_boosting':
+                return self.predict_proba_batch_sklearn(input_data)
+            elif model_type == 'tensorflow':
+                return self.predict_proba_batch_tensorflow(input_data)
+            elif model_type in TFLITE_MODEL_FILES:
+                return self.predict_proba_batch_tflite(input_data, model_type)
+            elif model_type == 'numpy':
+                return self.predict_proba_batch_numpy(input_data)
+            elif model_type == 'ensemble':
+                return self.predict_proba_batch_ensemble(input_data)
+            else:
+                raise ValueError(f"Type de modèle inconnu: {model_type}")
+    
+    def predict_crop_batch(self, input_data, model_type='gradient_boosting', chunk_size=1024):
+        """
+        Prédit les cultures d'un lot d'échantillons, par blocs de `chunk_size` lignes
+        
+        Returns:
+            tuple: (liste des cultures prédites, tableau des niveaux de confiance)
+        """
+        input_data = np.asarray(input_data, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        
+        crops = []
+        confidences = []
+        for start in range(0, len(input_data), chunk_size):
+            probabilities, class_names = self.predict_proba_batch(
+                input_data[start:start + chunk_size], model_type)
+            
+            # Classe la plus probable et sa confiance pour chaque ligne
+            predicted_idx = np.argmax(probabilities, axis=1)
+            confidences.append(probabilities[np.arange(len(predicted_idx)), predicted_idx])
+            crops.extend(np.asarray(class_names)[predicted_idx].tolist())
+        
+        if not confidences:
+            return [], np.empty(0)
+        return crops, np.concatenate(confidences)
+    
+    def predict_top_k_batch(self, input_data, k, model_type='gradient_boosting', chunk_size=1024):
+        """
+        Retourne les k cultures les plus probables de chaque échantillon, en un passage par bloc
+        
+        Returns:
+            list: pour chaque échantillon, liste de tuples (culture, probabilité) par probabilité décroissante
+        """
+        input_data = np.asarray(input_data, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        
+        rankings = []
+        for start in range(0, len(input_data), chunk_size):
+            probabilities, class_names = self.predict_proba_batch(
+                input_data[start:start + chunk_size], model_type)
+            
+            top_idx = top_k_indices(probabilities, k)
+            top_crops = np.asarray(class_names)[top_idx].tolist()
+            top_proba = np.take_along_axis(probabilities, top_idx, axis=1).tolist()
+            rankings.extend(list(zip(crops, proba)) for crops, proba in zip(top_crops, top_proba))
+        return rankings
+    
+    def predict_crop_top_k(self, N, P, K, temperature, humidity, ph, rainfall, k, model_type='gradient_boosting'):
+        """
+        Retourne les k cultures les plus probables pour un échantillon
+        
+        Returns:
+            list: tuples (culture, probabilité) par probabilité décroissante
+        """
+        return self.predict_top_k_batch([[N, P, K, temperature, humidity, ph, rainfall]], k, model_type)[0]
+    
+    def close(self):
+        """Arrête les threads de l'instance (micro-lots, ensemble) une fois remplacée"""
+        if self.batcher is not None:
+            self.batcher.shutdown()
+        if self._ensemble_executor is not None:
+            self._ensemble_executor.shutdown(wait=False)
+    
+    def get_stats(self):
+        """
+        Retourne les statistiques d'exécution (chargement, pool TFLite, cache, micro-lots)
+        """
+        stats = {'backends': dict(self.load_report)}
+        if self.models['tensorflow_lite'] is not None:
+            stats['tflite_pool'] = self.models['tensorflow_lite'].stats()
+        variant_pools = {model_type: self.models[model_type].stats()
+                         for model_type in TFLITE_VARIANTS if self.models[model_type] is not None}
+        if variant_pools:
+            stats['tflite_variant_pools'] = variant_pools
+        if self.cache is not None:
+            stats['prediction_cache'] = self.cache.stats()
+        if self.batcher is not None:
+            stats['micro_batching'] = self.batcher.stats()
+        return stats
+    
     def predict_crop(self, N, P, K, temperature, humidity, ph, rainfall, model_type='gradient_boosting'):
+        """
+        Prédit la culture en utilisant le modèle spécifié (via le cache des prédictions s'il est actif)
+        """
+        # Charger le backend avant la consultation du cache (le chargement invalide ses entrées)
+        self.ensure_loaded(model_type)
+        
+        if self.cache is None:
+            return self._predict_crop_uncached(N, P, K, temperature, humidity, ph, rainfall, model_type)
+        
+        return self.cache.get_or_compute(
+            model_type, (N, P, K, temperature, humidity, ph, rainfall),
+            lambda: self._predict_crop_uncached(N, P, K, temperature, humidity, ph, rainfall, model_type))
+    
+    def _predict_crop_uncached(self, N, P, K, temperature, humidity, ph, rainfall, model_type):
         """
         Prédit la culture en utilisant le modèle spécifié
         """
-        if model_type == 'gradient_boosting':
-            return self.predict_crop_sklearn(N, P, K, temperature, humidity, ph, rainfall)
-        elif model_type == 'tensorflow':
-            return self.predict_crop_tensorflow(N, P, K, temperature, humidity, ph, rainfall)
-        elif model_type == 'tensorflow_lite':
-            return self.predict_crop_tflite(N, P, K, temperature, humidity, ph, rainfall)
-        else:
-            raise ValueError(f"Type de modèle inconnu: {model_type}")
+        if self.batcher is not None:
+            # Inférence groupée avec les autres requêtes concurrentes du même modèle
+            return self.batcher.submit(model_type, [N, P, K, temperature, humidity, ph, rainfall])
+        
+        if model_type == 'ensemble':
+            crops, confidences = self.predict_crop_batch([[N, P, K, temperature, humidity, ph, rainfall]], 'ensemble')
+            return crops[0], confidences[0]
+        
+        with metrics.track_inference(model_type, 'single', 1), timing.stage('inference'):
+            if model_type == 'gradient_boosting':
+                return self.predict_crop_sklearn(N, P, K, temperature, humidity, ph, rainfall)
+            elif model_type == 'tensorflow':
+                return self.predict_crop_tensorflow(N, P, K, temperature, humidity, ph, rainfall)
+            elif model_type in TFLITE_MODEL_FILES:
+                return self.predict_crop_tflite(N, P, K, temperature, humidity, ph, rainfall, model_type)
+            elif model_type == 'numpy':
+                return self.predict_crop_numpy(N, P, K, temperature, humidity, ph, rainfall)
+            else:
+                raise ValueError(f"Type de modèle inconnu: {model_type}")
 
 def get_predictor():
     """
     Retourne l'instance unique de CropPredictor
     """
-    return CropPredictor.get_instance()
\ No newline at end of file
+    return CropPredictor.get_instance()
+
+@metrics.REGISTRY.register_collector
+def _collect_predictor_metrics():
+    """Compteurs du cache des prédictions, du pool TFLite et des micro-lots du prédicteur"""
+    predictor = CropPredictor._instance
+    if predictor is None:
+        return []
+    
+    families = []
+    if predictor.cache is not None:
+        stats = predictor.cache.stats()
+        families.append(('agropredict_prediction_cache_entries', 'gauge',
+                         'Entrées du cache des prédictions', [({}, stats['size'])]))
+        families.append(('agropredict_prediction_cache_events_total', 'counter',
+                         'Événements du cache des prédictions',
+                         [({'event': event}, stats[event])
+                          for event in ('hits', 'misses', 'evictions', 'expirations', 'coalesced')]))
+    pools = {model_type: predictor.models[model_type].stats()
+             for model_type in TFLITE_MODEL_FILES if predictor.models[model_type] is not None}
+    if pools:
+        families.append(('agropredict_tflite_pool_interpreters', 'gauge', 'Interpréteurs TFLite du pool',
+                         [({'model_type': model_type, 'state': state}, stats[key])
+                          for model_type, stats in pools.items()
+                          for state, key in (('total', 'size'), ('idle', 'idle'))]))
+        families.append(('agropredict_tflite_pool_acquisitions_total', 'counter',
+                         "Acquisitions d'un interpréteur TFLite (réutilisé ou créé)",
+                         [({'model_type': model_type, 'result': result}, stats[key])
+                          for model_type, stats in pools.items()
+                          for result, key in (('hit', 'hits'), ('miss', 'misses'))]))
+    if predictor.batcher is not None:
+        stats = predictor.batcher.stats()
+        families.append(('agropredict_micro_batching_total', 'counter', 'Requêtes et lots des micro-lots',
+                         [({'event': event}, stats[event]) for event in ('requests', 'batches', 'errors')]))
+    return families
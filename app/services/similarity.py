@@ -0,0 +1,117 @@
+import os
+import threading
+
+import numpy as np
+from flask import current_app
+
+from app.services.crop_data import FEATURE_COLUMNS, get_catalog
+from app.services.datasets import get_dataset
+
+class SimilarityIndex:
+    """
+    Index des échantillons du dataset pour la recherche des profils les plus proches
+
+    Les caractéristiques sont standardisées (moyenne et écart type du dataset) pour que
+    chaque variable pèse autant dans la distance euclidienne. Les distances d'un lot de
+    requêtes à tous les échantillons sont calculées en une multiplication matricielle
+    (||q||² - 2 q·x + ||x||²), puis les k plus proches sont extraits par sélection partielle.
+    """
+
+    def __init__(self, features, labels, source=None):
+        self.source = source or {}
+        self.features = np.ascontiguousarray(features, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=object)
+
+        self.mean = self.features.mean(axis=0)
+        scale = self.features.std(axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self._samples = self.standardize(self.features)
+        self._sample_norms = np.einsum('ij,ij->i', self._samples, self._samples)
+
+        # Centroïdes par culture dans l'espace standardisé
+        self.crops, inverse = np.unique(self.labels.astype(str), return_inverse=True)
+        counts = np.bincount(inverse)
+        self._centroids = np.zeros((len(self.crops), self.features.shape[1]))
+        np.add.at(self._centroids, inverse, self._samples)
+        self._centroids /= counts[:, None]
+        self._centroid_norms = np.einsum('ij,ij->i', self._centroids, self._centroids)
+
+    def __len__(self):
+        return len(self.features)
+
+    @classmethod
+    def from_dataset(cls, dataset, source=None):
+        """Construit l'index depuis le dataset en colonnes (ColumnarDataset)"""
+        return cls(dataset.matrix(FEATURE_COLUMNS), dataset.decode('label').astype(object), source)
+
+    def standardize(self, values):
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+    @staticmethod
+    def _nearest(queries, query_norms, points, point_norms, k):
+        """Retourne (indices, distances) des k points les plus proches de chaque requête"""
+        squared = query_norms[:, None] - 2.0 * queries @ points.T + point_norms[None, :]
+        k = min(k, len(points))
+        if k < len(points):
+            candidates = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(points)), squared.shape)
+        candidate_distances = np.take_along_axis(squared, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1, kind='stable')
+        indices = np.take_along_axis(candidates, order, axis=1)
+        distances = np.sqrt(np.maximum(np.take_along_axis(candidate_distances, order, axis=1), 0.0))
+        return indices, distances
+
+    def query(self, values, k=5, k_crops=3, chunk_size=1024):
+        """
+        Recherche les échantillons et les cultures les plus proches de chaque requête
+
+        Args:
+            values: tableau (n, 7) des caractéristiques brutes, dans l'ordre de FEATURE_COLUMNS
+
+        Returns:
+            tuple: (indices (n, k) des échantillons, distances (n, k),
+                    indices (n, k_crops) des cultures dans `crops`, distances (n, k_crops))
+        """
+        queries = self.standardize(np.asarray(values, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS)))
+        results = ([], [], [], [])
+        for start in range(0, len(queries), chunk_size):
+            block = queries[start:start + chunk_size]
+            norms = np.einsum('ij,ij->i', block, block)
+            sample_idx, sample_dist = self._nearest(block, norms, self._samples, self._sample_norms, k)
+            crop_idx, crop_dist = self._nearest(block, norms, self._centroids, self._centroid_norms, k_crops)
+            for result, array in zip(results, (sample_idx, sample_dist, crop_idx, crop_dist)):
+                result.append(array)
+        return tuple(np.concatenate(arrays) for arrays in results)
+
+# Index courant, reconstruit lorsque le catalogue des cultures l'est (changement du dataset)
+_index = None
+_index_lock = threading.Lock()
+
+def get_similarity_index():
+    """
+    Retourne l'index de similarité, construit au premier appel depuis le dataset
+
+    Returns:
+        SimilarityIndex: l'index, ou None si le dataset est absent ou le catalogue vide
+    """
+    global _index
+
+    catalog = get_catalog()
+    dataset_path = current_app.config['DATASET_PATH']
+    if not len(catalog) or not os.path.exists(dataset_path):
+        return None
+
+    source = catalog.source
+    index = _index
+    if index is not None and source and index.source == source:
+        return index
+
+    with _index_lock:
+        if _index is not None and source and _index.source == source:
+            return _index
+
+        dataset = get_dataset(dataset_path, current_app.config.get('DATASET_SNAPSHOT_DIR'), current_app.logger)
+        _index = SimilarityIndex.from_dataset(dataset, source)
+        current_app.logger.info(f"Index de similarité construit sur {len(_index)} échantillons")
+        return _index
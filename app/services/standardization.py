@@ -0,0 +1,49 @@
+import numpy as np
+
+class FusedStandardizer:
+    """
+    Standardisation (x - moyenne) / écart-type d'un StandardScaler, sans scikit-learn
+
+    La moyenne et l'écart-type sont extraits une seule fois en tableaux NumPy ; transform()
+    applique les deux opérations en place sur une seule copie de l'entrée, sans la
+    validation d'entrée de scikit-learn (plus coûteuse que le calcul sur une ligne). Les
+    opérations et leur ordre sont ceux de StandardScaler.transform : les résultats sont
+    identiques au bit près.
+    """
+
+    __slots__ = ('mean', 'scale')
+
+    def __init__(self, mean, scale):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float64)
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        """Extrait moyenne et écart-type d'un StandardScaler ajusté (with_mean/with_std compris)"""
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        return cls(mean, scale)
+
+    def transform(self, input_data, dtype=np.float64):
+        """
+        Standardise un tableau (n x caractéristiques) sans modifier l'entrée
+
+        Args:
+            dtype: type du résultat ; le calcul est fait en float64 puis converti,
+                comme scaler.transform(x).astype(dtype)
+        """
+        x = np.subtract(input_data, self.mean, dtype=np.float64)
+        np.divide(x, self.scale, out=x)
+        return x if dtype == np.float64 else x.astype(dtype)
+
+    def fold_into_dense(self, kernel, bias):
+        """
+        Replie la standardisation dans une couche dense : ((x - m) / s) @ W + b = x @ W' + b'
+
+        Returns:
+            tuple: (W' = W / s[:, None], b' = b - (m / s) @ W), en float64
+        """
+        kernel = np.asarray(kernel, dtype=np.float64)
+        bias = np.asarray(bias, dtype=np.float64)
+        return kernel / self.scale[:, np.newaxis], bias - (self.mean / self.scale) @ kernel
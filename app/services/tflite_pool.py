@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Classe d'interpréteur importée à la demande (tflite_runtime si disponible, sinon TensorFlow)
+_interpreter_class = None
+
+def _import_interpreter_class():
+    """
+    Importe la classe Interpreter la plus légère disponible
+
+    Returns:
+        tuple: (classe Interpreter, durée de l'import en secondes, 0 si déjà importée)
+    """
+    global _interpreter_class
+    if _interpreter_class is not None:
+        return _interpreter_class, 0.0
+
+    start = time.perf_counter()
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    _interpreter_class = Interpreter
+    return Interpreter, time.perf_counter() - start
+
+class _PooledInterpreter:
+    """
+    Interpréteur TFLite alloué avec ses indices d'entrée/sortie mis en cache
+    """
+    __slots__ = ('interpreter', 'input_index', 'output_index', 'input_shape')
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        input_details = interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.output_index = interpreter.get_output_details()[0]['index']
+        self.input_shape = tuple(input_details['shape'])
+
+class TFLiteInterpreterPool:
+    """
+    Pool thread-safe d'interpréteurs TFLite construits une seule fois à partir du modèle en mémoire
+
+    Chaque thread emprunte un interpréteur le temps d'une inférence puis le rend au pool :
+    le nombre d'interpréteurs correspond au nombre de threads qui infèrent simultanément.
+    """
+
+    def __init__(self, model_content, max_size=None, num_threads=None):
+        self._model_content = model_content
+        self._num_threads = num_threads
+        self.max_size = max_size
+        self._free = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.import_seconds = 0.0
+
+    @classmethod
+    def from_path(cls, model_path, **kwargs):
+        """Lit le fichier .tflite une seule fois et construit le pool"""
+        with open(model_path, 'rb') as f:
+            return cls(f.read(), **kwargs)
+
+    def _create(self):
+        Interpreter, import_seconds = _import_interpreter_class()
+        self.import_seconds += import_seconds
+        interpreter = Interpreter(model_content=self._model_content,
+                                  num_threads=self._num_threads)
+        interpreter.allocate_tensors()
+        return _PooledInterpreter(interpreter)
+
+    def _acquire(self):
+        try:
+            pooled = self._free.get_nowait()
+            with self._lock:
+                self.hits += 1
+            return pooled
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self.max_size is None or self._size < self.max_size
+            if can_create:
+                self._size += 1
+                self.misses += 1
+
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+
+        # Pool plein : attendre qu'un interpréteur soit rendu
+        pooled = self._free.get()
+        with self._lock:
+            self.hits += 1
+        return pooled
+
+    def warm_up(self):
+        """Construit un premier interpréteur et le place dans le pool"""
+        with self.lease():
+            pass
+
+    @contextmanager
+    def lease(self):
+        """Emprunte un interpréteur pour la durée du bloc"""
+        pooled = self._acquire()
+        try:
+            yield pooled
+        finally:
+            self._free.put(pooled)
+
+    def invoke(self, input_data):
+        """
+        Exécute l'inférence sur un tableau (n x caractéristiques) en float32
+
+        L'entrée n'est redimensionnée (resize_tensor_input) que si la taille du lot change.
+        """
+        input_data = np.ascontiguousarray(input_data, dtype=np.float32)
+
+        with self.lease() as pooled:
+            interpreter = pooled.interpreter
+            if input_data.shape != pooled.input_shape:
+                interpreter.resize_tensor_input(pooled.input_index, input_data.shape)
+                interpreter.allocate_tensors()
+                pooled.input_shape = input_data.shape
+
+            interpreter.set_tensor(pooled.input_index, input_data)
+            interpreter.invoke()
+
+            # get_tensor renvoie une copie : le résultat reste valide après restitution
+            return interpreter.get_tensor(pooled.output_index)
+
+    def stats(self):
+        """Retourne la taille du pool et les compteurs de réutilisation"""
+        with self._lock:
+            return {
+                'size': self._size,
+                'idle': self._free.qsize(),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,144 @@
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from app.services.numpy_model import file_sha256
+
+# Modèles TensorFlow Lite servis : type de modèle -> fichier dans TF_MODEL_DIR
+TFLITE_MODEL_FILES = {
+    'tensorflow_lite': 'model.tflite',
+    'tensorflow_lite_float16': 'model_float16.tflite',
+    'tensorflow_lite_int8': 'model_int8.tflite'
+}
+
+# Variantes à précision réduite construites depuis best_model.h5 : type de modèle -> quantification
+TFLITE_VARIANTS = {
+    'tensorflow_lite_float16': 'float16',
+    'tensorflow_lite_int8': 'int8'
+}
+
+# Empreinte SHA-256 de best_model.h5 dont chaque variante a été construite
+VARIANTS_MANIFEST = 'tflite_variants.json'
+
+def representative_rows(dataset_path, scaler, count=200, seed=0, snapshot_dir=None):
+    """
+    Lignes du dataset standardisées comme en production (entrées du modèle, float32)
+
+    Les lignes sont tirées sans remise, en nombre égal pour chaque culture, afin que
+    toutes les classes soient représentées dans l'étalonnage.
+    """
+    from app.services.datasets import get_dataset
+    from app.services.predictor import FEATURE_NAMES
+
+    dataset = get_dataset(dataset_path, snapshot_dir)
+    labels = np.asarray(dataset['label'])
+    n_labels = len(dataset.categories['label'])
+    per_label = max(1, count // n_labels)
+    rng = np.random.default_rng(seed)
+    rows = np.concatenate([rng.choice(np.flatnonzero(labels == code), min(per_label, np.sum(labels == code)),
+                                      replace=False) for code in range(n_labels)])
+    return scaler.transform(dataset.matrix(FEATURE_NAMES)[np.sort(rows)]).astype(np.float32)
+
+def convert_keras_h5(h5_path, quantization, representative_data=None):
+    """
+    Convertit un modèle Keras (.h5) en modèle TensorFlow Lite à précision réduite
+
+    Args:
+        quantization (str): 'float16' (poids en float16) ou 'int8' (poids en int8,
+            activations quantifiées dynamiquement à l'exécution)
+        representative_data (np.ndarray): entrées standardisées ; pour 'int8', étalonne
+            aussi les activations (noyaux entiers, entrée et sortie restant en float32)
+
+    Returns:
+        bytes: contenu du fichier .tflite
+    """
+    from app.services.predictor import _import_tensorflow
+
+    tf, _ = _import_tensorflow()
+    model = tf.keras.models.load_model(h5_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if representative_data is not None:
+            converter.representative_dataset = lambda: ([row[np.newaxis]] for row in representative_data)
+    else:
+        raise ValueError(f"Quantification inconnue: {quantization}")
+    return converter.convert()
+
+def _read_manifest(tf_model_dir):
+    try:
+        with open(os.path.join(tf_model_dir, VARIANTS_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def variant_is_stale(config, model_type):
+    """
+    Vrai si la variante est absente ou n'a pas été construite depuis le best_model.h5 actuel
+
+    L'empreinte du contenu est comparée (VARIANTS_MANIFEST) : les dates de modification ne
+    sont pas conservées par git.
+    """
+    tf_model_dir = config['TF_MODEL_DIR']
+    variant_path = os.path.join(tf_model_dir, TFLITE_MODEL_FILES[model_type])
+    h5_path = os.path.join(tf_model_dir, 'best_model.h5')
+    if not os.path.exists(variant_path):
+        return True
+    return os.path.exists(h5_path) and _read_manifest(tf_model_dir).get(model_type) != file_sha256(h5_path)
+
+def build_variants(config, model_types=None, calibrate=False, logger=None):
+    """
+    Construit les variantes TensorFlow Lite à précision réduite dans TF_MODEL_DIR
+
+    Chaque fichier est écrit sous un nom temporaire puis renommé : la surveillance des
+    modèles (MODEL_WATCH_INTERVAL) ne voit jamais un fichier incomplet.
+
+    Args:
+        calibrate (bool): étalonner les activations de la variante int8 sur le dataset
+
+    Returns:
+        dict: type de modèle -> taille du fichier écrit (octets)
+    """
+    tf_model_dir = config['TF_MODEL_DIR']
+    h5_path = os.path.join(tf_model_dir, 'best_model.h5')
+    with open(os.path.join(tf_model_dir, 'metadata.pkl'), 'rb') as f:
+        scaler = pickle.load(f)['scaler']
+
+    representative_data = (representative_rows(config['DATASET_PATH'], scaler,
+                                               snapshot_dir=config.get('DATASET_SNAPSHOT_DIR'))
+                           if calibrate else None)
+    source_sha256 = file_sha256(h5_path)
+    manifest = _read_manifest(tf_model_dir)
+    sizes = {}
+    for model_type in model_types or TFLITE_VARIANTS:
+        quantization = TFLITE_VARIANTS[model_type]
+        content = convert_keras_h5(h5_path, quantization,
+                                   representative_data if quantization == 'int8' else None)
+
+        path = os.path.join(tf_model_dir, TFLITE_MODEL_FILES[model_type])
+        fd, tmp_path = tempfile.mkstemp(dir=tf_model_dir, suffix='.tflite.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        manifest[model_type] = source_sha256
+        sizes[model_type] = len(content)
+        if logger is not None:
+            logger.info(f"{model_type} ({quantization}) : {path}, {len(content)} octets")
+
+    manifest_path = os.path.join(tf_model_dir, VARIANTS_MANIFEST)
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+    return sizes
@@ -0,0 +1,32 @@
+import hashlib
+
+from flask import Response, request, current_app
+
+def make_etag(*parts):
+    """
+    Calcule une ETag forte à partir des versions (contenu, signature de fichier) d'une ressource
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def cached_json_response(body, etag, max_age=None):
+    """
+    Réponse JSON pré-sérialisée avec ETag et Cache-Control
+
+    Renvoie 304 Not Modified sans corps si l'en-tête If-None-Match de la requête
+    correspond à l'ETag.
+    """
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['HTTP_CACHE_MAX_AGE'] if max_age is None else max_age
+    return response.make_conditional(request)
+
+def deduct_unless_not_modified(response):
+    """
+    Critère de décompte de flask-limiter : une réponse 304 ne consomme pas de quota
+    """
+    return response.status_code != 304
@@ -0,0 +1,273 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+from app.utils.validators import MODEL_TYPES
+
+# Bornes (en secondes) des histogrammes de latence, fixées une fois pour toutes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Value:
+    """Valeur d'une série (compteur ou jauge), protégée par son propre verrou"""
+
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+class _HistogramValue:
+    """
+    Histogramme d'une série : compteurs par intervalle (non cumulés) et somme
+
+    L'observation se limite à une recherche dichotomique dans les bornes et deux additions ;
+    les compteurs cumulés du format Prometheus ne sont calculés qu'à l'export.
+    """
+
+    __slots__ = ('_lock', '_bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class _Metric:
+    """
+    Famille de séries d'une métrique, une par combinaison de valeurs des labels
+
+    Les séries existantes sont retrouvées sans verrou (lecture d'un dict) ; seul l'ajout
+    d'une nouvelle combinaison prend le verrou de la famille.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _new_value(self):
+        return _Value()
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_value())
+        return series
+
+    def samples(self):
+        """Lignes d'export (nom, labels formatés, valeur)"""
+        for values, series in sorted(self._series.items()):
+            yield self.name, _format_labels(self.labelnames, values), series.value
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value):
+        self.labels().set(value)
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, series in sorted(self._series.items()):
+            with series._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, values, le), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+class Registry:
+    """
+    Ensemble des métriques du processus, exportées au format texte de Prometheus
+
+    Les collecteurs enregistrés sont appelés à chaque export pour les valeurs tenues
+    ailleurs (cache des prédictions, pool TFLite) : ils retournent des tuples
+    (nom, type, description, liste de (dict de labels, valeur)).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in metric.samples())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+# Registre du processus (chaque worker gunicorn expose ses propres valeurs)
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'agropredict_http_requests_total', 'Requêtes HTTP traitées',
+    ('route', 'method', 'model_type', 'status'))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'agropredict_http_request_duration_seconds', "Durée des requêtes HTTP jusqu'à l'envoi des en-têtes",
+    ('route', 'method', 'model_type'))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'agropredict_http_requests_in_flight', 'Requêtes HTTP en cours de traitement', ('route',))
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    'agropredict_rate_limit_rejections_total', 'Requêtes refusées par la limitation de débit (429)', ('route',))
+
+INFERENCE_DURATION = REGISTRY.histogram(
+    'agropredict_inference_duration_seconds', "Durée des appels d'inférence", ('model_type', 'kind'))
+INFERENCE_ROWS = REGISTRY.counter(
+    'agropredict_inference_rows_total', 'Échantillons évalués', ('model_type',))
+INFERENCE_ERRORS = REGISTRY.counter(
+    'agropredict_inference_errors_total', "Appels d'inférence en erreur", ('model_type',))
+
+MODEL_LOADED = REGISTRY.gauge(
+    'agropredict_model_loaded', 'Backend chargé (1) ou indisponible (0)', ('model_type',))
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    'agropredict_model_load_seconds', 'Durée du chargement de chaque backend', ('model_type', 'phase'))
+
+@contextmanager
+def track_inference(model_type, kind, rows):
+    """Mesure un appel d'inférence ('single' ou 'batch') et compte ses erreurs"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        INFERENCE_ERRORS.labels(model_type).inc()
+        raise
+    finally:
+        INFERENCE_DURATION.labels(model_type, kind).observe(time.perf_counter() - start)
+    INFERENCE_ROWS.labels(model_type).inc(rows)
+
+def _request_model_type():
+    """model_type demandé (paramètre ou corps JSON déjà décodé par la route), '' sinon"""
+    model_type = request.args.get('model_type')
+    if model_type is None and request.is_json:
+        data = request.get_json(silent=True)
+        model_type = data.get('model_type') if isinstance(data, dict) else None
+    return model_type if model_type in MODEL_TYPES else ''
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_route = _route()
+    HTTP_IN_FLIGHT.labels(g.metrics_route).inc()
+
+def _after_request(response):
+    start = g.get('metrics_start')
+    if start is None:
+        return response
+
+    route = g.metrics_route
+    model_type = _request_model_type()
+    HTTP_REQUEST_DURATION.labels(route, request.method, model_type).observe(time.perf_counter() - start)
+    HTTP_REQUESTS.labels(route, request.method, model_type, str(response.status_code)).inc()
+    if response.status_code == 429:
+        RATE_LIMIT_REJECTIONS.labels(route).inc()
+    return response
+
+def _teardown_request(exc):
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        HTTP_IN_FLIGHT.labels(route).dec()
+
+def metrics_view():
+    """Export des métriques du processus au format texte de Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def init_app(app):
+    """
+    Instrumente toutes les requêtes de l'application et expose GET /metrics
+
+    L'export n'est pas soumis à la limitation de débit (interrogé périodiquement par Prometheus).
+    """
+    from app import limiter
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', limiter.exempt(metrics_view), methods=['GET'])
@@ -0,0 +1,138 @@
+import collections
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+
+from flask import g, request
+
+class RequestProfiler:
+    """
+    Profilage cProfile d'une fraction des requêtes, activé à la demande
+
+    Les profils des `window` dernières requêtes échantillonnées sont conservés sous forme
+    réduite (appels, temps propre, temps cumulé par fonction) ; le rapport agrège cette
+    fenêtre glissante. Une seule requête est profilée à la fois : les autres requêtes
+    tirées pendant ce temps ne le sont pas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        self.sample_rate = 0.0
+        self.top_n = 20
+        self._profiles = collections.deque(maxlen=100)
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def configure(self, sample_rate, top_n=20, window=100):
+        with self._lock:
+            self.sample_rate = sample_rate
+            self.top_n = top_n
+            if window != self._profiles.maxlen:
+                self._profiles = collections.deque(self._profiles, maxlen=window)
+
+    def disable(self):
+        self.sample_rate = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def start(self):
+        """Démarre le profilage de la requête courante si elle est tirée au sort"""
+        if random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Un autre outil de profilage est déjà actif
+            self._active.release()
+            return None
+        return profile
+
+    def stop(self, profile, route):
+        profile.disable()
+        self._active.release()
+
+        functions = {}
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in pstats.Stats(profile).stats.items():
+            functions[f'{_short_path(filename)}:{line}({name})'] = (ncalls, tottime, cumtime)
+        with self._lock:
+            self._profiles.append((route, functions))
+
+    def report(self, sort='tottime', top_n=None):
+        """
+        Fonctions les plus coûteuses sur la fenêtre des requêtes profilées
+
+        Args:
+            sort (str): 'tottime' (temps propre) ou 'cumtime' (temps cumulé)
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+            window = self._profiles.maxlen
+
+        totals = {}
+        for _, functions in profiles:
+            for function, (ncalls, tottime, cumtime) in functions.items():
+                total = totals.setdefault(function, [0, 0.0, 0.0])
+                total[0] += ncalls
+                total[1] += tottime
+                total[2] += cumtime
+
+        column = 1 if sort == 'tottime' else 2
+        ranked = sorted(totals.items(), key=lambda item: item[1][column], reverse=True)[:top_n or self.top_n]
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'window': window,
+            'profiled_requests': len(profiles),
+            'routes': dict(collections.Counter(route for route, _ in profiles)),
+            'sort': sort,
+            'functions': [{
+                'function': function,
+                'calls': ncalls,
+                'tottime_ms': round(tottime * 1000 / max(len(profiles), 1), 4),
+                'cumtime_ms': round(cumtime * 1000 / max(len(profiles), 1), 4)
+            } for function, (ncalls, tottime, cumtime) in ranked]
+        }
+
+def _short_path(filename):
+    """Chemin relatif au plus long préfixe de sys.path (site-packages, stdlib, projet)"""
+    for prefix in sorted({os.path.join(os.path.abspath(path), '') for path in sys.path}, key=len, reverse=True):
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+# Profileur du processus, configuré par la route d'administration /admin/profiling
+profiler = RequestProfiler()
+
+def _before_request():
+    if profiler.enabled:
+        profile = profiler.start()
+        if profile is not None:
+            g.request_profile = profile
+
+def _after_request(response):
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        profiler.stop(profile, route)
+    return response
+
+def _teardown_request(exc):
+    # Requête interrompue avant after_request : le profileur doit être libéré
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        profile.disable()
+        profiler._active.release()
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Stockage flask-limiter partagé entre les workers via une base SQLite en mode WAL
+
+    URI : ``sqlite:////chemin/absolu/ratelimit.sqlite`` (``sqlite:///relatif.sqlite``).
+
+    Chaque clé occupe une seule ligne (compteur, expiration) : deux par limite avec la
+    stratégie ``sliding-window-counter``. Les lignes expirées sont purgées au plus une fois
+    par ``cleanup_interval`` secondes, les clés inactives ne s'accumulent donc pas.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, cleanup_interval=60, busy_timeout=5, **options):
+        self.path = uri.split('://', 1)[1][1:] if uri else ''
+        if not self.path:
+            raise ValueError("Chemin de la base SQLite manquant (sqlite:////chemin/ratelimit.sqlite)")
+        self.cleanup_interval = float(cleanup_interval)
+        self.busy_timeout = float(busy_timeout)
+        self._local = threading.local()
+        # Connexions héritées d'un fork : jamais réutilisées ni fermées dans le processus fils
+        self._inherited_connections = []
+        self._next_cleanup = 0.0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits '
+            '(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID')
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """Connexion propre au thread et au processus courants"""
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, 'pid', None) != pid:
+            if getattr(local, 'connection', None) is not None:
+                self._inherited_connections.append(local.connection)
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                         isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            local.connection = connection
+            local.pid = pid
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _cleanup(self, connection, now):
+        """Supprime les compteurs expirés (clés inactives)"""
+        if now < self._next_cleanup:
+            return
+        self._next_cleanup = now + self.cleanup_interval
+        connection.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+
+    def _incr(self, connection, key, expiry, amount, now):
+        # Un compteur expiré repart de `amount` avec une nouvelle échéance
+        return connection.execute(
+            'INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END, '
+            'expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END '
+            'RETURNING count',
+            (key, amount, now + expiry, now, now)).fetchone()[0]
+
+    def _get(self, connection, key, now):
+        row = connection.execute('SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?',
+                                 (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        connection = self._connection()
+        self._cleanup(connection, now)
+        return self._incr(connection, key, expiry, amount, now)
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def _sliding_window_info(self, connection, previous_key, current_key, expiry, now):
+        previous_count = self._get(connection, previous_key, now)
+        current_count = self._get(connection, current_key, now)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+
+        # Lecture et incrément dans la même transaction : exact même entre processus
+        with self._transaction() as connection:
+            self._cleanup(connection, now)
+            previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+                connection, previous_key, current_key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            self._incr(connection, current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window_info(self._connection(), previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self._connection().execute('DELETE FROM rate_limits WHERE key IN (?, ?)', (previous_key, current_key))
@@ -1,13 +1,9 @@
 from functools import wraps
 from flask import request, abort, current_app
-import time
 import hashlib
+import hmac
 import re
 
-# Dictionnaire simple pour stocker les tentatives de connexion (dans un vrai système, utilisez Redis ou une base de données)
-request_counts = {}
-blocked_ips = {}
-
 def validate_input(input_str):
     """
     Valide l'entrée pour prévenir les injections
@@ -60,41 +56,22 @@ def require_api_key(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def rate_limit(max_requests=10, window=60):
+def require_admin_key(f):
     """
-    Décorateur pour limiter le débit des requêtes
+    Décorateur pour les routes d'administration (profilage, rechargement des modèles)
     
-    Args:
-        max_requests (int): Nombre maximal de requêtes dans la fenêtre de temps
-        window (int): Fenêtre de temps en secondes
+    La clé est lue dans l'en-tête X-ADMIN-KEY et comparée à ADMIN_API_KEY ; sans
+    ADMIN_API_KEY configurée, les routes d'administration sont désactivées.
     """
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Obtenir l'adresse IP du client
-            ip = request.remote_addr
-            
-            # Vérifier si l'IP est bloquée
-            if ip in blocked_ips and blocked_ips[ip] > time.time():
-                abort(429, description="Trop de requêtes. Réessayez plus tard.")
-            
-            # Initialiser le compteur pour cette IP si nécessaire
-            if ip not in request_counts:
-                request_counts[ip] = []
-            
-            # Supprimer les requêtes anciennes
-            now = time.time()
-            request_counts[ip] = [t for t in request_counts[ip] if now - t < window]
-            
-            # Vérifier la limite de débit
-            if len(request_counts[ip]) >= max_requests:
-                # Bloquer l'IP pendant 10 minutes
-                blocked_ips[ip] = now + 600  # 10 minutes
-                abort(429, description="Trop de requêtes. Réessayez plus tard.")
-            
-            # Ajouter cette requête
-            request_counts[ip].append(now)
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get('ADMIN_API_KEY')
+        if not expected:
+            abort(403, description="Administration désactivée (ADMIN_API_KEY non configurée)")
+        
+        api_key = request.headers.get('X-ADMIN-KEY', '')
+        if not hmac.compare_digest(api_key.encode(), expected.encode()):
+            abort(401, description="Clé d'administration non valide ou manquante")
             
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
\ No newline at end of file
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,82 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request
+
+from app.utils import metrics
+
+STAGE_DURATION = metrics.REGISTRY.histogram(
+    'agropredict_request_stage_duration_seconds', 'Durée de chaque étape des requêtes (hors sous-étapes)',
+    ('route', 'stage'))
+
+@contextmanager
+def stage(name):
+    """
+    Mesure une étape de la requête courante (sans effet hors d'une requête)
+
+    Les étapes peuvent s'imbriquer : le temps d'une sous-étape n'est compté que pour
+    elle-même, si bien que les durées ne se recouvrent pas. Une même étape exécutée
+    plusieurs fois (blocs d'un lot) est cumulée.
+    """
+    timings = g.get('stage_timings') if has_request_context() else None
+    if timings is None:
+        yield
+        return
+
+    stack = g.stage_stack
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        timings[name] = timings.get(name, 0.0) + elapsed - nested
+
+def handler(f):
+    """
+    Marque la fin du traitement de la route, pour mesurer ensuite la sérialisation
+
+    À placer sous marshal_with : le temps entre le retour de la fonction et la fin de la
+    requête (marshalling et encodage JSON) est compté dans l'étape 'serialize'.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        finally:
+            if has_request_context() and 'stage_timings' in g:
+                g.stage_handler_end = time.perf_counter()
+    return decorated_function
+
+def _before_request():
+    g.stage_start = time.perf_counter()
+    g.stage_timings = {}
+    g.stage_stack = []
+
+def _after_request(response):
+    timings = g.get('stage_timings')
+    if timings is None:
+        return response
+
+    end = time.perf_counter()
+    handler_end = g.get('stage_handler_end')
+    if handler_end is not None:
+        timings['serialize'] = end - handler_end
+
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    for name, seconds in timings.items():
+        STAGE_DURATION.labels(route, name).observe(seconds)
+
+    entries = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in timings.items()]
+    entries.append(f'total;dur={(end - g.stage_start) * 1000:.3f}')
+    response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+def init_app(app):
+    """Ajoute l'en-tête Server-Timing (durée de chaque étape) à toutes les réponses"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -1,52 +1,194 @@
-def validate_crop_params(data):
+import numpy as np
+
+# Types de modèles acceptés par l'API
+MODEL_TYPES = ['gradient_boosting', 'tensorflow', 'tensorflow_lite', 'tensorflow_lite_float16', 'tensorflow_lite_int8',
+               'numpy', 'ensemble']
+
+# Plages de valeurs acceptées (basées sur les plages typiques) et messages d'erreur
+PARAM_RANGES = {
+    'N': (0, 300, "Le niveau d'azote doit être compris entre 0 et 300"),
+    'P': (0, 300, "Le niveau de phosphore doit être compris entre 0 et 300"),
+    'K': (0, 300, "Le niveau de potassium doit être compris entre 0 et 300"),
+    'temperature': (-10, 60, "La température doit être comprise entre -10 et 60°C"),
+    'humidity': (0, 100, "L'humidité doit être comprise entre 0 et 100%"),
+    'ph': (0, 14, "Le pH doit être compris entre 0 et 14"),
+    'rainfall': (0, 500, "Les précipitations doivent être comprises entre 0 et 500 mm")
+}
+
+# Codes d'erreur attribués à chaque valeur validée
+VALID, MISSING, NOT_A_NUMBER, OUT_OF_RANGE = 0, 1, 2, 3
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+class ParamSpec:
     """
-    Valide les paramètres d'entrée pour la prédiction de cultures
+    Validation des paramètres compilée une seule fois à partir d'une table de plages
+    
+    Les lots sont validés colonne par colonne sur des tableaux NumPy (un code d'erreur par
+    valeur) ; une requête unitaire suit le même spec par un chemin Python direct.
+    Comme pour une requête unitaire, une ligne incomplète ne signale que ses paramètres
+    manquants.
+    """
+    
+    def __init__(self, ranges):
+        self.names = tuple(ranges)
+        self.lower = np.array([ranges[name][0] for name in self.names], dtype=np.float64)
+        self.upper = np.array([ranges[name][1] for name in self.names], dtype=np.float64)
+        self._bounds = tuple((name, float(ranges[name][0]), float(ranges[name][1])) for name in self.names)
+        
+        # Message de chaque code d'erreur pour chaque paramètre
+        self.messages = np.empty((4, len(self.names)), dtype=object)
+        self.messages[MISSING] = [f"Le paramètre '{name}' est requis" for name in self.names]
+        self.messages[NOT_A_NUMBER] = [f"La valeur de '{name}' doit être un nombre" for name in self.names]
+        self.messages[OUT_OF_RANGE] = [ranges[name][2] for name in self.names]
+    
+    def to_array(self, samples):
+        """
+        Convertit une liste de dicts en tableau (n, p) de float64
+        
+        Returns:
+            tuple: (valeurs, NaN si absente ou non numérique ; masque (n, p) des valeurs absentes)
+        """
+        missing = np.array([[name not in sample for name in self.names] for sample in samples],
+                           dtype=bool).reshape(len(samples), len(self.names))
+        rows = [[sample.get(name) for name in self.names] for sample in samples]
+        try:
+            values = np.array(rows, dtype=np.float64)
+        except (ValueError, TypeError):
+            # Au moins une valeur non convertible : conversion valeur par valeur
+            values = np.array([[_to_float(value) for value in row] for row in rows], dtype=np.float64)
+        return values.reshape(len(samples), len(self.names)), missing
+    
+    def check_array(self, values, missing=None):
+        """
+        Valide un tableau (n, p) de valeurs
+        
+        Returns:
+            np.ndarray: codes d'erreur (n, p), VALID pour une valeur correcte
+        """
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.zeros(values.shape, dtype=np.int8)
+        codes[(values < self.lower) | (values > self.upper)] = OUT_OF_RANGE
+        codes[np.isnan(values)] = NOT_A_NUMBER
+        if missing is not None and missing.any():
+            codes[missing.any(axis=1)] = VALID
+            codes[missing] = MISSING
+        return codes
+    
+    def row_errors(self, codes_row):
+        """Retourne le dict {paramètre: message} d'une ligne de codes, ou None"""
+        columns = np.flatnonzero(codes_row)
+        if not len(columns):
+            return None
+        return {self.names[column]: self.messages[codes_row[column], column] for column in columns}
+    
+    def errors(self, codes):
+        """Retourne, pour chaque ligne, son dict d'erreurs ou None"""
+        errors = [None] * len(codes)
+        for row in np.flatnonzero(codes.any(axis=1)):
+            errors[row] = self.row_errors(codes[row])
+        return errors
+    
+    def validate_samples(self, samples):
+        """
+        Valide un lot de dicts en une passe vectorisée
+        
+        Returns:
+            tuple: (valeurs (n, p), masque (n,) des lignes valides, liste des erreurs par ligne)
+        """
+        not_dict = [index for index, sample in enumerate(samples) if not isinstance(sample, dict)]
+        if not_dict:
+            samples = [sample if isinstance(sample, dict) else {} for sample in samples]
+        
+        values, missing = self.to_array(samples)
+        codes = self.check_array(values, missing)
+        valid = ~codes.any(axis=1)
+        errors = self.errors(codes)
+        for index in not_dict:
+            valid[index] = False
+            errors[index] = {'sample': "L'échantillon doit être un objet"}
+        return values, valid, errors
+    
+    def validate_one(self, data):
+        """
+        Valide un seul dict (chemin rapide, sans NumPy)
+        
+        Returns:
+            tuple: (liste des valeurs converties ou None, dict des erreurs ou None)
+        """
+        missing = {name: f"Le paramètre '{name}' est requis" for name in self.names if name not in data}
+        if missing:
+            return None, missing
+        
+        values = []
+        errors = {}
+        for column, (name, lower, upper) in enumerate(self._bounds):
+            value = _to_float(data[name])
+            if value != value:
+                errors[name] = self.messages[NOT_A_NUMBER, column]
+            elif value < lower or value > upper:
+                errors[name] = self.messages[OUT_OF_RANGE, column]
+            values.append(value)
+        return (None, errors) if errors else (values, None)
+
+# Spec compilé des paramètres du sol et du climat
+CROP_PARAMS = ParamSpec(PARAM_RANGES)
+
+def parse_crop_params(data):
+    """
+    Valide et convertit les paramètres d'une requête de prédiction
     
     Args:
         data (dict): Dictionnaire contenant les paramètres à valider
         
     Returns:
-        dict or None: Dictionnaire contenant les erreurs, ou None si tout est valide
+        tuple: (liste des 7 valeurs converties ou None, dict des erreurs ou None)
     """
-    errors = {}
-    
-    # Vérifier la présence de tous les paramètres requis
-    required_params = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    for param in required_params:
-        if param not in data:
-            errors[param] = f"Le paramètre '{param}' est requis"
-    
-    # Si des paramètres sont manquants, retourner les erreurs
-    if errors:
-        return errors
+    values, errors = CROP_PARAMS.validate_one(data)
     
-    # Validation des plages de valeurs (basée sur les plages typiques)
-    validations = {
-        'N': (0, 300, "Le niveau d'azote doit être compris entre 0 et 300"),
-        'P': (0, 300, "Le niveau de phosphore doit être compris entre 0 et 300"),
-        'K': (0, 300, "Le niveau de potassium doit être compris entre 0 et 300"),
-        'temperature': (-10, 60, "La température doit être comprise entre -10 et 60°C"),
-        'humidity': (0, 100, "L'humidité doit être comprise entre 0 et 100%"),
-        'ph': (0, 14, "Le pH doit être compris entre 0 et 14"),
-        'rainfall': (0, 500, "Les précipitations doivent être comprises entre 0 et 500 mm")
-    }
-    
-    # Vérifier que toutes les valeurs sont des nombres
-    for param in required_params:
-        try:
-            # Convertir en float pour la validation
-            value = float(data[param])
-            
-            # Vérifier si la valeur est dans la plage autorisée
-            min_val, max_val, error_msg = validations[param]
-            if value < min_val or value > max_val:
-                errors[param] = error_msg
-        except (ValueError, TypeError):
-            errors[param] = f"La valeur de '{param}' doit être un nombre"
+    # Si des paramètres sont manquants, retourner uniquement ces erreurs
+    if errors and any(name not in data for name in CROP_PARAMS.names):
+        return None, errors
     
     # Si model_type est présent, vérifier qu'il est valide
     model_type = data.get('model_type')
-    if model_type and model_type not in ['gradient_boosting', 'tensorflow', 'tensorflow_lite']:
-        errors['model_type'] = "Le type de modèle doit être 'gradient_boosting', 'tensorflow' ou 'tensorflow_lite'"
+    if model_type and model_type not in MODEL_TYPES:
+        errors = dict(errors or {})
+        errors['model_type'] = f"Le type de modèle doit être l'un des suivants: {', '.join(MODEL_TYPES)}"
+    return (None, errors) if errors else (values, None)
+
+def validate_crop_params(data):
+    """
+    Valide les paramètres d'entrée pour la prédiction de cultures
     
-    return errors if errors else None
\ No newline at end of file
+    Args:
+        data (dict): Dictionnaire contenant les paramètres à valider
+        
+    Returns:
+        dict or None: Dictionnaire contenant les erreurs, ou None si tout est valide
+    """
+    return parse_crop_params(data)[1]
+
+def parse_top_k(value):
+    """
+    Valide le paramètre top_k (nombre de cultures à classer)
+    
+    Returns:
+        tuple: (k ou None si absent, message d'erreur ou None)
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, bool):
+        # bool est une sous-classe de int : true ne doit pas valoir top_k=1
+        return None, "Le paramètre 'top_k' doit être un entier"
+    try:
+        k = int(value)
+    except (ValueError, TypeError):
+        return None, "Le paramètre 'top_k' doit être un entier"
+    if isinstance(value, float) and value != k or k < 1:
+        return None, "Le paramètre 'top_k' doit être un entier supérieur ou égal à 1"
+    return k, None
@@ -0,0 +1,111 @@
+"""
+Rapport des variantes TensorFlow Lite à précision réduite (taille, latence, concordance)
+
+Usage : python benchmarks/quantization.py [--output benchmarks/quantization.json]
+                                          [--model-types tensorflow_lite tensorflow_lite_int8]
+                                          [--batch-sizes 1 64 512 4096] [--iterations 2000] [--build]
+
+Chaque modèle TFLite est comparé au modèle float dont les variantes sont issues
+(best_model.h5, model_type 'tensorflow') :
+  - taille du fichier ;
+  - latence p50/p99 d'une prédiction unitaire et débit par taille de lot (CropPredictor,
+    cache des prédictions désactivé) ;
+  - concordance top-1 avec le modèle float, écart maximal des probabilités et exactitude
+    sur toutes les lignes de Crop_recommendation.csv.
+--build reconstruit d'abord les variantes (python -m app.build_tflite). Les résultats sont
+écrits en JSON et résumés dans un tableau Markdown sur la sortie standard.
+"""
+import argparse
+import json
+import os
+import sys
+
+from suite import PROJECT_ROOT, FEATURE_NAMES, environment, percentiles_ms, time_batches, time_calls
+
+REFERENCE = 'tensorflow'
+MODEL_TYPES = ['tensorflow_lite', 'tensorflow_lite_float16', 'tensorflow_lite_int8']
+
+def load_dataset():
+    from app.config import Config
+    from app.services.datasets import get_dataset
+    dataset = get_dataset(Config.DATASET_PATH, Config.DATASET_SNAPSHOT_DIR)
+    return dataset.matrix(FEATURE_NAMES), dataset.decode('label')
+
+def measure(predictor, model_type, features, labels, reference_proba, args, iterations):
+    import numpy as np
+    from app.services.tflite_variants import TFLITE_MODEL_FILES
+
+    predictor.ensure_loaded(model_type)
+    if not predictor.load_report[model_type]['loaded']:
+        return {'loaded': False}
+
+    probabilities, class_names = predictor.predict_proba_batch(features, model_type)
+    predicted = np.argmax(probabilities, axis=1)
+    path = os.path.join(predictor.config['TF_MODEL_DIR'], TFLITE_MODEL_FILES.get(model_type, 'best_model.h5'))
+    return {
+        'loaded': True,
+        'size_bytes': os.path.getsize(path),
+        'top1_agreement': round(float(np.mean(predicted == np.argmax(reference_proba, axis=1))), 5),
+        'max_probability_error': round(float(np.abs(probabilities - reference_proba).max()), 6),
+        'accuracy': round(float(np.mean(np.asarray(class_names)[predicted] == labels)), 5),
+        'single_row': percentiles_ms(time_calls(
+            lambda row: predictor.predict_crop(*row, model_type=model_type), features, iterations)),
+        'batch': time_batches(lambda batch: predictor.predict_crop_batch(batch, model_type),
+                              features, args.batch_sizes, args.min_time)
+    }
+
+def print_table(results, batch_sizes):
+    columns = ['modèle', 'taille (Ko)', 'unitaire p50 (ms)', 'unitaire p99 (ms)'] + \
+              [f'lot {size} (lignes/s)' for size in batch_sizes] + ['concordance top-1', 'écart max', 'exactitude']
+    print('| ' + ' | '.join(columns) + ' |')
+    print('|' + '---|' * len(columns))
+    for model_type, result in results.items():
+        if not result['loaded']:
+            print(f'| {model_type} | non chargé |' + ' |' * (len(columns) - 2))
+            continue
+        cells = [model_type, f"{result['size_bytes'] / 1024:.1f}",
+                 f"{result['single_row']['p50_ms']:.4f}", f"{result['single_row']['p99_ms']:.4f}"]
+        cells += [f"{result['batch'][str(size)]['rows_per_second']:,.0f}" for size in batch_sizes]
+        cells += [f"{result['top1_agreement']:.2%}", f"{result['max_probability_error']:.4f}",
+                  f"{result['accuracy']:.2%}"]
+        print('| ' + ' | '.join(cells) + ' |')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=os.path.join(PROJECT_ROOT, 'benchmarks', 'quantization.json'))
+    parser.add_argument('--model-types', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument('--iterations', type=int, default=2000, help='prédictions unitaires mesurées')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 512, 4096])
+    parser.add_argument('--min-time', type=float, default=0.5, help='durée minimale (s) par taille de lot')
+    parser.add_argument('--build', action='store_true', help='reconstruire les variantes avant la mesure')
+    args = parser.parse_args()
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    from app.config import get_config_dict
+    from app.services.predictor import CropPredictor
+    from app.services.tflite_variants import TFLITE_VARIANTS, build_variants
+
+    config = dict(get_config_dict('prod'), PREDICTION_CACHE_SIZE=0, MICRO_BATCHING_ENABLED=False)
+    if args.build:
+        build_variants(config, [m for m in args.model_types if m in TFLITE_VARIANTS])
+
+    features, labels = load_dataset()
+    predictor = CropPredictor(config)
+    reference_proba, _ = predictor.predict_proba_batch(features, REFERENCE)
+
+    # Keras predict() coûte ~100 ms par appel unitaire : moins d'itérations pour la référence
+    results = {REFERENCE: measure(predictor, REFERENCE, features, labels, reference_proba, args,
+                                  min(args.iterations, 100))}
+    for model_type in args.model_types:
+        print(f"{model_type}...", file=sys.stderr, flush=True)
+        results[model_type] = measure(predictor, model_type, features, labels, reference_proba, args,
+                                     args.iterations)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'reference': REFERENCE, 'results': results}, f, indent=2)
+    print_table(results, args.batch_sizes)
+    print(f"\nRésultats écrits dans {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Banc d'essai du coût par requête de la limitation de débit
+
+Usage : python benchmarks/rate_limit.py [--hits 20000] [--keys 1000] [--processes 4]
+
+Mesure le coût d'un décompte dans les stockages flask-limiter memory:// et sqlite:// avec
+la stratégie sliding-window-counter (celle de RATELIMIT_STRATEGY), puis le débit de
+sqlite:// partagé par plusieurs processus.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+import app.utils.rate_limit_storage  # noqa: F401  (schéma sqlite://)
+
+def measure(hit, keys, hits):
+    """Retourne les latences par requête en microsecondes"""
+    latencies = []
+    for _ in range(hits):
+        key = random.choice(keys)
+        start = time.perf_counter()
+        hit(key)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+def report(name, latencies, entries):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<34} {statistics.median(latencies):>9.1f} {p99:>9.1f} {entries:>10}")
+
+def sqlite_worker(uri, limit, keys, hits, queue):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerMinute(limit)
+    start = time.perf_counter()
+    allowed = sum(limiter.hit(item, random.choice(keys)) for _ in range(hits))
+    queue.put((time.perf_counter() - start, allowed))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hits', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=100, help='requêtes autorisées par minute et par clé')
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    keys = [f'10.0.{i // 256}.{i % 256}' for i in range(args.keys)]
+    item = RateLimitItemPerMinute(args.limit)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        uri = 'sqlite:///' + os.path.join(tmp_dir, 'ratelimit.sqlite')
+
+        print(f"{'backend':<34} {'p50 (µs)':>9} {'p99 (µs)':>9} {'entrées':>10}")
+
+        for name, storage_uri in (('memory://', 'memory://'), ('sqlite://', uri)):
+            storage = storage_from_string(storage_uri)
+            limiter = SlidingWindowCounterRateLimiter(storage)
+            latencies = measure(lambda key: limiter.hit(item, key), keys, args.hits)
+            if name == 'sqlite://':
+                entries = storage._connection().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+            else:
+                entries = len(storage.storage)
+            report(f'{name} sliding-window-counter', latencies, entries)
+
+        # Débit de la base partagée par plusieurs processus (un par worker gunicorn)
+        storage_from_string(uri).reset()
+        queue = multiprocessing.Queue()
+        per_process = args.hits // args.processes
+        processes = [multiprocessing.Process(target=sqlite_worker, args=(uri, args.limit, keys, per_process, queue))
+                     for _ in range(args.processes)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        allowed = sum(result[1] for result in results)
+        print(f"\nsqlite:// partagé par {args.processes} processus : "
+              f"{per_process * args.processes / elapsed:.0f} requêtes/s, "
+              f"{allowed} autorisées (limite globale {args.limit * len(keys)})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Banc d'essai du serveur Flask (run.py) et du serveur asyncio (run_asgi.py) à forte concurrence
+
+Usage : python benchmarks/serving.py [--concurrency 200] [--requests 2000] [--model-type numpy]
+
+Chaque serveur est démarré dans un sous-processus (limitation de débit et cache désactivés),
+puis reçoit des requêtes POST /predict aux entrées aléatoires depuis un client asyncio.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'flask': [sys.executable, 'run.py'],
+    'asgi': [sys.executable, 'run_asgi.py']
+}
+
+def random_payload(model_type):
+    return {
+        'N': random.randint(0, 140), 'P': random.randint(5, 145), 'K': random.randint(5, 205),
+        'temperature': round(random.uniform(9, 43), 2), 'humidity': round(random.uniform(15, 99), 2),
+        'ph': round(random.uniform(3.5, 9.9), 2), 'rainfall': round(random.uniform(20, 298), 2),
+        'model_type': model_type
+    }
+
+async def post_json(host, port, path, payload):
+    """Envoie une requête HTTP/1.1 minimale et retourne le code de statut"""
+    body = json.dumps(payload).encode()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+async def run_load(host, port, concurrency, total, model_type):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await post_json(host, port, '/predict', random_payload(model_type))
+            except OSError:
+                status = 'connexion'
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+        'statuses': {str(k): v for k, v in statuses.items()}
+    }
+
+async def wait_until_ready(host, port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Le serveur n'a pas démarré sur le port {port}")
+
+def benchmark_server(name, port, args):
+    env = dict(os.environ, FLASK_ENV='prod', FLASK_PORT=str(port), FLASK_DEBUG='False',
+               RATELIMIT_ENABLED='False', PREDICTION_CACHE_SIZE='0', MODEL_WARMUP=args.model_type,
+               UVICORN_LOG_LEVEL='warning')
+    process = subprocess.Popen(SERVERS[name], cwd=PROJECT_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_ready('127.0.0.1', port))
+        # Requêtes de chauffe hors mesure
+        asyncio.run(run_load('127.0.0.1', port, 4, 20, args.model_type))
+        return asyncio.run(run_load('127.0.0.1', port, args.concurrency, args.requests, args.model_type))
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--model-type', default='gradient_boosting')
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    results = {name: benchmark_server(name, args.port + i, args) for i, name in enumerate(args.servers)}
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark de la standardisation des entrées (scikit-learn, standardisation fusionnée, repliée)
+
+Usage : python benchmarks/standardization.py [--iterations 20000] [--batch-sizes 1 64 1024]
+
+Mesure, pour chaque taille de lot :
+  - StandardScaler.transform(x).astype(float32), le chemin d'origine ;
+  - FusedStandardizer.transform(x, float32), la standardisation extraite au chargement ;
+et, pour une prédiction unitaire complète du backend NumPy (cache désactivé), l'écart entre
+la standardisation fusionnée et la standardisation repliée dans la première couche
+(FOLD_STANDARDIZATION). Vérifie aussi que les résultats sont identiques au chemin d'origine.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from suite import load_inputs
+
+def best_of(call, iterations, repeats=5):
+    """Durée moyenne (µs) d'un appel, meilleure de `repeats` séries de `iterations` appels"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 1024])
+    args = parser.parse_args()
+
+    from app.config import get_config_dict
+    from app.services.predictor import CropPredictor
+
+    config = dict(get_config_dict('prod'), PREDICTION_CACHE_SIZE=0, MICRO_BATCHING_ENABLED=False)
+    fused = CropPredictor(config)
+    folded = CropPredictor(dict(config, FOLD_STANDARDIZATION=True))
+    fused.ensure_loaded('numpy')
+    folded.ensure_loaded('numpy')
+    scaler, standardizer = fused.scalers['tensorflow'], fused.standardizers['tensorflow']
+
+    inputs = load_inputs(max(args.batch_sizes))
+    print(f"{'lot':>6} {'scikit-learn (µs)':>18} {'fusionnée (µs)':>15} {'gain':>7}")
+    for batch_size in args.batch_sizes:
+        batch = inputs[:batch_size]
+        if not np.array_equal(standardizer.transform(batch, np.float32), scaler.transform(batch).astype(np.float32)):
+            raise AssertionError("La standardisation fusionnée diffère de StandardScaler.transform")
+        iterations = max(10, args.iterations // batch_size)
+        sklearn_us = best_of(lambda: scaler.transform(batch).astype(np.float32), iterations)
+        fused_us = best_of(lambda: standardizer.transform(batch, np.float32), iterations)
+        print(f"{batch_size:>6} {sklearn_us:>18.2f} {fused_us:>15.2f} {sklearn_us / fused_us:>6.1f}x")
+
+    row = inputs[0].tolist()
+    fused_proba, _ = fused.predict_proba_batch(inputs, 'numpy')
+    folded_proba, _ = folded.predict_proba_batch(inputs, 'numpy')
+    print(f"\nPrédiction unitaire NumPy : fusionnée "
+          f"{best_of(lambda: fused.predict_crop(*row, model_type='numpy'), args.iterations // 4):.2f} µs, "
+          f"repliée {best_of(lambda: folded.predict_crop(*row, model_type='numpy'), args.iterations // 4):.2f} µs "
+          f"(écart max des probabilités {np.abs(fused_proba - folded_proba).max():.2e}, "
+          f"concordance {np.mean(fused_proba.argmax(1) == folded_proba.argmax(1)):.2%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Banc d'essai de référence des backends de prédiction (latence, débit, mémoire)
+
+Usage : python benchmarks/suite.py run [--output benchmarks/baseline.json] [--backends numpy tensorflow_lite]
+                                       [--batch-sizes 1 8 64 512 4096] [--iterations 500]
+        python benchmarks/suite.py compare baseline.json current.json [--threshold 0.10]
+
+Chaque backend est mesuré dans un processus neuf, une fois par appel direct au CropPredictor
+et une fois à travers le client de test Flask (POST /predict et /predict/batch, cache des
+prédictions et limitation de débit désactivés) :
+  - coût du démarrage à froid (import et chargement du modèle, ou première requête) ;
+  - latence p50/p99 d'une prédiction unitaire ;
+  - débit (lignes/s) et latence médiane par appel pour chaque taille de lot ;
+  - RSS maximal du processus.
+Les résultats sont écrits en JSON ; le mode compare signale les métriques dégradées de plus
+du seuil relatif et se termine avec le code 1 s'il en trouve.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+BACKENDS = ['gradient_boosting', 'tensorflow', 'tensorflow_lite', 'tensorflow_lite_float16', 'tensorflow_lite_int8', 'numpy']
+MODES = ['direct', 'flask']
+FEATURE_NAMES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+# Sens d'amélioration de chaque métrique, selon son suffixe
+LOWER_IS_BETTER = ('_ms', '_seconds', '_mb')
+HIGHER_IS_BETTER = ('rows_per_second',)
+
+def peak_rss_mb():
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def percentiles_ms(latencies):
+    import numpy as np
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 4),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 4)
+    }
+
+def load_inputs(count, seed=0):
+    """Lignes du dataset tirées au hasard (entrées réalistes pour tous les backends)"""
+    import numpy as np
+    from app.config import Config
+    from app.services.datasets import get_dataset
+    rows = get_dataset(Config.DATASET_PATH, Config.DATASET_SNAPSHOT_DIR).matrix(FEATURE_NAMES)
+    return rows[np.random.default_rng(seed).integers(0, len(rows), count)]
+
+def time_calls(call, inputs, iterations, warmup=20):
+    """Latences (s) de `iterations` appels unitaires, après quelques appels de chauffe"""
+    for row in inputs[:warmup]:
+        call(row)
+    latencies = []
+    for i in range(iterations):
+        row = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        call(row)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def time_batches(call, inputs, batch_sizes, min_time):
+    """Débit et latence médiane par appel pour chaque taille de lot"""
+    import numpy as np
+    results = {}
+    for batch_size in batch_sizes:
+        batch = inputs[:batch_size]
+        call(batch)
+        latencies = []
+        started = time.perf_counter()
+        while len(latencies) < 3 or time.perf_counter() - started < min_time:
+            start = time.perf_counter()
+            call(batch)
+            latencies.append(time.perf_counter() - start)
+        results[str(batch_size)] = {
+            'rows_per_second': round(batch_size * len(latencies) / sum(latencies), 1),
+            'p50_ms': round(float(np.median(latencies)) * 1000, 4)
+        }
+    return results
+
+def bench_direct(model_type, args, inputs):
+    from app.config import get_config_dict
+    from app.services.predictor import CropPredictor
+
+    config = dict(get_config_dict('prod'), PREDICTION_CACHE_SIZE=0, MICRO_BATCHING_ENABLED=False)
+    predictor = CropPredictor(config)
+    start = time.perf_counter()
+    predictor.ensure_loaded(model_type)
+    report = predictor.load_report[model_type]
+    result = {
+        'loaded': report['loaded'],
+        'cold_start': {
+            'total_seconds': round(time.perf_counter() - start, 4),
+            'import_seconds': report['import_seconds'],
+            'load_seconds': report['load_seconds']
+        },
+        'rss_after_load_mb': peak_rss_mb()
+    }
+    if not report['loaded']:
+        return result
+
+    result['single_row'] = percentiles_ms(time_calls(
+        lambda row: predictor.predict_crop(*row, model_type=model_type), inputs, args.iterations))
+    result['batch'] = time_batches(
+        lambda batch: predictor.predict_crop_batch(batch, model_type, chunk_size=config['BATCH_CHUNK_SIZE']),
+        inputs, args.batch_sizes, args.min_time)
+    return result
+
+def bench_flask(model_type, args, inputs):
+    from app import create_app
+
+    app = create_app('prod', warm_up=False)
+    client = app.test_client()
+
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} a répondu {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    def predict(row):
+        post('/predict', dict(zip(FEATURE_NAMES, row.tolist()), model_type=model_type))
+
+    # Première requête : chargement paresseux du backend compris
+    start = time.perf_counter()
+    try:
+        predict(inputs[0])
+    except RuntimeError as e:
+        return {'loaded': False, 'error': str(e)}
+    result = {
+        'loaded': True,
+        'cold_start': {'first_request_seconds': round(time.perf_counter() - start, 4)},
+        'rss_after_load_mb': peak_rss_mb(),
+        'single_row': percentiles_ms(time_calls(predict, inputs, args.iterations))
+    }
+
+    def predict_batch(batch):
+        post('/predict/batch', {'model_type': model_type,
+                                'samples': [dict(zip(FEATURE_NAMES, row)) for row in batch.tolist()]})
+
+    result['batch'] = time_batches(predict_batch, inputs, args.batch_sizes, args.min_time)
+    return result
+
+def worker(args):
+    """Mesure un backend dans un mode, dans le processus courant, et écrit le JSON sur stdout"""
+    inputs = load_inputs(max(max(args.batch_sizes), args.iterations))
+    bench = bench_direct if args.mode == 'direct' else bench_flask
+    result = bench(args.model_type, args, inputs)
+    result['peak_rss_mb'] = peak_rss_mb()
+    print(json.dumps(result))
+
+def environment():
+    import numpy as np
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def run(args):
+    env = dict(os.environ, RATELIMIT_ENABLED='False', PREDICTION_CACHE_SIZE='0',
+               MICRO_BATCHING_ENABLED='False', MODEL_WARMUP='', TF_CPP_MIN_LOG_LEVEL='3')
+    results = {'environment': environment(), 'results': {}}
+    for model_type in args.backends:
+        for mode in args.modes:
+            command = [sys.executable, os.path.abspath(__file__), 'worker', model_type, mode,
+                       '--iterations', str(args.iterations), '--min-time', str(args.min_time),
+                       '--batch-sizes', *map(str, args.batch_sizes)]
+            print(f"{model_type} ({mode})...", file=sys.stderr, flush=True)
+            completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1:] or ['erreur inconnue']
+                results['results'].setdefault(model_type, {})[mode] = {'loaded': False, 'error': error[0]}
+                continue
+            results['results'].setdefault(model_type, {})[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats écrits dans {args.output}", file=sys.stderr)
+
+def flatten(results, prefix=''):
+    """Aplatit les résultats en {chemin: valeur} pour les seules métriques numériques"""
+    metrics = {}
+    for key, value in results.items():
+        path = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = value
+    return metrics
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = flatten(json.load(f)['results'])
+    with open(args.current) as f:
+        current = flatten(json.load(f)['results'])
+
+    regressions = 0
+    print(f"{'métrique':<58} {'référence':>12} {'actuel':>12} {'écart':>8}")
+    for path in sorted(baseline.keys() & current.keys()):
+        name = path.rsplit('.', 1)[-1]
+        if name.endswith(HIGHER_IS_BETTER):
+            sign = -1
+        elif name.endswith(LOWER_IS_BETTER):
+            sign = 1
+        else:
+            continue
+        before, after = baseline[path], current[path]
+        if before <= 0:
+            continue
+        change = (after - before) / before
+        regressed = sign * change > args.threshold
+        regressions += regressed
+        if regressed or args.verbose:
+            flag = '  RÉGRESSION' if regressed else ''
+            print(f"{path:<58} {before:>12.4g} {after:>12.4g} {change:>+8.1%}{flag}")
+
+    missing = sorted(baseline.keys() - current.keys())
+    if missing:
+        print(f"\n{len(missing)} métriques absentes du résultat actuel (backend non chargé ?) : "
+              f"{', '.join(missing[:5])}{'...' if len(missing) > 5 else ''}")
+    print(f"\n{regressions} régression(s) au-delà de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_measure_options(command):
+        command.add_argument('--iterations', type=int, default=500, help='prédictions unitaires mesurées')
+        command.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64, 512, 4096])
+        command.add_argument('--min-time', type=float, default=0.5, help='durée minimale (s) par taille de lot')
+
+    run_parser = commands.add_parser('run', help='mesure les backends et écrit les résultats JSON')
+    run_parser.add_argument('--output', default=os.path.join(PROJECT_ROOT, 'benchmarks', 'baseline.json'))
+    run_parser.add_argument('--backends', nargs='+', default=BACKENDS)
+    run_parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    add_measure_options(run_parser)
+
+    worker_parser = commands.add_parser('worker', help=argparse.SUPPRESS)
+    worker_parser.add_argument('model_type')
+    worker_parser.add_argument('mode', choices=MODES)
+    add_measure_options(worker_parser)
+
+    compare_parser = commands.add_parser('compare', help='compare deux fichiers de résultats')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='dégradation relative tolérée')
+    compare_parser.add_argument('--verbose', action='store_true', help='affiche aussi les métriques stables')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'worker':
+        worker(args)
+    else:
+        sys.exit(compare(args))
+
+if __name__ == '__main__':
+    main()
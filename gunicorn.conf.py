@@ -0,0 +1,45 @@
+# Configuration gunicorn de production : gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+import time
+
+from app.server import (default_report_dir, memory_usage, remove_worker_report,
+                        warm_up_worker, write_worker_report)
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Charger l'application (modèles, dataset) dans le maître avant le fork
+preload_app = True
+
+# Recyclage progressif des workers
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+worker_report_dir = default_report_dir()
+
+def post_fork(server, worker):
+    worker.fork_time = time.perf_counter()
+
+def post_worker_init(worker):
+    """Chauffe le worker puis enregistre son temps de démarrage et sa mémoire"""
+    warmed = warm_up_worker(worker.wsgi)
+    report = {
+        'pid': worker.pid,
+        'cold_start_seconds': round(time.perf_counter() - worker.fork_time, 4),
+        'warmed_backends': warmed,
+        'memory': memory_usage()
+    }
+    write_worker_report(worker_report_dir, report)
+    worker.log.info(f"Worker {worker.pid} prêt en {report['cold_start_seconds']:.3f}s "
+                    f"(backends: {', '.join(warmed) or 'aucun'}, mémoire: {report['memory']})")
+
+def child_exit(server, worker):
+    remove_worker_report(worker_report_dir, worker.pid)
+
+def when_ready(server):
+    server.log.info(f"Maître prêt (mémoire: {memory_usage()}), rapports des workers dans "
+                    f"{worker_report_dir} (python -m app.server)")
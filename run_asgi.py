@@ -0,0 +1,13 @@
+from app.asgi import create_asgi_app
+import os
+
+app = create_asgi_app(os.getenv('FLASK_ENV', 'dev'))
+
+if __name__ == '__main__':
+    # Serveur asyncio (uvicorn + a2wsgi) : les requêtes sont traitées sur un pool de threads borné
+    import uvicorn
+    
+    host = os.getenv('FLASK_HOST', '0.0.0.0')
+    port = int(os.getenv('FLASK_PORT', 5000))
+    
+    uvicorn.run(app, host=host, port=port, log_level=os.getenv('UVICORN_LOG_LEVEL', 'info'))
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import unittest
+from app.asgi import create_asgi_app
+
+class TestAsgiApp(unittest.TestCase):
+    def setUp(self):
+        self.server = create_asgi_app('test')
+        self.client = self.server.app.test_client()
+    
+    def request(self, method, path, query_string=b'', body=b''):
+        """Appelle l'application ASGI et retourne (statut, en-têtes, corps)"""
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+            'client': ('127.0.0.1', 12345), 'server': ('testserver', 80), 'http_version': '1.1'
+        }
+        # Corps envoyé en deux blocs pour vérifier la lecture en flux
+        chunks = [body[:len(body) // 2], body[len(body) // 2:]]
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i == 0} for i, chunk in enumerate(chunks)]
+        sent = []
+        
+        async def receive():
+            return messages.pop(0)
+        
+        async def send(message):
+            sent.append(message)
+        
+        asyncio.run(self.server(scope, receive, send))
+        start = sent[0]
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        return start['status'], dict(start['headers']), body
+    
+    def test_get_matches_flask(self):
+        """Les routes servies par asyncio renvoient la même réponse que Flask"""
+        status, headers, body = self.request('GET', '/crops/list')
+        
+        expected = self.client.get('/crops/list')
+        self.assertEqual(status, expected.status_code)
+        self.assertEqual(json.loads(body), json.loads(expected.data))
+        self.assertEqual(headers[b'content-type'], b'application/json')
+    
+    def test_post_predict_batch(self):
+        """Le corps JSON est transmis en flux à l'application"""
+        sample = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5, 'rainfall': 200}
+        payload = json.dumps({'samples': [sample, dict(sample, ph=20)], 'model_type': 'numpy'}).encode()
+        
+        status, _, body = self.request('POST', '/predict/batch', body=payload)
+        
+        self.assertEqual(status, 200)
+        data = json.loads(body)
+        self.assertEqual(data['valid_count'], 1)
+        self.assertEqual(data['results'][0]['crop'], 'rice')
+        self.assertIn('ph', data['results'][1]['errors'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,14 @@
 import unittest
 import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
 from app import create_app
+from app.config import config_by_name
+from app.services.crop_data import build_catalog, get_catalog, rebuild_catalog
+from app.services.datasets import ColumnarDataset, open_dataset
 
 class TestCropsAPI(unittest.TestCase):
     def setUp(self):
@@ -71,6 +79,134 @@ class TestCropsAPI(unittest.TestCase):
         # Tester avec une culture inexistante
         response = self.client.get('/crops/inexistant_crop')
         self.assertEqual(response.status_code, 404)
+    
+    def test_get_specific_crop_case_insensitive(self):
+        """La recherche d'une culture ne tient pas compte de la casse"""
+        response = self.client.get('/crops/RiCe')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['crop'], 'rice')
+    
+    def test_catalog_snapshot_and_atomic_rebuild(self):
+        """Le catalogue est relu depuis son instantané et remplacé d'un bloc à la reconstruction"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, 'crop_catalog.json')
+            built = build_catalog(self.app.config['DATASET_PATH'], snapshot_path)
+            self.assertTrue(os.path.exists(snapshot_path))
+            
+            reloaded = build_catalog(self.app.config['DATASET_PATH'], snapshot_path)
+            self.assertEqual(reloaded.requirements_body, built.requirements_body)
+        
+        previous = get_catalog()
+        rebuilt = rebuild_catalog()
+        self.assertIsNot(rebuilt, previous)
+        self.assertIs(get_catalog(), rebuilt)
+        self.assertEqual(rebuilt.crops, previous.crops)
+    
+    def test_dataset_snapshot_invalidation(self):
+        """Le CSV est converti une fois en colonnes projetées en mémoire, reconverties s'il change"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'GodFile (1).csv')
+            snapshot_dir = os.path.join(tmp_dir, 'datasets')
+            shutil.copy(self.app.config['CROP_CALENDAR_PATH'], csv_path)
+            
+            built = open_dataset(csv_path, snapshot_dir)
+            expected = ColumnarDataset.from_csv(csv_path)
+            self.assertIsInstance(built['durationmonths'], np.memmap)
+            self.assertEqual(built['period'].dtype, np.int8)
+            for name in expected.columns:
+                np.testing.assert_array_equal(built[name], expected[name])
+            np.testing.assert_array_equal(built.decode('label'), expected.decode('label'))
+            directory = os.listdir(snapshot_dir)
+            
+            # Date modifiée, contenu identique : l'instantané est conservé
+            os.utime(csv_path, ns=(0, 10**18))
+            self.assertEqual(open_dataset(csv_path, snapshot_dir).source['mtime_ns'], 10**18)
+            self.assertEqual(os.listdir(snapshot_dir), directory)
+            
+            # Autre dataset dont le nom commence par celui-ci : jamais supprimé par sa reconversion
+            other_path = os.path.join(tmp_dir, 'GodFile_1-v2.csv')
+            shutil.copy(csv_path, other_path)
+            open_dataset(other_path, snapshot_dir)
+            directory = os.listdir(snapshot_dir)
+            
+            # Contenu modifié : nouvel instantané, l'ancien est supprimé
+            with open(csv_path, 'a') as f:
+                f.write('1,2,3,20,50,6.5,4,100,summer,testcrop\n')
+            rebuilt = open_dataset(csv_path, snapshot_dir)
+            self.assertEqual(len(rebuilt), len(built) + 1)
+            self.assertEqual(rebuilt.decode('label')[-1], 'testcrop')
+            self.assertEqual(len([entry for entry in os.listdir(snapshot_dir) if entry.startswith('GodFile')]), 4)
+            self.assertNotEqual(sorted(os.listdir(snapshot_dir)), sorted(directory))
+            self.assertEqual(len(open_dataset(other_path, snapshot_dir)), len(built))
+            self.assertEqual(len([entry for entry in os.listdir(snapshot_dir) if entry.startswith('GodFile_1-v2-')]), 1)
+    
+    def test_catalog_includes_crop_calendar(self):
+        """Le catalogue indique la durée de culture et la saison issues de GodFile"""
+        rice = json.loads(self.client.get('/crops/rice').data)
+        self.assertEqual(rice['durationmonths'], 6.0)
+        self.assertIsInstance(rice['period'], str)
+        
+        watermelon = json.loads(self.client.get('/crops/watermelon').data)
+        self.assertIsNone(watermelon['durationmonths'])
+    
+    def test_conditional_get_returns_not_modified(self):
+        """Une requête If-None-Match avec l'ETag courante renvoie 304 sans consommer de quota"""
+        response = self.client.get('/crops/list')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        
+        # Au-delà de la limite de 20 requêtes par minute : les 304 ne sont pas décomptées
+        for _ in range(25):
+            response = self.client.get('/crops/list', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+        
+        response = self.client.get('/crops/rice', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+    
+    def test_similar_crops(self):
+        """Les échantillons et cultures les plus proches d'un profil sont retournés par distance croissante"""
+        # Première ligne du dataset : elle est son propre plus proche voisin
+        response = self.client.get('/crops/similar?N=90&P=42&K=43&temperature=20.87974371'
+                                   '&humidity=82.00274423&ph=6.502985292000001&rainfall=202.9355362&k=3')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data['nearest_samples']), 3)
+        self.assertEqual((data['nearest_samples'][0]['index'], data['nearest_samples'][0]['crop']), (0, 'rice'))
+        self.assertAlmostEqual(data['nearest_samples'][0]['distance'], 0.0, places=6)
+        distances = [crop['distance'] for crop in data['nearest_crops']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(data['nearest_crops'][0]['crop'], 'rice')
+        
+        sample = {'N': 20, 'P': 130, 'K': 200, 'temperature': 22, 'humidity': 92, 'ph': 6, 'rainfall': 110}
+        response = self.client.post('/crops/similar', data=json.dumps({'samples': [sample, dict(sample, N=90)],
+                                                                       'k': 1, 'k_crops': 2}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['nearest_crops'][0]['crop'], 'apple')
+        self.assertEqual(len(results[1]['nearest_crops']), 2)
+        
+        response = self.client.get('/crops/similar?N=90')
+        self.assertEqual(response.status_code, 400)
+        
+        # Corps JSON qui n'est pas un objet
+        response = self.client.post('/crops/similar', data=json.dumps([1, 2]), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_missing_dataset(self):
+        """Sans dataset, l'application démarre : /crops est vide et /crops/similar répond 503"""
+        with mock.patch.object(config_by_name['test'], 'DATASET_PATH', '/nonexistent/x.csv'):
+            app = create_app('test')
+        client = app.test_client()
+        
+        response = client.get('/crops')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [])
+        response = client.get('/crops/similar?N=90&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=203')
+        self.assertEqual(response.status_code, 503)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import unittest
+from app import create_app
+from app.utils.metrics import Registry
+from app.utils.profiling import profiler
+
+class TestRegistry(unittest.TestCase):
+    def test_histogram_exposition(self):
+        """Les intervalles sont cumulés à l'export, au format texte de Prometheus"""
+        registry = Registry()
+        histogram = registry.histogram('test_duration_seconds', 'Durée', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.labels('/predict').observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE test_duration_seconds histogram', lines)
+        self.assertIn('test_duration_seconds_bucket{route="/predict",le="0.1"} 1', lines)
+        self.assertIn('test_duration_seconds_bucket{route="/predict",le="1.0"} 3', lines)
+        self.assertIn('test_duration_seconds_bucket{route="/predict",le="+Inf"} 4', lines)
+        self.assertIn('test_duration_seconds_count{route="/predict"} 4', lines)
+        self.assertIn('test_duration_seconds_sum{route="/predict"} 4.05', lines)
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def test_requests_are_counted_per_route_and_model(self):
+        """Chaque requête est comptée avec le modèle d'URL de sa route et le model_type demandé"""
+        app = create_app('test', warm_up=False)
+        client = app.test_client()
+        payload = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5,
+                   'rainfall': 200, 'model_type': 'numpy'}
+
+        def count(route):
+            series = f'agropredict_http_requests_total{{route="{route}",method="POST",model_type="numpy",status="200"}}'
+            for line in client.get('/metrics').get_data(as_text=True).splitlines():
+                if line.startswith(series):
+                    return float(line.rsplit(' ', 1)[1])
+            return 0.0
+
+        before = count('/predict')
+        self.assertEqual(client.post('/predict', json=payload).status_code, 200)
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assertEqual(count('/predict'), before + 1)
+        self.assertIn('agropredict_inference_duration_seconds_count{model_type="numpy"', response.get_data(as_text=True))
+
+class TestRequestTiming(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('test', warm_up=False)
+        self.app.config['ADMIN_API_KEY'] = 'secret'
+        self.client = self.app.test_client()
+        self.payload = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5,
+                        'rainfall': 200, 'model_type': 'numpy'}
+
+    def tearDown(self):
+        profiler.disable()
+        profiler.reset()
+
+    def test_server_timing_stages(self):
+        """La réponse détaille la durée de chaque étape de la prédiction"""
+        response = self.client.post('/predict', json=dict(self.payload, rainfall=123.45))
+        self.assertEqual(response.status_code, 200)
+        stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        for stage in ('parse', 'validate', 'scale', 'inference', 'serialize', 'total'):
+            self.assertIn(stage, stages)
+
+    def test_profiling_requires_admin_key(self):
+        """Le profilage n'est activable qu'avec la clé d'administration et produit un rapport"""
+        self.assertEqual(self.client.put('/admin/profiling', json={'sample_rate': 1}).status_code, 401)
+
+        headers = {'X-ADMIN-KEY': 'secret'}
+        response = self.client.put('/admin/profiling', json={'sample_rate': 1, 'top_n': 5}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        for n in range(3):
+            self.client.post('/predict', json=dict(self.payload, N=n))
+
+        report = self.client.get('/admin/profiling', headers=headers).get_json()
+        self.assertEqual(report['routes'], {'/predict': 3})
+        self.assertEqual(len(report['functions']), 5)
+
+if __name__ == '__main__':
+    unittest.main()
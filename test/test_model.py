@@ -1,7 +1,15 @@
 import unittest
 import json
 import os
+import subprocess
+import shutil
+import sys
+import tempfile
+import time
 from app import create_app
+from app.services.model_inventory import ModelInventory, get_model_inventory
+from app.services.model_registry import registry
+from app.services.predictor import CropPredictor, get_predictor
 
 class TestModelAPI(unittest.TestCase):
     def setUp(self):
@@ -30,6 +38,21 @@ class TestModelAPI(unittest.TestCase):
             self.assertIn('size', first_model)
             self.assertIn('available', first_model)
     
+    def test_get_models_info_etag(self):
+        """La route /model/info renvoie une ETag et 304 tant que les modèles ne changent pas"""
+        response = self.client.get('/model/info')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/model/info', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        
+        # Mêmes fichiers à d'autres dates (autre worker ou autre serveur) : même ETag
+        inventory = get_model_inventory(get_predictor().version)
+        moved = tuple(signature and (signature[0], signature[1], signature[2] + 10**9)
+                      for signature in inventory.signatures)
+        self.assertEqual(ModelInventory(moved, inventory.version).etag, inventory.etag)
+        self.assertNotEqual(ModelInventory(moved, 'autre').etag, inventory.etag)
+    
     def test_download_tflite_model(self):
         """Test de la route /model/download/tflite pour télécharger le modèle TFLite"""
         # Vérifier si le modèle TFLite existe
@@ -47,6 +70,93 @@ class TestModelAPI(unittest.TestCase):
             # Si le modèle n'existe pas, la route devrait renvoyer 404
             response = self.client.get('/model/download/tflite')
             self.assertEqual(response.status_code, 404)
+        
+        response = self.client.get('/model/download/tflite?variant=int8')
+        if os.path.exists(os.path.join(tf_model_dir, 'model_int8.tflite')):
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('crop_prediction_model_int8.tflite', response.headers['Content-Disposition'])
+        
+        response = self.client.get('/model/download/tflite?variant=int4')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_create_app_does_not_import_tensorflow(self):
+        """Le démarrage de l'application n'importe pas TensorFlow"""
+        code = (
+            "import sys\n"
+            "from app import create_app\n"
+            "app = create_app('test')\n"
+            "app.test_client().get('/crops/list')\n"
+            "print('tensorflow' in sys.modules)\n"
+        )
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'False')
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tf_dir = os.path.join(self.tmp_dir, 'tensorflow')
+        self.app = create_app('test', warm_up=False)
+        shutil.copytree(self.app.config['TF_MODEL_DIR'], self.tf_dir)
+        self.app.config['TF_MODEL_DIR'] = self.tf_dir
+        self.app.config['ADMIN_API_KEY'] = 'secret'
+        self.client = self.app.test_client()
+        self.payload = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5,
+                        'rainfall': 200, 'model_type': 'numpy'}
+        CropPredictor._instance = None
+    
+    def tearDown(self):
+        registry.stop_watcher()
+        CropPredictor._instance = None
+        shutil.rmtree(self.tmp_dir)
+    
+    def replace_model(self):
+        """Déploie un nouveau fichier de modèle (contenu et date différents)"""
+        with open(os.path.join(self.tf_dir, 'model.tflite'), 'ab') as f:
+            f.write(b'\0')
+    
+    def test_admin_reload_swaps_version(self):
+        """Le rechargement met en service une nouvelle version, annoncée dans les réponses"""
+        first = self.client.post('/predict', json=self.payload).get_json()['model_version']
+        old_predictor = get_predictor()
+        
+        self.replace_model()
+        response = self.client.post('/admin/models/reload?wait=true', headers={'X-ADMIN-KEY': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['reloaded'])
+        
+        second = self.client.post('/predict', json=self.payload).get_json()['model_version']
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.client.get('/model/info').get_json()['version'], second)
+        # Le backend déjà chargé l'est aussi dans la nouvelle version, l'ancienne reste utilisable
+        self.assertIsNotNone(get_predictor().models['numpy'])
+        self.assertEqual(old_predictor.predict_crop_batch([[90, 42, 43, 21, 82, 6.5, 200]], 'numpy')[0], ['rice'])
+    
+    def test_failed_reload_keeps_current_version(self):
+        """Une version qui ne se charge pas n'est pas mise en service"""
+        self.client.post('/predict', json=self.payload)
+        current = get_predictor()
+        
+        with open(os.path.join(self.tf_dir, 'metadata.pkl'), 'wb') as f:
+            f.write(b'corrompu')
+        response = self.client.post('/admin/models/reload?wait=true', headers={'X-ADMIN-KEY': 'secret'})
+        self.assertEqual(response.status_code, 500)
+        self.assertIs(get_predictor(), current)
+    
+    def test_watcher_reloads_changed_files(self):
+        """La surveillance des fichiers recharge les modèles une fois la copie terminée"""
+        self.client.post('/predict', json=self.payload)
+        version = get_predictor().version
+        self.app.config['MODEL_WATCH_INTERVAL'] = 0.05
+        registry.ensure_watcher(self.app.config, self.app.logger)
+        
+        self.replace_model()
+        deadline = time.monotonic() + 5
+        while get_predictor().version == version and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertNotEqual(get_predictor().version, version)
+        self.assertEqual(get_predictor().generation, 1)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,9 @@
 import unittest
+import importlib.util
 import json
+import numpy as np
 from app import create_app
+from app.services.predictor import get_predictor
 
 class TestPredictAPI(unittest.TestCase):
     def setUp(self):
@@ -77,6 +80,15 @@ class TestPredictAPI(unittest.TestCase):
         )
         
         self.assertEqual(response.status_code, 400)
+        
+        # Corps JSON qui n'est pas un objet
+        for body in ([90, 42, 43], 'N=90', None):
+            response = self.client.post(
+                '/predict',
+                data=json.dumps(body),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
     
     def test_predict_simple_get(self):
         """Test de la route /predict/simple avec une requête GET"""
@@ -90,6 +102,192 @@ class TestPredictAPI(unittest.TestCase):
         self.assertIn('confidence', data)
         self.assertIn('model_used', data)
         self.assertIn('input_parameters', data)
+    
+    def test_predict_batch(self):
+        """Test de la route /predict/batch avec un lot d'échantillons"""
+        sample = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5, 'rainfall': 200}
+        payload = {
+            'samples': [sample, dict(sample, temperature=100), dict(sample, N=20)],
+            'model_type': 'tensorflow'
+        }
+        
+        response = self.client.post(
+            '/predict/batch',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['valid_count'], 2)
+        self.assertEqual(len(data['results']), 3)
+        
+        # L'échantillon invalide est signalé sans bloquer les autres
+        self.assertIsNone(data['results'][1]['crop'])
+        self.assertIn('temperature', data['results'][1]['errors'])
+        for index in (0, 2):
+            self.assertIsNotNone(data['results'][index]['crop'])
+            self.assertIsNone(data['results'][index]['errors'])
+    
+    def test_predict_batch_invalid_payload(self):
+        """Test de la route /predict/batch avec une requête invalide"""
+        response = self.client.post(
+            '/predict/batch',
+            data=json.dumps({'samples': []}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post(
+            '/predict/batch',
+            data=json.dumps({'samples': [{'N': 90}], 'model_type': 'inconnu'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post(
+            '/predict/batch',
+            data=json.dumps([{'N': 90}]),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_predict_top_k(self):
+        """Le paramètre top_k renvoie les k cultures les plus probables, pour une requête unitaire ou un lot"""
+        response = self.client.get(
+            '/predict/simple?N=90&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=200&model_type=numpy&top_k=3')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        probabilities = [entry['probability'] for entry in data['top_k']]
+        self.assertEqual(len(data['top_k']), 3)
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+        self.assertEqual((data['top_k'][0]['crop'], probabilities[0]), (data['crop'], data['confidence']))
+        
+        sample = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5, 'rainfall': 200}
+        response = self.client.post('/predict/batch', data=json.dumps(
+            {'samples': [sample, dict(sample, N=20)], 'model_type': 'numpy', 'top_k': 50}),
+            content_type='application/json')
+        results = json.loads(response.data)['results']
+        # k est borné au nombre de classes ; les probabilités couvrent alors toute la distribution
+        self.assertEqual(len(results[0]['top_k']), len(set(entry['crop'] for entry in results[0]['top_k'])))
+        self.assertAlmostEqual(sum(entry['probability'] for entry in results[1]['top_k']), 1.0, places=4)
+        
+        response = self.client.post('/predict/batch', data=json.dumps(
+            {'samples': [sample], 'top_k': 0}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        # Un booléen n'est pas un entier (true vaudrait 1)
+        response = self.client.post('/predict', data=json.dumps(
+            dict(sample, model_type='numpy', top_k=True)), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_predict_ensemble(self):
+        """Le model_type ensemble combine les modèles chargés et détaille leur accord"""
+        response = self.client.get(
+            '/predict/simple?N=90&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=200&model_type=ensemble')
+        if get_predictor().models['ensemble'] is None:
+            self.skipTest("Aucun modèle de l'ensemble n'est disponible")
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        ensemble = data['ensemble']
+        self.assertEqual([member['model_type'] for member in ensemble['models']],
+                         list(get_predictor().models['ensemble']))
+        agreeing = [member['agrees'] for member in ensemble['models']]
+        self.assertAlmostEqual(ensemble['agreement'], sum(agreeing) / len(agreeing))
+        for member in ensemble['models']:
+            self.assertEqual(member['agrees'], member['crop'] == data['crop'])
+    
+    def test_predict_csv_stream(self):
+        """Test de la route /predict/csv : une ligne NDJSON par ligne du CSV, puis un résumé"""
+        csv_body = (
+            'N,P,K,temperature,humidity,ph,rainfall,label\n'
+            '90,42,43,21,82,6.5,200,rice\n'
+            '90,42,43,100,82,6.5,200,rice\n'
+            '90,42\n'
+            '20,130,200,22,92,6,110,apple\n'
+        )
+        response = self.client.post('/predict/csv?model_type=numpy&chunk_size=2',
+                                    data=csv_body, content_type='text/csv')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line.get('line') for line in lines[:-1]], [2, 3, 4, 5])
+        self.assertEqual(lines[0]['crop'], 'rice')
+        self.assertIn('temperature', lines[1]['errors'])
+        self.assertIn('row', lines[2]['errors'])
+        self.assertIsNotNone(lines[3]['crop'])
+        summary = lines[-1]['summary']
+        self.assertEqual(summary.pop('model_version'), get_predictor().version)
+        self.assertEqual(summary, {'model_used': 'numpy', 'count': 4, 'valid_count': 2})
+        
+        # En-tête incomplet : rejeté avant toute évaluation
+        response = self.client.post('/predict/csv', data='N,P\n1,2\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_tflite_interpreter_pool_reuse(self):
+        """Les interpréteurs TFLite sont réutilisés d'une requête à l'autre"""
+        predictor = get_predictor()
+        predictor.ensure_loaded('tensorflow_lite')
+        if predictor.models['tensorflow_lite'] is None:
+            self.skipTest("Modèle TensorFlow Lite non disponible")
+        
+        # Entrées distinctes : les requêtes identiques seraient servies par le cache
+        for N in (90, 91, 92):
+            response = self.client.get(
+                f'/predict/simple?N={N}&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=200&model_type=tensorflow_lite')
+            self.assertEqual(response.status_code, 200)
+        
+        # Un lot redimensionne l'interpréteur sans en créer un nouveau
+        crops, confidences = predictor.predict_crop_batch(
+            [[90, 42, 43, 21, 82, 6.5, 200]] * 5, 'tensorflow_lite')
+        self.assertEqual(len(crops), 5)
+        
+        stats = predictor.get_stats()['tflite_pool']
+        self.assertEqual(stats['size'], 1)
+        self.assertGreaterEqual(stats['hits'], 3)
+    
+    def test_predict_numpy_model(self):
+        """Test de la route /predict/simple avec le modèle NumPy"""
+        response = self.client.get(
+            '/predict/simple?N=90&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=200&model_type=numpy'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['model_used'], 'numpy')
+        self.assertEqual(data['crop'], 'rice')
+    
+    @unittest.skipIf(importlib.util.find_spec('tensorflow') is None, "TensorFlow non installé")
+    def test_numpy_model_matches_tensorflow(self):
+        """Le modèle NumPy reproduit les probabilités du modèle Keras"""
+        predictor = get_predictor()
+        samples = [[90, 42, 43, 21, 82, 6.5, 200], [20, 130, 200, 22, 92, 6, 110], [40, 70, 20, 25, 60, 7, 50]]
+        
+        numpy_proba, numpy_classes = predictor.predict_proba_batch(samples, 'numpy')
+        tf_proba, tf_classes = predictor.predict_proba_batch(samples, 'tensorflow')
+        
+        self.assertEqual(list(numpy_classes), list(tf_classes))
+        np.testing.assert_allclose(numpy_proba, tf_proba, atol=1e-5)
+    
+    @unittest.skipIf(importlib.util.find_spec('tensorflow') is None, "TensorFlow non installé")
+    def test_reduced_precision_tflite_variants(self):
+        """Les variantes float16 et int8 sont servies sous leur model_type et suivent le modèle Keras"""
+        predictor = get_predictor()
+        samples = [[90, 42, 43, 21, 82, 6.5, 200], [20, 130, 200, 22, 92, 6, 110], [40, 70, 20, 25, 60, 7, 50]]
+        tf_proba, _ = predictor.predict_proba_batch(samples, 'tensorflow')
+        
+        for model_type in ('tensorflow_lite_float16', 'tensorflow_lite_int8'):
+            response = self.client.get(
+                f'/predict/simple?N=90&P=42&K=43&temperature=21&humidity=82&ph=6.5&rainfall=200&model_type={model_type}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['model_used'], model_type)
+            
+            proba, _ = predictor.predict_proba_batch(samples, model_type)
+            np.testing.assert_array_equal(np.argmax(proba, axis=1), np.argmax(tf_proba, axis=1))
+            np.testing.assert_allclose(proba, tf_proba, atol=0.05)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,290 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+from app import create_app
+from app.services.gb_evaluator import CompiledGradientBoosting
+from app.services.prediction_cache import PredictionCache
+from app.services.batching import MicroBatcher
+from app.services.standardization import FusedStandardizer
+from app.services.numpy_model import NumpyDenseModel
+from app.services.predictor import CropPredictor
+from app.batch_scoring import score_csv
+from app.config import get_config_dict
+from app.utils.validators import CROP_PARAMS, validate_crop_params
+
+class TestCompiledGradientBoosting(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app = create_app('test')
+        dataset = pd.read_csv(app.config['DATASET_PATH'])
+        cls.X = dataset[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']].values
+        cls.y = dataset['label'].values
+
+    def assert_matches_sklearn(self, model, compiled):
+        labels, probabilities = compiled.predict_with_proba(self.X)
+        np.testing.assert_array_equal(labels, model.predict(self.X))
+        np.testing.assert_array_equal(probabilities, model.predict_proba(self.X))
+
+    def test_multiclass_matches_sklearn(self):
+        """L'évaluateur compilé reproduit exactement predict et predict_proba"""
+        model = GradientBoostingClassifier(n_estimators=10, random_state=0).fit(self.X, self.y)
+
+        # Parcours vectorisé sur tout le lot, puis decision_function au-delà du seuil
+        self.assert_matches_sklearn(model, CompiledGradientBoosting.from_sklearn(model, vectorized_max_rows=10**6))
+        self.assert_matches_sklearn(model, CompiledGradientBoosting.from_sklearn(model, vectorized_max_rows=0))
+
+    def test_mismatch_with_sklearn_is_detected(self):
+        """Une prédiction initiale différente de scikit-learn est refusée à la compilation"""
+        model = GradientBoostingClassifier(n_estimators=5, random_state=0).fit(self.X, self.y)
+        with mock.patch('app.services.gb_evaluator._init_raw_predictions',
+                        return_value=np.zeros(len(model.classes_)) + np.arange(len(model.classes_))):
+            with self.assertRaises(ValueError):
+                CompiledGradientBoosting.from_sklearn(model)
+
+    def test_binary_matches_sklearn(self):
+        """L'évaluateur compilé gère la classification binaire"""
+        model = GradientBoostingClassifier(n_estimators=10, max_depth=4, random_state=0).fit(
+            self.X, self.y == 'rice')
+        compiled = CompiledGradientBoosting.from_sklearn(model, vectorized_max_rows=10**6)
+        self.assert_matches_sklearn(model, compiled)
+
+class TestPredictionCache(unittest.TestCase):
+    def test_quantized_hits_and_lru_eviction(self):
+        """Les entrées quantifiées identiques sont servies depuis le cache, les plus anciennes évincées"""
+        cache = PredictionCache(max_size=2, precision=1)
+        calls = []
+        compute = lambda value: (lambda: calls.append(value) or value)
+
+        self.assertEqual(cache.get_or_compute('gb', (1.0, 2.0), compute('a')), 'a')
+        self.assertEqual(cache.get_or_compute('gb', (1.04, 2.01), compute('b')), 'a')
+        cache.get_or_compute('gb', (3.0, 4.0), compute('c'))
+        cache.get_or_compute('gb', (5.0, 6.0), compute('d'))
+        cache.get_or_compute('gb', (1.0, 2.0), compute('e'))
+
+        self.assertEqual(calls, ['a', 'c', 'd', 'e'])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 4, 2))
+        self.assertEqual(stats['evictions'], 2)
+
+    def test_ttl_and_invalidation(self):
+        """Les entrées expirent après le TTL et sont supprimées au rechargement du modèle"""
+        cache = PredictionCache(max_size=10, ttl=0.05)
+        cache.get_or_compute('gb', (1,), lambda: 'a')
+        cache.get_or_compute('tf', (1,), lambda: 'b')
+
+        cache.invalidate('gb')
+        self.assertEqual(cache.get_or_compute('gb', (1,), lambda: 'c'), 'c')
+        self.assertEqual(cache.get_or_compute('tf', (1,), lambda: 'x'), 'b')
+
+        time.sleep(0.06)
+        self.assertEqual(cache.get_or_compute('tf', (1,), lambda: 'd'), 'd')
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_concurrent_identical_requests_share_computation(self):
+        """Les requêtes identiques simultanées partagent un seul calcul"""
+        cache = PredictionCache(max_size=10)
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(2)
+            return 'rice'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('gb', (1, 2), compute)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while cache.stats()['coalesced'] < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['rice'] * 5)
+        self.assertEqual(len(calls), 1)
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_predictions_are_grouped(self):
+        """Les prédictions concurrentes sont regroupées et chaque appelant reçoit son résultat"""
+        batch_sizes = []
+
+        def predict_batch(rows, model_type):
+            batch_sizes.append(len(rows))
+            return [f'{model_type}-{row[0]}' for row in rows], np.ones(len(rows))
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait=0.05)
+        results = {}
+
+        def submit(value):
+            results[value] = batcher.submit('gb', [value] * 7)
+
+        threads = [threading.Thread(target=submit, args=(value,)) for value in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.shutdown()
+
+        self.assertEqual({value: crop for value, (crop, _) in results.items()},
+                         {value: f'gb-{value}' for value in range(8)})
+        self.assertTrue(all(size <= 4 for size in batch_sizes))
+        self.assertLess(len(batch_sizes), 8)
+
+        stats = batcher.stats()
+        self.assertEqual(stats['requests'], 8)
+        self.assertEqual(stats['batches'], len(batch_sizes))
+
+    def test_submit_after_shutdown_predicts_directly(self):
+        """Après shutdown(), submit() prédit dans le thread appelant sans relancer de thread"""
+        batcher = MicroBatcher(lambda rows, model_type: ([f'{model_type}-{row[0]}' for row in rows],
+                                                         np.ones(len(rows))))
+        self.assertEqual(batcher.submit('gb', [1] * 7)[0], 'gb-1')
+        batcher.shutdown()
+
+        self.assertEqual(batcher.submit('gb', [2] * 7)[0], 'gb-2')
+        self.assertEqual(batcher.stats()['queue_depth'], {})
+        self.assertNotIn('micro-batcher-gb', [thread.name for thread in threading.enumerate()])
+
+    def test_batch_errors_are_propagated(self):
+        """Une erreur d'inférence est renvoyée à chaque appelant du lot"""
+        def predict_batch(rows, model_type):
+            raise ValueError("Le modèle n'est pas chargé")
+
+        batcher = MicroBatcher(predict_batch, max_wait=0.001)
+        with self.assertRaises(ValueError):
+            batcher.submit('gb', [1] * 7)
+        batcher.shutdown()
+        self.assertEqual(batcher.stats()['errors'], 1)
+
+class TestEnsembleCombination(unittest.TestCase):
+    def setUp(self):
+        self.members = {
+            'gradient_boosting': np.array([[0.6, 0.4, 0.0], [0.1, 0.2, 0.7]]),
+            'tensorflow': np.array([[0.3, 0.7, 0.0], [0.2, 0.1, 0.7]]),
+            'tensorflow_lite': np.array([[0.2, 0.8, 0.0], [0.0, 0.3, 0.7]])
+        }
+    
+    def test_weighted_average(self):
+        """La moyenne pondérée combine les vecteurs de probabilités des membres"""
+        config = dict(get_config_dict('test'), ENSEMBLE_METHOD='average', ENSEMBLE_WEIGHTS={'gradient_boosting': 2.0})
+        combined = CropPredictor(config).combine_ensemble(self.members)
+        np.testing.assert_allclose(combined[0], [0.425, 0.575, 0.0])
+        np.testing.assert_allclose(combined.sum(axis=1), 1.0)
+    
+    def test_weighted_vote(self):
+        """Le vote pondéré compte la classe la plus probable de chaque membre"""
+        config = dict(get_config_dict('test'), ENSEMBLE_METHOD='vote', ENSEMBLE_WEIGHTS={'gradient_boosting': 2.0})
+        combined = CropPredictor(config).combine_ensemble(self.members)
+        np.testing.assert_allclose(combined, [[0.5, 0.5, 0.0], [0.0, 0.0, 1.0]], atol=1e-6)
+        # Égalité des votes départagée par la moyenne des probabilités
+        self.assertEqual(np.argmax(combined[0]), 1)
+
+class TestFusedStandardizer(unittest.TestCase):
+    def setUp(self):
+        self.X = np.random.default_rng(0).uniform([0, 5, 5, 8, 14, 3.5, 20], [140, 145, 205, 44, 100, 10, 300], (500, 7))
+    
+    def test_matches_sklearn_transform(self):
+        """La standardisation fusionnée reproduit StandardScaler.transform au bit près"""
+        for options in ({}, {'with_mean': False}, {'with_std': False}):
+            scaler = StandardScaler(**options).fit(self.X)
+            standardizer = FusedStandardizer.from_sklearn(scaler)
+            np.testing.assert_array_equal(standardizer.transform(self.X), scaler.transform(self.X))
+            np.testing.assert_array_equal(standardizer.transform(self.X[:1], np.float32),
+                                          scaler.transform(self.X[:1]).astype(np.float32))
+        
+        # L'entrée n'est pas modifiée
+        before = self.X.copy()
+        standardizer.transform(self.X)
+        np.testing.assert_array_equal(self.X, before)
+    
+    def test_folded_models_match(self):
+        """Les modèles NumPy et Keras repliant la standardisation donnent les mêmes probabilités"""
+        config = get_config_dict('test')
+        predictor = CropPredictor(config)
+        folded = CropPredictor(dict(config, FOLD_STANDARDIZATION=True))
+        
+        model_types = ['numpy'] + (['tensorflow'] if importlib.util.find_spec('tensorflow') else [])
+        for model_type in model_types:
+            expected, _ = predictor.predict_proba_batch(self.X, model_type)
+            probabilities, _ = folded.predict_proba_batch(self.X, model_type)
+            self.assertIn(model_type, folded.folded_standardization)
+            np.testing.assert_allclose(probabilities, expected, atol=1e-5)
+            np.testing.assert_array_equal(np.argmax(probabilities, axis=1), np.argmax(expected, axis=1))
+
+class TestNumpyModelExport(unittest.TestCase):
+    def test_npz_rebuilt_only_when_h5_content_changes(self):
+        """model.npz est régénéré selon l'empreinte de best_model.h5, pas selon sa date"""
+        config = get_config_dict('test')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for filename in ('best_model.h5', 'metadata.pkl', 'model.npz'):
+                shutil.copy(os.path.join(config['TF_MODEL_DIR'], filename), tmp_dir)
+            h5_path, npz_path = os.path.join(tmp_dir, 'best_model.h5'), os.path.join(tmp_dir, 'model.npz')
+            
+            # best_model.h5 plus récent (checkout git) : l'archive est réutilisée telle quelle
+            os.utime(npz_path, (1, 1))
+            CropPredictor(dict(config, TF_MODEL_DIR=tmp_dir)).ensure_loaded('numpy')
+            self.assertEqual(os.stat(npz_path).st_mtime, 1)
+            
+            # Archive issue d'un autre fichier .h5 : régénérée
+            model = NumpyDenseModel.from_npz(npz_path)
+            model.source_sha256 = '0' * 64
+            model.save(npz_path)
+            predictor = CropPredictor(dict(config, TF_MODEL_DIR=tmp_dir))
+            predictor.ensure_loaded('numpy')
+            self.assertIn('numpy', predictor.models)
+            self.assertTrue(NumpyDenseModel.from_npz(npz_path).is_exported_from(h5_path))
+
+class TestParamSpec(unittest.TestCase):
+    def test_batch_validation_matches_single_validation(self):
+        """La validation vectorisée d'un lot donne les mêmes erreurs que la validation unitaire"""
+        valid = {'N': 90, 'P': '42', 'K': 43, 'temperature': 21.5, 'humidity': 82, 'ph': 6.5, 'rainfall': 200}
+        samples = [
+            valid,
+            dict(valid, N='abc', temperature=100),
+            dict(valid, ph=None, rainfall=float('nan')),
+            {name: value for name, value in valid.items() if name != 'K'},
+            'pas un objet'
+        ]
+        values, mask, errors = CROP_PARAMS.validate_samples(samples)
+        
+        self.assertEqual(mask.tolist(), [True, False, False, False, False])
+        np.testing.assert_allclose(values[0], [90, 42, 43, 21.5, 82, 6.5, 200])
+        for sample, sample_errors in zip(samples[:4], errors):
+            self.assertEqual(sample_errors, validate_crop_params(sample))
+        self.assertEqual(set(errors[1]), {'N', 'temperature'})
+        self.assertEqual(set(errors[2]), {'ph', 'rainfall'})
+        self.assertEqual(errors[3], {'K': "Le paramètre 'K' est requis"})
+        self.assertIn('sample', errors[4])
+
+class TestBatchScoring(unittest.TestCase):
+    def test_score_csv_with_process_pool(self):
+        """Le CSV est évalué par blocs dans un pool de processus, sans contexte Flask"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, 'input.csv')
+            output_path = os.path.join(tmp_dir, 'output.csv')
+            rows = ['90,42,43,21,82,6.5,200,rice'] * 5 + ['90,42,43,21,82,6.5,,rice', '90,42,43,100,82,6.5,200,rice']
+            with open(input_path, 'w') as f:
+                f.write('N,P,K,temperature,humidity,ph,rainfall,label\n' + '\n'.join(rows) + '\n')
+            
+            stats = score_csv(input_path, output_path, 'numpy', get_config_dict('test'), workers=2, chunk_size=3)
+            results = pd.read_csv(output_path, keep_default_na=False)
+        
+        self.assertEqual((stats['rows'], stats['valid_rows']), (7, 5))
+        self.assertEqual(results['row'].tolist(), list(range(7)))
+        self.assertEqual(results['crop'].tolist()[:5], ['rice'] * 5)
+        self.assertIn('rainfall', results['error'][5])
+        self.assertIn('température', results['error'][6])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import time
+import unittest
+from limits import RateLimitItemPerMinute
+from limits.strategies import SlidingWindowCounterRateLimiter
+from limits.storage import storage_from_string
+from app.utils.rate_limit_storage import SQLiteStorage
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'ratelimit.sqlite')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_limits_are_shared_between_storages(self):
+        """Deux stockages sur la même base (un par worker) partagent les compteurs"""
+        first, second = storage_from_string(self.uri), storage_from_string(self.uri)
+        self.assertIsInstance(first, SQLiteStorage)
+        item = RateLimitItemPerMinute(3)
+
+        hits = [SlidingWindowCounterRateLimiter(storage).hit(item, '10.0.0.1')
+                for storage in (first, second, first, second)]
+        self.assertEqual(hits, [True, True, True, False])
+        self.assertTrue(SlidingWindowCounterRateLimiter(second).hit(item, '10.0.0.2'))
+
+    def test_idle_keys_are_evicted(self):
+        """Les compteurs expirés sont purgés de la base"""
+        storage = SQLiteStorage(self.uri, cleanup_interval=0)
+        for i in range(100):
+            storage.incr(f'ip-{i}', 0.05)
+        time.sleep(0.06)
+        storage.incr('active', 60)
+
+        count = storage._connection().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+        self.assertEqual(count, 1)
+        self.assertEqual(storage.get('ip-0'), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,8 @@
+from app import create_app
+from app.server import preload
+import os
+
+# Point d'entrée WSGI de production (gunicorn -c gunicorn.conf.py wsgi:app)
+# Les modèles sûrs au fork et le dataset sont chargés ici, dans le processus maître
+app = create_app(os.getenv('FLASK_ENV', 'prod'), warm_up=False)
+preload(app)